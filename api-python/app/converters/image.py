@@ -1,25 +1,123 @@
-from PIL import Image
-import io
+from PIL import Image, UnidentifiedImageError
+import os
+import tempfile
+from typing import List
 from fastapi import UploadFile, HTTPException
 import img2pdf
+from core.executors import run_cpu, map_bounded
+from core.uploads import spool_to_path
+
+# Compressed data img2pdf copies into the PDF as is
+PASSTHROUGH_FORMATS = {"JPEG", "JPEG2000", "MPO"}
+# Modes a plain PNG can hold without loss
+PNG_MODES = {"1", "L", "P", "RGB"}
+# Alpha modes a PNG can hold; img2pdf splits PNG alpha into a soft mask
+PNG_ALPHA_MODES = {"LA", "RGBA"}
+# Raised by img2pdf for images it cannot embed: bad input, not a server fault
+IMG2PDF_INPUT_ERRORS = (
+    img2pdf.AlphaChannelError, img2pdf.ImageOpenError, img2pdf.JpegColorspaceError,
+    img2pdf.UnsupportedColorspaceError, img2pdf.ExifOrientationError, img2pdf.NegativeDimensionError,
+    img2pdf.PdfTooLargeError,
+)
+
+class ImageInputError(ValueError):
+    """img2pdf rejected the image at ``index`` in the request."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(index, message)
+        self.index = index
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
+
+def _open_image(image_path: str) -> Image.Image:
+    # Image.open only sniffs the format and parses the header; no pixels are decoded
+    try:
+        return Image.open(image_path)
+    except (UnidentifiedImageError, OSError):
+        raise ValueError("Invalid image file")
+
+def _needs_reencoding(img: Image.Image) -> bool:
+    """True when img2pdf would have to decode and recompress the image itself, or would reject it."""
+    if img.format in PASSTHROUGH_FORMATS or getattr(img, "n_frames", 1) > 1:
+        return False
+    if img.format == "PNG":
+        return bool(img.info.get("interlace"))
+    if img.has_transparency_data:
+        # img2pdf only handles transparency in PNGs; it rejects alpha in any other format
+        return True
+    if img.format == "TIFF" and img.info.get("compression") == "group4":
+        return False
+    # Other modes (CMYK, 16-bit) stay as they are
+    return img.mode in PNG_MODES
+
+def _prepare_image(image_path: str) -> str:
+    """
+    Validate one image and, if img2pdf could not embed it as is, re-encode it to a
+    non-interlaced PNG next to the original, whose data img2pdf copies without decoding.
+    """
+    with _open_image(image_path) as img:
+        if not _needs_reencoding(img):
+            return image_path
+        prepared_path = f"{image_path}.png"
+        if img.mode not in PNG_MODES | PNG_ALPHA_MODES:
+            # PA, La, RGBa: alpha modes PNG cannot store
+            img = img.convert("RGBA")
+        img.save(prepared_path, format="PNG")
+        return prepared_path
+
+def _combine_images(image_paths: List[str]) -> bytes:
+    try:
+        return img2pdf.convert(image_paths)
+    except IMG2PDF_INPUT_ERRORS as e:
+        error = e
+    # img2pdf does not say which image it rejected; find it, on this failure path only
+    for index, image_path in enumerate(image_paths):
+        try:
+            img2pdf.convert(image_path)
+        except IMG2PDF_INPUT_ERRORS as e:
+            raise ImageInputError(index, str(e)) from None
+    raise ValueError(str(error))
+
+def _image_file_to_pdf(image_path: str) -> bytes:
+    return _combine_images([_prepare_image(image_path)])
 
 async def convert_image_to_pdf(file: UploadFile) -> bytes:
     """Convert an image file to PDF."""
     try:
-        # Read the image file
-        contents = await file.read()
-        
-        # Validate image format
-        try:
-            img = Image.open(io.BytesIO(contents))
-            img.verify()  # Verify it's a valid image
-        except Exception as e:
-            raise HTTPException(status_code=400, detail="Invalid image file")
-        
-        # Convert to PDF using img2pdf
-        pdf_bytes = img2pdf.convert(contents)
-        return pdf_bytes
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Spool the upload to disk so the worker process reads it by path
+            image_path = await spool_to_path(file, os.path.join(temp_dir, "image"))
+
+            pdf_bytes = await run_cpu(_image_file_to_pdf, image_path)
+            return pdf_bytes
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to convert image: {str(e)}")
     finally:
-        await file.close() 
\ No newline at end of file
+        await file.close()
+
+async def convert_images_to_pdf(files: List[UploadFile]) -> bytes:
+    """Combine image files into one PDF, one page per image (per frame for multi-page images), in upload order."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        async def prepare(indexed):
+            index, file = indexed
+            image_path = await spool_to_path(file, os.path.join(temp_dir, str(index)))
+            try:
+                return await run_cpu(_prepare_image, image_path)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+
+        # Images are validated and, where needed, re-encoded concurrently on the
+        # cpu pool; the single img2pdf pass then only copies compressed data
+        image_paths = await map_bounded(prepare, enumerate(files))
+        try:
+            return await run_cpu(_combine_images, image_paths)
+        except ImageInputError as e:
+            raise HTTPException(status_code=400, detail=f"{files[e.index].filename}: {e}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to combine images: {str(e)}")
@@ -1,44 +1,28 @@
 import os
 import tempfile
 from fastapi import UploadFile, HTTPException
-import subprocess
 from typing import Literal
-import sys
 import traceback
+from core.libreoffice import get_office_pool, OfficeConversionError
+from core.executors import run_subprocess
+from core.uploads import spool_to_path
 
 async def convert_office_to_pdf(file: UploadFile, doc_type: Literal['word', 'powerpoint', 'excel']) -> bytes:
-    """Convert Office documents (Word, PowerPoint, Excel) to PDF using LibreOffice CLI."""
+    """Convert Office documents (Word, PowerPoint, Excel) to PDF using the LibreOffice worker pool."""
     try:
         # Create a temporary directory
         with tempfile.TemporaryDirectory() as temp_dir:
             # Save the uploaded file
             input_path = os.path.join(temp_dir, file.filename)
-            with open(input_path, 'wb') as f:
-                contents = await file.read()
-                f.write(contents)
+            await spool_to_path(file, input_path)
             
-            # Set output path
-            output_path = os.path.join(temp_dir, f"{os.path.splitext(file.filename)[0]}.pdf")
-            
-            # Find soffice executable
-            soffice_cmd = 'soffice'
-            if sys.platform == 'win32':
-                soffice_cmd = r'C:\Program Files\LibreOffice\program\soffice.exe'  # <-- FULL PATH
-            print("convert_office_to_pdf called, using soffice_cmd:", soffice_cmd)
-            
-            # Convert using LibreOffice
+            # Convert using the warm LibreOffice pool
             try:
-                result = subprocess.run([
-                    soffice_cmd,
-                    '--headless',
-                    '--convert-to', 'pdf',
-                    '--outdir', temp_dir,
-                    input_path
-                ], check=True, capture_output=True)
-            except subprocess.CalledProcessError as e:
+                output_path = await run_subprocess(get_office_pool().convert, input_path, temp_dir)
+            except OfficeConversionError as e:
                 raise HTTPException(
                     status_code=500,
-                    detail=f"LibreOffice conversion failed: {e.stderr.decode(errors='ignore')}"
+                    detail=f"LibreOffice conversion failed: {e}"
                 )
             except FileNotFoundError:
                 raise HTTPException(
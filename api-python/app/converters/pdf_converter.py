@@ -1,122 +1,188 @@
-import os
-import tempfile
 import zipfile
-from typing import BinaryIO, List
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Sequence, Tuple, Union
 import fitz  # PyMuPDF
 from docx import Document
 from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 from pptx import Presentation
 import io
+from src.pdf.render_engine import RenderError, RenderOptions, render_page, select_document_pages
+
+PDFInput = Union[BinaryIO, bytes, bytearray, memoryview]
+
+# output type -> file name inside a multi-output ZIP (images go under images/)
+OUTPUT_NAMES = {
+    'word': 'converted.docx',
+    'excel': 'converted.xlsx',
+    'powerpoint': 'converted.pptx',
+}
 
 class PDFConverter:
-    @staticmethod
-    def to_images(pdf_file: BinaryIO) -> bytes:
-        """Convert PDF to images using PyMuPDF and return as ZIP file."""
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            temp_pdf.write(pdf_file.read())
-            temp_pdf_path = temp_pdf.name
+    """
+    PDF conversions with PyMuPDF.
+
+    Documents are opened from memory and closed when the conversion ends. The
+    ``document_to_*`` methods work on an already open document, so several
+    outputs can share one parse (see ``to_many``).
+    """
 
+    @staticmethod
+    @contextmanager
+    def open_document(pdf_file: PDFInput) -> Iterator[fitz.Document]:
+        data = pdf_file if isinstance(pdf_file, (bytes, bytearray, memoryview)) else pdf_file.read()
+        try:
+            doc = fitz.open(stream=data, filetype="pdf")
+        except Exception as e:
+            raise RenderError(f"Failed to read PDF: {e}")
         try:
-            doc = fitz.open(temp_pdf_path)
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for i, page in enumerate(doc):
-                    pix = page.get_pixmap(dpi=200)
-                    img_bytes = pix.tobytes("png")
-                    zip_file.writestr(f'page_{i+1}.png', img_bytes)
-            return zip_buffer.getvalue()
+            yield doc
         finally:
-            os.unlink(temp_pdf_path)
+            doc.close()
 
     @staticmethod
-    def to_word(pdf_file: BinaryIO) -> bytes:
+    def document_to_images(doc: fitz.Document, pages: str = "all",
+                           options: RenderOptions = RenderOptions()) -> List[Tuple[str, bytes]]:
+        """Render the selected pages to ``(name, image bytes)`` entries."""
+        options.validate()
+        entries = []
+        for page_number in select_document_pages(doc, pages):
+            entries.extend(render_page(doc[page_number - 1], page_number, options))
+        return entries
+
+    @staticmethod
+    def to_images(pdf_file: PDFInput, pages: str = "all", options: RenderOptions = RenderOptions()) -> bytes:
+        """Convert the selected PDF pages to images and return them as a ZIP file."""
+        with PDFConverter.open_document(pdf_file) as doc:
+            entries = PDFConverter.document_to_images(doc, pages, options)
+        zip_buffer = io.BytesIO()
+        # PNG, JPEG and WebP are already compressed; storing them skips a second pass
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
+            for name, img_bytes in entries:
+                zip_file.writestr(name, img_bytes)
+        return zip_buffer.getvalue()
+
+    @staticmethod
+    def document_to_word(doc: fitz.Document) -> bytes:
+        word_doc = Document()
+
+        # Extract text from each page
+        for page in doc:
+            text = page.get_text()
+            word_doc.add_paragraph(text)
+
+        # Save to memory
+        docx_buffer = io.BytesIO()
+        word_doc.save(docx_buffer)
+        return docx_buffer.getvalue()
+
+    @staticmethod
+    def to_word(pdf_file: PDFInput) -> bytes:
         """Convert PDF to Word document."""
-        # Save PDF to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            temp_pdf.write(pdf_file.read())
-            temp_pdf_path = temp_pdf.name
+        with PDFConverter.open_document(pdf_file) as doc:
+            return PDFConverter.document_to_word(doc)
 
-        try:
-            # Open PDF
-            doc = fitz.open(temp_pdf_path)
-            word_doc = Document()
-
-            # Extract text from each page
-            for page in doc:
-                text = page.get_text()
-                word_doc.add_paragraph(text)
-
-            # Save to memory
-            docx_buffer = io.BytesIO()
-            word_doc.save(docx_buffer)
-            return docx_buffer.getvalue()
-        finally:
-            os.unlink(temp_pdf_path)
+    @staticmethod
+    def _excel_value(value):
+        # openpyxl refuses control characters that some PDFs carry in their text
+        return ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value
+
+    @staticmethod
+    def document_to_excel(doc: fitz.Document) -> bytes:
+        """
+        One sheet per detected table ("Page 3 Table 1"), or per page of text
+        ("Page 4") when a page has no tables. The write-only workbook streams
+        rows out as they are appended, so memory stays flat for large documents.
+        """
+        wb = Workbook(write_only=True)
+        sheet_count = 0
+
+        for page_number, page in enumerate(doc, start=1):
+            tables = page.find_tables().tables
+            if tables:
+                for table_number, table in enumerate(tables, start=1):
+                    ws = wb.create_sheet(title=f"Page {page_number} Table {table_number}")
+                    for row in table.extract():
+                        ws.append([PDFConverter._excel_value(cell) for cell in row])
+                    sheet_count += 1
+            else:
+                ws = wb.create_sheet(title=f"Page {page_number}")
+                # Each text line is a row; tab-separated text spreads over columns
+                for line in page.get_text().splitlines():
+                    ws.append([PDFConverter._excel_value(cell) for cell in line.split('\t')])
+                sheet_count += 1
+
+        if not sheet_count:
+            wb.create_sheet(title="PDF Content")
+
+        # Save to memory
+        xlsx_buffer = io.BytesIO()
+        wb.save(xlsx_buffer)
+        return xlsx_buffer.getvalue()
 
     @staticmethod
-    def to_excel(pdf_file: BinaryIO) -> bytes:
+    def to_excel(pdf_file: PDFInput) -> bytes:
         """Convert PDF to Excel spreadsheet."""
-        # Save PDF to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            temp_pdf.write(pdf_file.read())
-            temp_pdf_path = temp_pdf.name
+        with PDFConverter.open_document(pdf_file) as doc:
+            return PDFConverter.document_to_excel(doc)
 
-        try:
-            # Open PDF
-            doc = fitz.open(temp_pdf_path)
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "PDF Content"
-
-            # Extract text from each page
-            for i, page in enumerate(doc):
-                text = page.get_text()
-                # Split text into rows and add to Excel
-                rows = text.split('\n')
-                for row_idx, row in enumerate(rows):
-                    cells = row.split('\t')
-                    for col_idx, cell in enumerate(cells):
-                        ws.cell(row=row_idx + 1, column=col_idx + 1, value=cell)
-
-            # Save to memory
-            xlsx_buffer = io.BytesIO()
-            wb.save(xlsx_buffer)
-            return xlsx_buffer.getvalue()
-        finally:
-            os.unlink(temp_pdf_path)
+    @staticmethod
+    def document_to_powerpoint(doc: fitz.Document) -> bytes:
+        prs = Presentation()
+
+        # Convert each page to a slide
+        for page in doc:
+            # Create a new slide
+            slide_layout = prs.slide_layouts[6]  # Blank layout
+            slide = prs.slides.add_slide(slide_layout)
+
+            # Convert page to image
+            pix = page.get_pixmap()
+            img_data = pix.tobytes("png")
+
+            # Add image to slide
+            left = top = 0
+            width = prs.slide_width
+            height = prs.slide_height
+            slide.shapes.add_picture(io.BytesIO(img_data), left, top, width, height)
+
+        # Save to memory
+        pptx_buffer = io.BytesIO()
+        prs.save(pptx_buffer)
+        return pptx_buffer.getvalue()
 
     @staticmethod
-    def to_powerpoint(pdf_file: BinaryIO) -> bytes:
+    def to_powerpoint(pdf_file: PDFInput) -> bytes:
         """Convert PDF to PowerPoint presentation."""
-        # Save PDF to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            temp_pdf.write(pdf_file.read())
-            temp_pdf_path = temp_pdf.name
+        with PDFConverter.open_document(pdf_file) as doc:
+            return PDFConverter.document_to_powerpoint(doc)
 
-        try:
-            # Open PDF
-            doc = fitz.open(temp_pdf_path)
-            prs = Presentation()
-
-            # Convert each page to a slide
-            for page in doc:
-                # Create a new slide
-                slide_layout = prs.slide_layouts[6]  # Blank layout
-                slide = prs.slides.add_slide(slide_layout)
-
-                # Convert page to image
-                pix = page.get_pixmap()
-                img_data = pix.tobytes("png")
-
-                # Add image to slide
-                left = top = 0
-                width = prs.slide_width
-                height = prs.slide_height
-                slide.shapes.add_picture(io.BytesIO(img_data), left, top, width, height)
-
-            # Save to memory
-            pptx_buffer = io.BytesIO()
-            prs.save(pptx_buffer)
-            return pptx_buffer.getvalue()
-        finally:
-            os.unlink(temp_pdf_path) 
\ No newline at end of file
+    @staticmethod
+    def to_many(pdf_file: PDFInput, output_types: Sequence[str], pages: str = "all",
+                options: RenderOptions = RenderOptions()) -> bytes:
+        """
+        Produce every output in ``output_types`` from one parse of the PDF and
+        return them as a ZIP: converted.docx, converted.xlsx, converted.pptx
+        and images/page_N.png.
+        """
+        unknown = [output_type for output_type in output_types
+                   if output_type != 'image' and output_type not in OUTPUT_NAMES]
+        if unknown:
+            raise ValueError(f"Invalid output type: {', '.join(unknown)}")
+
+        outputs: Dict[str, bytes] = {}
+        with PDFConverter.open_document(pdf_file) as doc:
+            for output_type in output_types:
+                if output_type == 'image':
+                    for name, img_bytes in PDFConverter.document_to_images(doc, pages, options):
+                        outputs[f'images/{name}'] = img_bytes
+                else:
+                    converter = getattr(PDFConverter, f'document_to_{output_type}')
+                    outputs[OUTPUT_NAMES[output_type]] = converter(doc)
+
+        zip_buffer = io.BytesIO()
+        # Every output format is already compressed
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
+            for name, data in outputs.items():
+                zip_file.writestr(name, data)
+        return zip_buffer.getvalue()
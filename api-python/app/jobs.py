@@ -0,0 +1,95 @@
+"""
+Handlers for conversions that can run as background jobs (see core.jobs).
+
+Each handler runs in a Celery worker, or on the API's jobs pool in eager mode,
+and writes its result into the job's output directory. Handlers share the
+API process in eager mode, so GIL-bound work (PyMuPDF, workbook writing) is
+submitted to the cpu pool and the handler's thread only waits.
+"""
+import os
+import zipfile
+from typing import Callable, List, Tuple
+
+from core.config import get_settings
+from core.executors import CPU_POOL, get_executor
+from core.jobs import job_handler
+from core.libreoffice import get_office_pool
+from core.zipstream import compress_type_for
+from src.pdf.compress_engine import PRESETS, compress_pdf_file, compress_pdf_parallel
+from src.pdf.convert.to_excel import PDFToExcelConverter
+
+OFFICE_EXTENSIONS = {'.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods', '.odp', '.rtf'}
+
+
+def _zip_outputs(outputs: List[Tuple[str, str]], zip_path: str) -> str:
+    with zipfile.ZipFile(zip_path, 'w') as zip_file:
+        for name, path in outputs:
+            zip_file.write(path, name, compress_type=compress_type_for(name))
+    return zip_path
+
+
+def _single_or_zip(outputs: List[Tuple[str, str]], output_dir: str, media_type: str, zip_name: str):
+    if len(outputs) == 1:
+        name, path = outputs[0]
+        return path, name, media_type
+    return _zip_outputs(outputs, os.path.join(output_dir, zip_name)), zip_name, "application/zip"
+
+
+@job_handler("office-to-pdf")
+def office_to_pdf(inputs: List[Tuple[str, str]], params: dict, output_dir: str,
+                  progress: Callable[[float], None]):
+    pool = get_office_pool()
+    outputs = []
+    for i, (filename, input_path) in enumerate(inputs):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in OFFICE_EXTENSIONS:
+            raise ValueError(f"Unsupported file: {filename}")
+        # soffice picks the import filter from the extension
+        named_path = os.path.join(os.path.dirname(input_path), f"{i}{ext.lower()}")
+        os.replace(input_path, named_path)
+        file_dir = os.path.join(output_dir, str(i))
+        os.makedirs(file_dir)
+        outputs.append((f"{stem}.pdf", pool.convert(named_path, file_dir)))
+        progress((i + 1) / len(inputs))
+    return _single_or_zip(outputs, output_dir, "application/pdf", "converted_pdfs.zip")
+
+
+@job_handler("pdf-to-excel")
+def pdf_to_excel(inputs: List[Tuple[str, str]], params: dict, output_dir: str,
+                 progress: Callable[[float], None]):
+    if len(inputs) != 1:
+        raise ValueError("PDF to Excel takes exactly one file")
+    filename, input_path = inputs[0]
+    output_path = os.path.join(output_dir, "converted.xlsx")
+    if not PDFToExcelConverter().convert(input_path, output_path):
+        raise RuntimeError("PDF to Excel conversion failed")
+    return (output_path, f"{os.path.splitext(filename)[0]}.xlsx",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+@job_handler("compress-pdf")
+def compress_pdf(inputs: List[Tuple[str, str]], params: dict, output_dir: str,
+                 progress: Callable[[float], None]):
+    preset = params.get("preset", "recommended")
+    settings = get_settings()
+    backend = params.get("backend") or settings.COMPRESSION_BACKEND
+    target_bytes = params.get("target_bytes")
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset: {preset}")
+    outputs = []
+    for i, (filename, input_path) in enumerate(inputs):
+        output_path = os.path.join(output_dir, f"{i}.pdf")
+        if backend == "pymupdf" and target_bytes is None:
+            compress_pdf_parallel(input_path, output_path, preset, get_executor(CPU_POOL), settings.EXECUTOR_CPU_WORKERS,
+                                  settings.COMPRESSION_PAGES_PER_CHUNK, settings.COMPRESSION_PARALLEL_MIN_PAGES)
+        elif backend == "pymupdf":
+            # Target-size mode: PyMuPDF holds the GIL, so it runs in a worker process
+            get_executor(CPU_POOL).submit(compress_pdf_file, input_path, output_path, preset, backend,
+                                          target_bytes).result()
+        else:
+            # Ghostscript runs as a child process; this thread only waits on it
+            compress_pdf_file(input_path, output_path, preset, backend, target_bytes)
+        outputs.append((f"compressed_{filename}", output_path))
+        progress((i + 1) / len(inputs))
+    zip_path = _zip_outputs(outputs, os.path.join(output_dir, "compressed_pdfs.zip"))
+    return zip_path, "compressed_pdfs.zip", "application/zip"
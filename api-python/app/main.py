@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.tools.image import converter_router, bgremover_router
@@ -6,6 +7,14 @@ from app.routers.pdf_compression import router as pdf_compression_router
 from app.routers.pdf_to_any import router as pdf_to_any_router
 from app.routers.organize_pdf import router as organize_pdf_router
 from .routers import convert
+from .routers.jobs import router as jobs_router
+from core.libreoffice import shutdown_office_pool, warm_up_office_pool
+from core.executors import JVM_POOL, run_in_pool, run_inference, run_subprocess, shutdown_executors
+from core.config import get_settings
+from core.rembg_sessions import warm_up_rembg
+from core.tabula_jvm import warm_up_tabula
+from core.cache import get_result_cache
+from core.uploads import UploadLimitMiddleware
 
 # Import the word_to_pdf router
 # Using absolute import relative to the project root where 'src' is a package
@@ -13,6 +22,9 @@ from src.pdf.converters.word_to_pdf import router as word_to_pdf_router
 
 app = FastAPI()
 
+# Reject oversized uploads while they stream in (added first so CORS wraps its 413s)
+app.add_middleware(UploadLimitMiddleware)
+
 # Add CORS middleware for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -29,15 +41,47 @@ app.include_router(pdf_compression_router, prefix="/tools/pdf", tags=["tools"])
 app.include_router(pdf_to_any_router, prefix="/api/pdf", tags=["convert"])
 app.include_router(organize_pdf_router, prefix="/api/pdf", tags=["tools"])
 app.include_router(convert.router, prefix="/api", tags=["convert"])
+app.include_router(jobs_router, prefix="/api", tags=["jobs"])
 
 # Include the word_to_pdf router
 app.include_router(word_to_pdf_router, prefix="/api/pdf")
 
+@app.on_event("startup")
+async def start_office_pool():
+    # Warm the LibreOffice workers in the background so the first conversion
+    # skips soffice startup; a conversion that arrives first waits on the pool
+    asyncio.ensure_future(run_subprocess(warm_up_office_pool))
+
+@app.on_event("startup")
+async def start_rembg_warmup():
+    # Load the background removal model in the background; the first request
+    # waits on the same session instead of loading its own
+    if get_settings().REMBG_WARMUP:
+        asyncio.ensure_future(run_inference(warm_up_rembg))
+
+@app.on_event("startup")
+async def start_tabula_warmup():
+    # Eager jobs convert inside the API process: start tabula's JVM now so the
+    # first PDF to Excel job does not pay for it. Celery workers warm their own.
+    settings = get_settings()
+    if settings.TABULA_WARMUP and settings.JOBS_EAGER:
+        asyncio.ensure_future(run_in_pool(JVM_POOL, warm_up_tabula))
+
+@app.on_event("shutdown")
+async def stop_workers():
+    shutdown_office_pool()
+    shutdown_executors()
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return get_result_cache().stats()
+
 # You can add other root level endpoints here if needed
 # @app.get("/")
 # async def root():
 #     return {"message": "Welcome to AllKit API"}
-
-# @app.get("/health")
-# async g_check():
-#     return {"status": "healthy"} 
\ No newline at end of file
+ 
\ No newline at end of file
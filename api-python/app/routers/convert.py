@@ -1,18 +1,30 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from typing import Literal, List
+from contextlib import ExitStack
 from ..converters import image, office
 from fastapi.responses import StreamingResponse
 import io
-import zipfile
+from core.executors import map_bounded_iter
+from core.zipstream import zip_response
+from core.cache import cached_result, use_cache
+from core.uploads import upload_view
+from core.images import check_pixel_budget
 
 router = APIRouter()
 
 @router.post("/convert-to-pdf")
 async def convert_to_pdf(
     files: List[UploadFile] = File(...),
-    type: Literal['image', 'word', 'powerpoint', 'excel'] = Form(...)
+    type: Literal['image', 'word', 'powerpoint', 'excel'] = Form(...),
+    combine: bool = Form(False),
+    cache_enabled: bool = Depends(use_cache)
 ):
-    """Convert various file types to PDF. Supports single or multiple files."""
+    """
+    Convert various file types to PDF. Supports single or multiple files.
+
+    With ``combine``, images become the pages of one PDF instead of a ZIP of
+    single-page PDFs.
+    """
     try:
         if not files:
             raise HTTPException(status_code=400, detail="No files uploaded")
@@ -22,42 +34,62 @@ async def convert_to_pdf(
                     status_code=400,
                     detail=f"File {file.filename} size must be less than 50MB"
                 )
-        pdf_results = []
-        for file in files:
-            if type == 'image':
-                pdf_bytes = await image.convert_image_to_pdf(file)
-            elif type in ['word', 'powerpoint', 'excel']:
-                pdf_bytes = await office.convert_office_to_pdf(file, type)
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported conversion type: {type}"
+        if type not in ['image', 'word', 'powerpoint', 'excel']:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported conversion type: {type}"
+            )
+        if combine and type != 'image':
+            raise HTTPException(status_code=400, detail="Only images can be combined into one PDF")
+        if type == 'image':
+            check_pixel_budget(files)
+
+        if combine:
+            with ExitStack() as stack:
+                sources = [stack.enter_context(upload_view(file)) for file in files]
+                pdf_bytes = await cached_result(
+                    "convert-to-pdf", sources, {"type": type, "combine": True},
+                    lambda: image.convert_images_to_pdf(files), enabled=cache_enabled
                 )
-            pdf_results.append((file.filename, pdf_bytes))
+            return StreamingResponse(
+                io.BytesIO(pdf_bytes),
+                media_type="application/pdf",
+                headers={
+                    "Content-Disposition": "attachment; filename=images.pdf"
+                }
+            )
+
+        async def convert_file(file: UploadFile):
+            async def convert():
+                if type == 'image':
+                    return await image.convert_image_to_pdf(file)
+                return await office.convert_office_to_pdf(file, type)
+
+            with upload_view(file) as contents:
+                pdf_bytes = await cached_result(
+                    "convert-to-pdf", [contents], {"type": type}, convert, enabled=cache_enabled
+                )
+            return file.filename, pdf_bytes
+
         # If only one file, return PDF directly
-        if len(pdf_results) == 1:
-            filename = pdf_results[0][0].rsplit('.', 1)[0] + '.pdf'
+        if len(files) == 1:
+            orig_name, pdf_bytes = await convert_file(files[0])
+            filename = orig_name.rsplit('.', 1)[0] + '.pdf'
             return StreamingResponse(
-                io.BytesIO(pdf_results[0][1]),
+                io.BytesIO(pdf_bytes),
                 media_type="application/pdf",
                 headers={
                     "Content-Disposition": f"attachment; filename={filename}"
                 }
             )
-        # If multiple files, return ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w") as zipf:
-            for orig_name, pdf_bytes in pdf_results:
-                pdf_name = orig_name.rsplit('.', 1)[0] + '.pdf'
-                zipf.writestr(pdf_name, pdf_bytes)
-        zip_buffer.seek(0)
-        return StreamingResponse(
-            zip_buffer,
-            media_type="application/zip",
-            headers={
-                "Content-Disposition": "attachment; filename=converted_pdfs.zip"
-            }
-        )
+
+        # If multiple files, stream a ZIP; files convert concurrently and
+        # entries are sent in upload order as soon as each is ready
+        async def pdf_entries():
+            async for orig_name, pdf_bytes in map_bounded_iter(convert_file, files):
+                yield orig_name.rsplit('.', 1)[0] + '.pdf', pdf_bytes
+
+        return await zip_response(pdf_entries(), "converted_pdfs.zip")
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+from typing import List
+import json
+import os
+from core.executors import run_io
+from core.jobs import FINISHED, SUCCEEDED, enqueue_job, get_job_store, job_tools
+from core.uploads import spool_to_path
+import app.jobs  # noqa: F401 - registers the job handlers
+
+router = APIRouter()
+
+def _job_status(job: dict) -> dict:
+    status = {key: job[key] for key in ("id", "tool", "status", "progress", "files", "error", "created_at", "updated_at")}
+    if job["status"] == SUCCEEDED:
+        status["result_url"] = f"/api/jobs/{job['id']}/result"
+    return status
+
+@router.post("/jobs/{tool}", status_code=202)
+async def submit_job(
+    tool: str,
+    files: List[UploadFile] = File(...),
+    params: str = Form("{}")
+):
+    if tool not in job_tools():
+        raise HTTPException(status_code=404, detail=f"Unknown job tool: {tool}. Available: {', '.join(job_tools())}")
+    try:
+        job_params = json.loads(params)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="params must be a JSON object")
+    if not isinstance(job_params, dict):
+        raise HTTPException(status_code=400, detail="params must be a JSON object")
+
+    store = get_job_store()
+    await run_io(store.purge_expired)
+    job = await run_io(store.create, tool, [file.filename for file in files], job_params)
+    for i, file in enumerate(files):
+        await spool_to_path(file, store.input_path(job["id"], i))
+    enqueue_job(job["id"])
+
+    return JSONResponse(
+        status_code=202,
+        content={**_job_status(job), "status_url": f"/api/jobs/{job['id']}"}
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_io(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await run_io(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    if job["status"] != SUCCEEDED or not os.path.exists(job["result"]["path"]):
+        raise HTTPException(status_code=410, detail=job["error"] or "Job result is no longer available")
+    result = job["result"]
+    return FileResponse(result["path"], media_type=result["media_type"], filename=result["filename"])
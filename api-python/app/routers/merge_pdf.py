@@ -1,64 +1,125 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from fastapi.responses import StreamingResponse
-from PyPDF2 import PdfMerger
+from contextlib import ExitStack
+from tempfile import SpooledTemporaryFile
+from typing import Optional
 import io
+import json
 import tempfile
-import os
+from core.config import get_settings
+from core.executors import run_cpu, run_io, run_native
+from core.cache import cached_result, use_cache
+from core.uploads import iter_file, process_path, upload_view, worker_source
+from src.pdf.merge_engine import BACKENDS, merge_pdf_files, merge_pdfs
 
 router = APIRouter()
 
+def _merge_to_spool(sources, backend: str, page_ranges) -> SpooledTemporaryFile:
+    # Small results stay in memory; large ones roll over to an anonymous temp file
+    output = SpooledTemporaryFile(max_size=get_settings().MERGE_SPOOL_MAX_BYTES)
+    try:
+        merge_pdfs(sources, output, backend, page_ranges)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+async def _merge_on_cpu_pool(files, sources, backend: str, page_ranges):
+    """
+    PyMuPDF holds the GIL while it merges, so it runs in a worker process. The
+    worker reads the uploads' own spools and writes to an anonymous temporary
+    file through process_path(); nothing is spooled to named temp files.
+    Returns None when the uploads cannot be shared with the pool.
+    """
+    worker_sources = [worker_source(file, view) for file, view in zip(files, sources)]
+    output = tempfile.TemporaryFile()
+    output_path = process_path(output)
+    if output_path is None or any(source is None for source in worker_sources):
+        output.close()
+        return None
+    try:
+        await run_cpu(merge_pdf_files, worker_sources, output_path, backend, page_ranges)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+def _parse_page_ranges(pageRanges: Optional[str], file_count: int):
+    if not pageRanges:
+        return None
+    try:
+        page_ranges = json.loads(pageRanges)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="pageRanges must be a JSON list")
+    if (not isinstance(page_ranges, list) or len(page_ranges) != file_count
+            or not all(r is None or isinstance(r, str) for r in page_ranges)):
+        raise HTTPException(status_code=400, detail="pageRanges must list one range string (or null) per file")
+    return page_ranges
+
 @router.post("/merge-pdf")
-async def merge_pdf(files: list[UploadFile] = File(...)):
+async def merge_pdf(
+    files: list[UploadFile] = File(...),
+    pageRanges: Optional[str] = Form(None),
+    backend: Optional[str] = Form(None),
+    cache_enabled: bool = Depends(use_cache)
+):
     if len(files) < 2:
         raise HTTPException(status_code=400, detail="At least 2 PDF files are required")
-    
+
     # Validate that all files are PDFs
     for file in files:
         if not file.content_type == "application/pdf":
             raise HTTPException(status_code=400, detail=f"File {file.filename} is not a PDF")
-    
+
+    backend = backend or get_settings().MERGE_BACKEND
+    if backend not in BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown backend {backend}. Available: {', '.join(BACKENDS)}")
+    page_ranges = _parse_page_ranges(pageRanges, len(files))
+
     try:
-        merger = PdfMerger()
-        
-        # Create temporary files to store the uploaded PDFs
-        temp_files = []
-        for file in files:
-            content = await file.read()
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_file.write(content)
-            temp_file.close()
-            temp_files.append(temp_file.name)
-        
-        # Merge PDFs
-        for temp_file in temp_files:
-            merger.append(temp_file)
-        
-        # Create output buffer
-        output_buffer = io.BytesIO()
-        merger.write(output_buffer)
-        merger.close()
-        
-        # Clean up temporary files
-        for temp_file in temp_files:
-            os.unlink(temp_file)
-        
-        # Reset buffer position
-        output_buffer.seek(0)
-        
+        with ExitStack() as stack:
+            sources = [stack.enter_context(upload_view(file)) for file in files]
+
+            async def merge():
+                if backend == "pymupdf":
+                    output = await _merge_on_cpu_pool(files, sources, backend, page_ranges)
+                    if output is not None:
+                        return output
+                # qpdf (and PyMuPDF where the pool cannot share the uploads)
+                # works on the upload views directly, on threads
+                return await run_native(_merge_to_spool, sources, backend, page_ranges)
+
+            # The cache stores whole results, so only merges of bounded size use it;
+            # larger ones stream straight from the spool
+            if cache_enabled and sum(view.nbytes for view in sources) <= get_settings().MERGE_CACHE_MAX_BYTES:
+                async def compute_bytes():
+                    output = await merge()
+                    try:
+                        return await run_io(output.read)
+                    finally:
+                        output.close()
+
+                merged = await cached_result(
+                    "merge-pdf", sources, {"backend": backend, "page_ranges": page_ranges},
+                    compute_bytes, enabled=cache_enabled
+                )
+                output = io.BytesIO(merged)
+            else:
+                output = await merge()
+
         # Return merged PDF
         return StreamingResponse(
-            output_buffer,
+            iter_file(output),
             media_type="application/pdf",
             headers={
                 "Content-Disposition": "attachment; filename=merged.pdf"
             }
         )
-        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        # Clean up temporary files in case of error
-        for temp_file in temp_files:
-            try:
-                os.unlink(temp_file)
-            except:
-                pass
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
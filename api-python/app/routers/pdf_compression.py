@@ -1,80 +1,146 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
+import json
+import logging
 import os
 import tempfile
-from typing import Literal
-import subprocess
-import shutil
-import zipfile
-import io
+import time
+from typing import Literal, Optional
+from core.config import get_settings
+from core.executors import run_cpu, run_io, run_subprocess, map_bounded, map_bounded_iter
+from core.cache import cached_result, use_cache
+from core.zipstream import zip_response
+from core.uploads import upload_view, spool_to_path
+from src.pdf.compress_engine import (
+    BACKENDS, PRESETS, compress_chunk, compress_pdf_file, find_ghostscript, join_pdfs, parallel_stats, split_pdf
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Ghostscript PDFSETTINGS mapping
-GHOSTSCRIPT_PRESETS = {
-    "extreme": "/screen",        # lowest quality, smallest size
-    "recommended": "/ebook",     # good quality, small size
-    "less": "/printer"           # high quality, larger size
-}
+REPORT_NAME = "compression_report.json"
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+async def compress_parallel(input_path: str, output_path: str, preset: str, min_pages: int) -> dict:
+    """
+    Compress with pymupdf in page-range chunks, every step a task on the cpu
+    pool; see compress_engine.compress_pdf_parallel.
+    """
+    settings = get_settings()
+    start_time = time.perf_counter()
+    chunk_dir = os.path.join(os.path.dirname(output_path), 'chunks')
+    os.makedirs(chunk_dir)
+    chunk_paths = await run_cpu(
+        split_pdf, input_path, chunk_dir, settings.EXECUTOR_CPU_WORKERS,
+        settings.COMPRESSION_PAGES_PER_CHUNK, min_pages
+    )
+    if not chunk_paths:
+        stats = await run_cpu(compress_pdf_file, input_path, output_path, preset, "pymupdf")
+        stats["chunks"] = 1
+        return stats
+    compressed_paths = await map_bounded(
+        lambda chunk_path: run_cpu(compress_chunk, chunk_path, preset), chunk_paths,
+        limit=settings.EXECUTOR_CPU_WORKERS
+    )
+    await run_cpu(join_pdfs, input_path, compressed_paths, output_path)
+    return await run_io(parallel_stats, input_path, output_path, preset, len(chunk_paths), start_time)
+
+async def compress_upload(file: UploadFile, preset: str, backend: str, target_bytes: Optional[int] = None,
+                          parallel: Optional[bool] = None):
+    """
+    Compress one upload and return (compressed bytes, stats).
+
+    ``parallel`` splits pymupdf preset runs into page-range chunks on the cpu
+    pool: None does so for inputs of COMPRESSION_PARALLEL_MIN_PAGES or more.
+    """
+    settings = get_settings()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = await spool_to_path(file, os.path.join(temp_dir, 'input.pdf'))
+        output_path = os.path.join(temp_dir, 'output.pdf')
+        if backend == "ghostscript":
+            # Ghostscript runs as a child process; the thread only waits on it
+            stats = await run_subprocess(compress_pdf_file, input_path, output_path, preset, backend)
+        elif target_bytes is None and parallel is not False:
+            min_pages = 0 if parallel else settings.COMPRESSION_PARALLEL_MIN_PAGES
+            stats = await compress_parallel(input_path, output_path, preset, min_pages)
+        else:
+            stats = await run_cpu(compress_pdf_file, input_path, output_path, preset, backend, target_bytes)
+        return await run_io(_read_file, output_path), stats
 
 @router.post("/compress-pdf")
 async def compress_pdf(
     files: list[UploadFile] = File(...),
-    preset: Literal["extreme", "recommended", "less"] = Form("recommended")
+    preset: Literal["extreme", "recommended", "less"] = Form("recommended"),
+    backend: Optional[str] = Form(None),
+    target_bytes: Optional[int] = Form(None),
+    parallel: Optional[bool] = Form(None),
+    cache_enabled: bool = Depends(use_cache)
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
     for file in files:
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    backend = backend or get_settings().COMPRESSION_BACKEND
+    if backend not in BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown backend {backend}. Available: {', '.join(BACKENDS)}")
+    if backend == "ghostscript" and find_ghostscript() is None:
+        raise HTTPException(status_code=400, detail="Ghostscript is not installed on this server")
+    if target_bytes is not None:
+        # Target-size mode searches per-image settings in-process; it replaces the preset
+        if target_bytes <= 0:
+            raise HTTPException(status_code=400, detail="target_bytes must be positive")
+        if backend != "pymupdf":
+            raise HTTPException(status_code=400, detail="target_bytes is only supported by the pymupdf backend")
+
+    async def compress_file(file: UploadFile):
+        start_time = time.perf_counter()
+        stats = {}
+
+        async def compress():
+            compressed, file_stats = await compress_upload(file, preset, backend, target_bytes, parallel)
+            stats.update(file_stats)
+            return compressed
+
+        report = {"filename": file.filename, "backend": backend, "preset": preset}
+        if target_bytes is not None:
+            report["target_bytes"] = target_bytes
+        # parallel changes how chunks are compressed, so it is part of the key
+        params = {"preset": preset, "backend": backend, "target_bytes": target_bytes, "parallel": parallel}
+        try:
+            with upload_view(file) as content:
+                original_size = len(content)
+                compressed = await cached_result("compress-pdf", [content], params, compress, enabled=cache_enabled)
+        except Exception as e:
+            logger.error(f"Compression failed for {file.filename}: {e}")
+            report.update(status="failed", error=str(e), seconds=round(time.perf_counter() - start_time, 3))
+            return None, report
+
+        report.update(
+            status="compressed",
+            original_size=original_size,
+            compressed_size=len(compressed),
+            ratio=round(len(compressed) / original_size, 3) if original_size else 1.0,
+            kept_original=stats.get("kept_original", False),
+            chunks=stats.get("chunks", 1),
+            cached=not stats,
+            seconds=round(time.perf_counter() - start_time, 3),
+        )
+        if target_bytes is not None:
+            report["target_met"] = len(compressed) <= target_bytes
+        return (f"compressed_{file.filename}", compressed), report
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w") as zipf:
-        for file in files:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as input_file:
-                content = await file.read()
-                input_file.write(content)
-                input_file.flush()
-                input_path = input_file.name
+    async def compressed_entries():
+        # Compress files concurrently; entries stream out in upload order,
+        # followed by a per-file report of sizes, timings and failures
+        reports = []
+        async for entry, report in map_bounded_iter(compress_file, files):
+            reports.append(report)
+            if entry is not None:
+                yield entry
+        yield REPORT_NAME, json.dumps({"files": reports}, indent=2).encode()
 
-            output_path = input_path.replace('.pdf', '_compressed.pdf')
-            gs_preset = GHOSTSCRIPT_PRESETS.get(preset, "/ebook")
-            gs_command = [
-                "gswin64c",
-                "-sDEVICE=pdfwrite",
-                "-dCompatibilityLevel=1.4",
-                f"-dPDFSETTINGS={gs_preset}",
-                "-dNOPAUSE",
-                "-dQUIET",
-                "-dBATCH",
-                f"-sOutputFile={output_path}",
-                input_path
-            ]
-            try:
-                result = subprocess.run(gs_command, capture_output=True, text=True)
-                print(f"Ghostscript stdout for {file.filename}:", result.stdout)
-                print(f"Ghostscript stderr for {file.filename}:", result.stderr)
-                if result.returncode != 0:
-                    raise Exception(f"Ghostscript failed: {result.stderr}")
-                if not os.path.exists(output_path):
-                    raise Exception("Output PDF not created!")
-                # Add compressed file to zip
-                zipf.write(output_path, arcname=f"compressed_{file.filename}")
-            except Exception as e:
-                print(f"Ghostscript error for {file.filename}:", str(e))
-            finally:
-                try:
-                    os.unlink(input_path)
-                except:
-                    pass
-                try:
-                    if os.path.exists(output_path):
-                        os.unlink(output_path)
-                except:
-                    pass
-    zip_buffer.seek(0)
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": "attachment; filename=compressed_pdfs.zip"}
-    ) 
\ No newline at end of file
+    return await zip_response(compressed_entries(), "compressed_pdfs.zip")
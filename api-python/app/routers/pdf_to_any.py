@@ -1,49 +1,156 @@
-from fastapi import APIRouter, UploadFile, HTTPException
+from fastapi import APIRouter, UploadFile, HTTPException, Depends, Query
 from fastapi.responses import StreamingResponse
 from ..converters.pdf_converter import PDFConverter
 import io
+import os
+import shutil
+import tempfile
+from typing import List
+from core.config import get_settings
+from core.executors import run_cpu, map_bounded_iter
+from core.cache import cached_result, use_cache
+from core.uploads import process_path, spool_to_path, upload_view, worker_source
+from core.zipstream import zip_response
+from src.pdf.render_engine import RenderError, RenderOptions, page_batches, render_pages, select_pages
 
 router = APIRouter()
 
+# output_type -> (converter, media type, download filename)
+OUTPUT_TYPES = {
+    'image': (PDFConverter.to_images, 'application/zip', 'converted_images.zip'),
+    'word': (PDFConverter.to_word, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'converted.docx'),
+    'excel': (PDFConverter.to_excel, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'converted.xlsx'),
+    'powerpoint': (PDFConverter.to_powerpoint, 'application/vnd.openxmlformats-officedocument.presentationml.presentation', 'converted.pptx'),
+}
+
+def _convert_source(converter, source, *args) -> bytes:
+    # The converter parses the bytes in memory; a path only carries the upload to the worker
+    if isinstance(source, str):
+        with open(source, 'rb') as pdf_file:
+            source = pdf_file.read()
+    return converter(source, *args)
+
+async def _convert_upload(converter, file: UploadFile, content: memoryview, *args) -> bytes:
+    # Hand the worker process the upload's own spool by path rather than
+    # pickling a large upload; without /proc the bytes are sent instead
+    source = worker_source(file, content)
+    if source is None:
+        source = bytes(content)
+    return await run_cpu(_convert_source, converter, source, *args)
+
+def _output_types(values: List[str]) -> List[str]:
+    """Accept repeated and comma-separated output_type values, in order, without duplicates."""
+    output_types = []
+    for value in values:
+        for output_type in value.split(','):
+            output_type = output_type.strip()
+            if output_type and output_type not in output_types:
+                output_types.append(output_type)
+    return output_types
+
+async def _image_entries(source, page_numbers, options: RenderOptions, cleanup):
+    """Render page batches on the cpu pool and yield the images in page order as they finish."""
+    settings = get_settings()
+    try:
+        batches = page_batches(page_numbers, settings.RENDER_BATCH_PAGES)
+        async for entries in map_bounded_iter(
+            lambda batch: run_cpu(render_pages, source, batch, options), batches,
+            limit=settings.EXECUTOR_CPU_WORKERS * 2
+        ):
+            for entry in entries:
+                yield entry
+    finally:
+        cleanup()
+
+async def _render_source(file: UploadFile):
+    """
+    The upload in a form render workers can read while the ZIP streams, and
+    the cleanup to run once it has been sent: small uploads as bytes, rolled
+    spools through a duplicate descriptor that stays open whatever happens to
+    the upload, and a temp file copy where /proc is not available.
+    """
+    with upload_view(file) as view:
+        source = worker_source(file, view)
+    if isinstance(source, bytes):
+        return source, lambda: None
+    if source is not None:
+        duplicate = os.fdopen(os.dup(file.file.fileno()), 'rb')
+        return process_path(duplicate), duplicate.close
+    temp_dir = tempfile.mkdtemp()
+    try:
+        input_path = await spool_to_path(file, os.path.join(temp_dir, 'input.pdf'))
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    return input_path, lambda: shutil.rmtree(temp_dir, ignore_errors=True)
+
+async def convert_to_images(file: UploadFile, pages: str, options: RenderOptions):
+    """Stream the selected pages as a ZIP of images, without holding the whole archive."""
+    try:
+        options.validate()
+    except RenderError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    source, cleanup = await _render_source(file)
+    try:
+        page_numbers = await run_cpu(select_pages, source, pages)
+        return await zip_response(_image_entries(source, page_numbers, options, cleanup), 'converted_images.zip')
+    except RenderError as e:
+        cleanup()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        cleanup()
+        raise
+
 @router.post("/pdf-to-any")
-async def convert_pdf(file: UploadFile, output_type: str):
+async def convert_pdf(
+    file: UploadFile,
+    output_type: List[str] = Query(...),
+    pages: str = "all",
+    dpi: int = 200,
+    image_format: str = "png",
+    quality: int = 85,
+    cache_enabled: bool = Depends(use_cache)
+):
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
+    output_types = _output_types(output_type)
+    if not output_types or any(output_type not in OUTPUT_TYPES for output_type in output_types):
+        raise HTTPException(status_code=400, detail="Invalid output type")
+    settings = get_settings()
+    options = RenderOptions(dpi, image_format, quality, settings.RENDER_TILE_SIZE, settings.RENDER_MAX_PAGE_PIXELS)
+
+    if output_types == ['image']:
+        # Images stream page by page as they are rendered. They bypass the result
+        # cache: the cache stores whole results, and buffering the archive to
+        # store it would undo the streaming
+        return await convert_to_images(file, pages, options)
+
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Convert based on output type
-        if output_type == 'image':
-            result = PDFConverter.to_images(io.BytesIO(content))
-            return StreamingResponse(
-                io.BytesIO(result),
-                media_type='application/zip',
-                headers={'Content-Disposition': 'attachment; filename=converted_images.zip'}
-            )
-        elif output_type == 'word':
-            result = PDFConverter.to_word(io.BytesIO(content))
-            return StreamingResponse(
-                io.BytesIO(result),
-                media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                headers={'Content-Disposition': 'attachment; filename=converted.docx'}
-            )
-        elif output_type == 'excel':
-            result = PDFConverter.to_excel(io.BytesIO(content))
-            return StreamingResponse(
-                io.BytesIO(result),
-                media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                headers={'Content-Disposition': 'attachment; filename=converted.xlsx'}
-            )
-        elif output_type == 'powerpoint':
-            result = PDFConverter.to_powerpoint(io.BytesIO(content))
-            return StreamingResponse(
-                io.BytesIO(result),
-                media_type='application/vnd.openxmlformats-officedocument.presentationml.presentation',
-                headers={'Content-Disposition': 'attachment; filename=converted.pptx'}
-            )
+        if len(output_types) == 1:
+            converter, media_type, filename = OUTPUT_TYPES[output_types[0]]
+            args = ()
+            params = {"output_type": output_types[0]}
         else:
-            raise HTTPException(status_code=400, detail="Invalid output type")
+            # Several outputs: one parse of the document produces all of them, in one ZIP
+            options.validate()
+            converter, media_type, filename = PDFConverter.to_many, 'application/zip', 'converted.zip'
+            args = (output_types, pages, options)
+            params = {"output_types": output_types, "pages": pages, "options": options._asdict()}
+
+        with upload_view(file) as content:
+            result = await cached_result(
+                "pdf-to-any", [content], params,
+                lambda: _convert_upload(converter, file, content, *args), enabled=cache_enabled
+            )
+        return StreamingResponse(
+            io.BytesIO(result),
+            media_type=media_type,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    except HTTPException:
+        raise
+    except RenderError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,90 +1,132 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
-from rembg import remove
-from PIL import Image
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from PIL import Image, ImageOps
 import io
-import zipfile
-import tempfile
 import os
-from typing import List, Optional
+from contextlib import ExitStack
+from typing import BinaryIO, List, Optional
 import base64
+from rembg.bg import naive_cutout
+from core.executors import run_inference, run_io, map_bounded_iter
+from core.zipstream import zip_response
+from core.config import get_settings
+from core.cache import ResultCache, use_cache
+from core.uploads import upload_view
+from core.rembg_sessions import get_mask_cache, predict_masks, predict_masks_fast
+from core.images import check_pixel_budget
 
 router = APIRouter()
 
-async def process_image(file: UploadFile, bg_color: Optional[str] = None) -> io.BytesIO:
-    try:
-        # Read image file
-        contents = await file.read()
-        input_image = Image.open(io.BytesIO(contents)).convert("RGBA")
-        
-        # Remove background
-        output_image = remove(input_image)
-        
-        # Add background color if specified
-        if bg_color and bg_color.lower() != 'transparent':
-            bg_color_rgba = tuple(int(bg_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4)) + (255,)
-            bg = Image.new("RGBA", output_image.size, bg_color_rgba)
-            bg.paste(output_image, mask=output_image.split()[3])
-            output_image = bg
-        
+# "full" segments the photo at full resolution; "fast" segments a copy of at
+# most REMBG_FAST_MAX_SIDE pixels and upsamples the mask with edge refinement
+MODES = ("full", "fast")
+
+def _mask_keys(sources: List[memoryview], mode: str = "full") -> List[str]:
+    model = get_settings().REMBG_MODEL
+    return [ResultCache.make_key("rembg-mask", [source], {"model": model, "mode": mode}) for source in sources]
+
+def _composite(image: Image.Image, mask: Image.Image, bg_color: Optional[str] = None) -> Image.Image:
+    if bg_color and bg_color.lower() != 'transparent':
+        # One blend of the image over a solid background, weighted by the mask
+        bg_color_rgba = tuple(int(bg_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4)) + (255,)
+        return Image.composite(image, Image.new("RGBA", image.size, bg_color_rgba), mask)
+    return naive_cutout(image, mask)
+
+def _remove_backgrounds(sources: List[BinaryIO], bg_color: Optional[str] = None,
+                        mask_keys: Optional[List[str]] = None, mode: str = "full") -> List[bytes]:
+    input_images = []
+    for source in sources:
+        source.seek(0)
+        input_images.append(ImageOps.exif_transpose(Image.open(source)).convert("RGBA"))
+
+    # Reuse cached masks; only images seen for the first time go through the model,
+    # several per model run where the model allows it
+    cache = get_mask_cache()
+    masks = [cache.get(key) for key in mask_keys] if mask_keys else [None] * len(input_images)
+    missing = [i for i, mask in enumerate(masks) if mask is None]
+    if missing:
+        predict = predict_masks_fast if mode == "fast" else predict_masks
+        for i, mask in zip(missing, predict([input_images[i] for i in missing])):
+            masks[i] = mask
+            if mask_keys:
+                cache.put(mask_keys[i], mask)
+
+    results = []
+    for image, mask in zip(input_images, masks):
         # Save to bytes
         img_byte_arr = io.BytesIO()
-        output_image.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        return img_byte_arr
+        _composite(image, mask, bg_color).save(img_byte_arr, format='PNG')
+        results.append(img_byte_arr.getvalue())
+    return results
+
+async def process_images(files: List[UploadFile], bg_color: Optional[str] = None,
+                         cache_enabled: bool = True, mode: str = "full") -> List[io.BytesIO]:
+    try:
+        mask_keys = None
+        if cache_enabled:
+            with ExitStack() as stack:
+                sources = [stack.enter_context(upload_view(file)) for file in files]
+                mask_keys = await run_io(_mask_keys, sources, mode)
+        # Decode straight from the upload spools; onnxruntime releases the GIL,
+        # so inference runs on a thread pool
+        results = await run_inference(_remove_backgrounds, [file.file for file in files], bg_color, mask_keys, mode)
+        return [io.BytesIO(result) for result in results]
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
 
+async def _zip_entries(files: List[UploadFile], bg_color: Optional[str], suffix: str,
+                       cache_enabled: bool = True, mode: str = "full"):
+    # Group uploads into model batches; batches run concurrently and their
+    # images are streamed into the ZIP in upload order
+    batch_size = get_settings().REMBG_BATCH_SIZE
+    batches = [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+
+    async def process_batch(batch: List[UploadFile]):
+        outputs = await process_images(batch, bg_color, cache_enabled, mode)
+        return [
+            (f"{os.path.splitext(file.filename)[0]}{suffix}.png", output.getvalue())
+            for file, output in zip(batch, outputs)
+        ]
+
+    async for entries in map_bounded_iter(process_batch, batches):
+        for entry in entries:
+            yield entry
+
+def _check_mode(mode: str):
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode {mode}. Available: {', '.join(MODES)}")
+
 @router.post("/remove-background")
 async def remove_background(
     files: List[UploadFile] = File(...),
-    bg_color: Optional[str] = Form(None)
+    bg_color: Optional[str] = Form(None),
+    mode: str = Form("full"),
+    cache_enabled: bool = Depends(use_cache)
 ):
     try:
         if not files or len(files) == 0:
             raise HTTPException(status_code=400, detail="No files uploaded")
+        _check_mode(mode)
+        check_pixel_budget(files)
 
-        # Create a ZIP file in memory
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for file in files:
-                # Process each image
-                img_byte_arr = await process_image(file, bg_color)
-                
-                # Add to ZIP with original filename (but .png extension)
-                filename = os.path.splitext(file.filename)[0] + '.png'
-                zip_file.writestr(filename, img_byte_arr.getvalue())
-
-        # Prepare ZIP for download
-        zip_buffer.seek(0)
-        return StreamingResponse(
-            zip_buffer,
-            media_type="application/zip",
-            headers={"Content-Disposition": "attachment; filename=transparent-images.zip"}
-        )
+        # Add to ZIP with original filename (but .png extension)
+        return await zip_response(_zip_entries(files, bg_color, '', cache_enabled, mode), "transparent-images.zip")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/download-zip")
 async def download_zip(
     files: List[UploadFile] = File(...),
-    bg_color: Optional[str] = Form(None)
+    bg_color: Optional[str] = Form(None),
+    mode: str = Form("full"),
+    cache_enabled: bool = Depends(use_cache)
 ):
     try:
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            zip_path = os.path.join(tmpdirname, 'images.zip')
-            with zipfile.ZipFile(zip_path, 'w') as zipf:
-                for file in files:
-                    img_byte_arr = await process_image(file, bg_color)
-                    zipf.writestr(
-                        f"{os.path.splitext(file.filename)[0]}_processed.png",
-                        img_byte_arr.getvalue()
-                    )
-            
-            return StreamingResponse(
-                open(zip_path, 'rb'),
-                media_type='application/zip',
-                headers={'Content-Disposition': 'attachment; filename=images.zip'}
-            )
+        _check_mode(mode)
+        check_pixel_budget(files)
+        return await zip_response(_zip_entries(files, bg_color, '_processed', cache_enabled, mode), "images.zip")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -1,50 +1,87 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from PIL import Image
 import io
-import zipfile
-import tempfile
 import os
+import shutil
+import tempfile
 from typing import List, Optional
+from core.executors import run_cpu, map_bounded_iter
+from core.cache import cached_result, use_cache
+from core.zipstream import zip_response
+from core.uploads import upload_view, spool_to_path
+from core.images import check_pixel_budget, is_large, resize_in_strips
 
 router = APIRouter()
 
+# Downscales first shrink by an integer factor with reduce() while the image is
+# at least this many times the target size, then finish with LANCZOS
+REDUCING_GAP = 3.0
+
+def _convert_image(path: str, output_format: str, quality: int, scale: int) -> bytes:
+    with Image.open(path) as img:
+        # Resize if needed
+        if scale != 100:
+            new_size = (max(1, int(img.width * scale / 100)), max(1, int(img.height * scale / 100)))
+            reducing_gap = None
+            if scale < 100:
+                # JPEGs decode straight to 1/2, 1/4 or 1/8 size (never below the
+                # target), so pixels that would be thrown away are never decoded
+                img.draft(None, new_size)
+                reducing_gap = REDUCING_GAP
+            if is_large(img):
+                # Resample in strips: no full-height intermediate bitmap. The
+                # source itself is decoded whole; the pixel budget bounds it
+                img = resize_in_strips(img, new_size, Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+            else:
+                img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+        
+        # Convert and save
+        output = io.BytesIO()
+        img.save(output, format=output_format.upper(), quality=quality)
+        return output.getvalue()
+
 @router.post("/convert")
 async def convert_images(
     files: List[UploadFile] = File(...),
     output_format: str = Form(...),
     quality: int = Form(80),
-    scale: int = Form(100)
+    scale: int = Form(100),
+    cache_enabled: bool = Depends(use_cache)
 ):
     try:
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            zip_path = os.path.join(tmpdirname, 'converted_images.zip')
-            with zipfile.ZipFile(zip_path, 'w') as zipf:
-                for file in files:
-                    # Read image
-                    contents = await file.read()
-                    img = Image.open(io.BytesIO(contents))
-                    
-                    # Resize if needed
-                    if scale != 100:
-                        new_size = (int(img.width * scale / 100), int(img.height * scale / 100))
-                        img = img.resize(new_size, Image.Resampling.LANCZOS)
-                    
-                    # Convert and save
-                    output = io.BytesIO()
-                    img.save(output, format=output_format.upper(), quality=quality)
-                    output.seek(0)
-                    
-                    # Add to zip
-                    zipf.writestr(
-                        f"{os.path.splitext(file.filename)[0]}.{output_format.lower()}",
-                        output.getvalue()
-                    )
-            
-            return StreamingResponse(
-                open(zip_path, 'rb'),
-                media_type='application/zip',
-                headers={'Content-Disposition': 'attachment; filename=converted_images.zip'}
-            )
+        # Refuse images that would not fit the pixel budget before decoding any
+        check_pixel_budget(files)
+
+        async def convert_image(file: UploadFile, input_path: str):
+            # Decode, resize and encode in a worker process
+            await spool_to_path(file, input_path)
+            return await run_cpu(_convert_image, input_path, output_format, quality, scale)
+
+        async def convert_file(indexed):
+            index, file = indexed
+            input_path = os.path.join(temp_dir, str(index))
+            with upload_view(file) as contents:
+                converted = await cached_result(
+                    "image-convert", [contents],
+                    {"output_format": output_format.lower(), "quality": quality, "scale": scale},
+                    lambda: convert_image(file, input_path),
+                    enabled=cache_enabled
+                )
+            return f"{os.path.splitext(file.filename)[0]}.{output_format.lower()}", converted
+
+        temp_dir = tempfile.mkdtemp()
+
+        async def entries():
+            # The spool directory lives until the last entry has been streamed
+            try:
+                async for entry in map_bounded_iter(convert_file, enumerate(files)):
+                    yield entry
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        # Convert images concurrently and stream each one into the ZIP in upload order
+        return await zip_response(entries(), "converted_images.zip")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional
+
+from fastapi import Header
+
+from .config import get_settings
+from .executors import run_io
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of conversion results.
+
+    Keys hash the input bytes, the tool name and its normalized parameters.
+    The store is bounded by ``max_bytes``; the least recently used entries are
+    evicted first. Entry mtimes track recency so the order survives restarts.
+
+    Worker processes share the directory, so the directory, not this
+    process's index, is the source of truth: lookups go to the file, and
+    every store rescans the directory before evicting, which keeps the
+    workers together within ``max_bytes`` (up to concurrent stores racing).
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def make_key(tool: str, inputs: Iterable[bytes], params: Optional[dict] = None) -> str:
+        digest = hashlib.sha256()
+        digest.update(tool.encode())
+        digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+        for data in inputs:
+            # Hash each input separately so input boundaries are part of the key
+            digest.update(hashlib.sha256(data).digest())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _touch(self, key: str):
+        # Explicit nanosecond times: file systems stamp writes with a coarse
+        # clock, which would tie entries stored or read moments apart
+        now = time.time_ns()
+        os.utime(self._path(key), ns=(now, now))
+
+    def _load(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.is_file():
+                entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        self._entries.clear()
+        self._size = 0
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._size += size
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+                self._touch(key)
+            except FileNotFoundError:
+                # Never stored, or evicted by another worker sharing the directory
+                self._size -= self._entries.pop(key, 0)
+                self.misses += 1
+                return None
+            # The entry may have been stored by another worker
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp_')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+            self._touch(key)
+            # Other workers store into the same directory: count their entries too
+            self._load()
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.unlink(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._size = 0
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            settings = get_settings()
+            _cache = ResultCache(settings.CACHE_DIR, settings.CACHE_MAX_BYTES)
+        return _cache
+
+
+def use_cache(cache_control: Optional[str] = Header(None)) -> bool:
+    """Dependency: requests sending ``Cache-Control: no-cache`` bypass the result cache."""
+    if not get_settings().CACHE_ENABLED:
+        return False
+    return not (cache_control and "no-cache" in cache_control.lower())
+
+
+async def cached_result(tool: str, inputs: Iterable[bytes], params: Optional[dict],
+                        compute: Callable[[], Awaitable[Optional[bytes]]],
+                        enabled: bool = True) -> Optional[bytes]:
+    """Return the cached result for this input, or ``await compute()`` and store it."""
+    if not enabled:
+        return await compute()
+    cache = get_result_cache()
+    # hashlib releases the GIL on large buffers, so hash on the I/O pool
+    key = await run_io(ResultCache.make_key, tool, inputs, params)
+    data = await run_io(cache.get, key)
+    if data is not None:
+        return data
+    data = await compute()
+    if data is not None:
+        await run_io(cache.put, key, data)
+    return data
@@ -0,0 +1,32 @@
+from celery import Celery
+from celery.signals import worker_process_init
+
+from .config import get_settings
+
+settings = get_settings()
+
+# Workers run separately from the API:
+#   celery -A core.celery_app worker --loglevel=info
+# The included modules register the job task and the per-tool job handlers.
+celery_app = Celery(
+    "allkit",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+    include=["core.jobs", "app.jobs"],
+)
+
+celery_app.conf.update(
+    # Job state lives in the job store, so Celery results are never read
+    task_ignore_result=True,
+    # Long conversions: take one job at a time and only ack it once it is done
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_always_eager=settings.JOBS_EAGER,
+)
+
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    # Each worker process keeps one tabula JVM for all the jobs it runs
+    if settings.TABULA_WARMUP:
+        from .tabula_jvm import warm_up_tabula
+        warm_up_tabula()
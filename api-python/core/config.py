@@ -1,5 +1,8 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict
+import os
+import tempfile
 
 class Settings(BaseSettings):
     # API Settings
@@ -22,6 +25,107 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # LibreOffice worker pool
+    LIBREOFFICE_POOL_SIZE: int = 2
+    LIBREOFFICE_MAX_JOBS_PER_WORKER: int = 100
+    LIBREOFFICE_BASE_PORT: int = 2002
+    LIBREOFFICE_PROFILE_DIR: str = os.path.join(tempfile.gettempdir(), "allkit-soffice")
+    LIBREOFFICE_STARTUP_TIMEOUT: float = 30.0
+    LIBREOFFICE_ACQUIRE_TIMEOUT: float = 120.0
+    
+    # Executors for blocking work
+    EXECUTOR_IO_WORKERS: int = 8
+    EXECUTOR_SUBPROCESS_WORKERS: int = 4
+    EXECUTOR_INFERENCE_WORKERS: int = 2
+    EXECUTOR_CPU_WORKERS: int = max(1, (os.cpu_count() or 2) - 1)
+    EXECUTOR_JOB_WORKERS: int = 2
+    EXECUTOR_NATIVE_WORKERS: int = 2
+    EXECUTOR_JVM_WORKERS: int = 4
+    # Files processed concurrently within a single multi-file request
+    BATCH_MAX_PARALLELISM: int = 4
+    
+    # Conversion result cache, shared by all worker processes through CACHE_DIR;
+    # CACHE_MAX_BYTES bounds the directory as a whole
+    CACHE_ENABLED: bool = True
+    CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "allkit-cache")
+    CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    
+    # Upload limits (request body bytes), enforced while the body streams in
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    UPLOAD_LIMITS: Dict[str, int] = {
+        "/api/convert-to-pdf": 200 * 1024 * 1024,
+        "/api/pdf": 100 * 1024 * 1024,
+        "/tools/pdf": 200 * 1024 * 1024,
+        "/tools/image": 100 * 1024 * 1024,
+        "/api/jobs": 500 * 1024 * 1024,
+    }
+    
+    # PDF merge: "pymupdf" or "pikepdf"; output is kept in memory up to the
+    # spool size, then in an anonymous temporary file. Merges whose inputs
+    # total more than MERGE_CACHE_MAX_BYTES skip the result cache, which
+    # holds whole results in memory
+    MERGE_BACKEND: str = "pymupdf"
+    MERGE_SPOOL_MAX_BYTES: int = 32 * 1024 * 1024
+    MERGE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    
+    # PDF compression: "pymupdf" (in-process) or "ghostscript"; GHOSTSCRIPT_PATH
+    # overrides the platform's default executable name
+    COMPRESSION_BACKEND: str = "pymupdf"
+    GHOSTSCRIPT_PATH: str = ""
+    # pymupdf inputs with at least this many pages are split into page-range
+    # chunks and compressed on the cpu pool; 0 pages per chunk spreads the
+    # pages evenly over EXECUTOR_CPU_WORKERS
+    COMPRESSION_PARALLEL_MIN_PAGES: int = 64
+    COMPRESSION_PAGES_PER_CHUNK: int = 0
+    
+    # PDF page rendering: pages go to the cpu pool in batches; pages above the
+    # pixel budget are rendered as tiles of RENDER_TILE_SIZE pixels. A worker
+    # closes its last document once it has been idle this many seconds
+    RENDER_BATCH_PAGES: int = 4
+    RENDER_TILE_SIZE: int = 4096
+    RENDER_MAX_PAGE_PIXELS: int = 40_000_000
+    RENDER_DOCUMENT_IDLE_SECONDS: float = 30.0
+    
+    # Image tools: decoded-pixel limits per image and per request, checked from
+    # image headers before decoding; images above IMAGE_LARGE_PIXELS are
+    # resampled in strips of IMAGE_STRIP_HEIGHT output rows (the source is
+    # still decoded whole)
+    IMAGE_MAX_PIXELS: int = 200_000_000
+    IMAGE_REQUEST_MAX_PIXELS: int = 400_000_000
+    IMAGE_LARGE_PIXELS: int = 25_000_000
+    IMAGE_STRIP_HEIGHT: int = 512
+    
+    # Background removal (rembg) model sessions
+    REMBG_MODEL: str = "u2net"
+    REMBG_WARMUP: bool = True
+    REMBG_BATCH_SIZE: int = 4
+    # Predicted masks are kept in memory, per process, up to this many bytes,
+    # so a new background colour for the same image skips the model
+    REMBG_MASK_CACHE_BYTES: int = 256 * 1024 * 1024
+    # Fast mode segments a copy of the photo whose longer side is at most this
+    # many pixels and upsamples the mask with guided-filter edge refinement
+    REMBG_FAST_MAX_SIDE: int = 768
+    
+    # tabula-java table extraction: with JPype installed the JVM runs in-process
+    # and stays up, and documents are extracted in page batches on the jvm pool
+    TABULA_WARMUP: bool = True
+    TABULA_PAGES_PER_BATCH: int = 8
+    
+    # OCR fallback for scanned PDFs: render resolution, Tesseract language and
+    # backend ("tesserocr" in-process, or "pytesseract"); OCR_TESSDATA_PATH
+    # overrides where tesserocr looks for language data
+    OCR_DPI: int = 300
+    OCR_LANG: str = "eng"
+    OCR_BACKEND: str = "tesserocr"
+    OCR_TESSDATA_PATH: str = ""
+    
+    # Background jobs. JOBS_DIR must be shared by the API and Celery workers;
+    # with JOBS_EAGER jobs run inside the API process and no broker is needed
+    JOBS_EAGER: bool = True
+    JOBS_DIR: str = os.path.join(tempfile.gettempdir(), "allkit-jobs")
+    JOBS_TTL_SECONDS: int = 24 * 60 * 60
+    CELERY_BROKER_URL: str = ""
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,184 @@
+import asyncio
+import collections
+import functools
+import itertools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from fastapi import HTTPException
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+I = TypeVar("I")
+
+# Named pools:
+#   io         - file reads/writes and other blocking I/O
+#   subprocess - waiting on external tools (LibreOffice, Ghostscript)
+#   inference  - model inference in native code that releases the GIL (onnxruntime)
+#   cpu        - pure-Python / GIL-bound work (PIL encoding, PyMuPDF, PyPDF2), in
+#                processes; threads inside daemonic processes (Celery prefork
+#                workers), which may not start children
+#   jobs       - background jobs run in-process when JOBS_EAGER is set
+#   native     - pikepdf (qpdf) work on in-memory buffers that cannot be
+#                pickled to the cpu pool, such as mmapped uploads. PyMuPDF
+#                holds the GIL for whole calls, so it always goes to cpu
+#   jvm        - calls into the in-process JVM (tabula-java through JPype),
+#                which release the GIL while Java runs
+IO_POOL = "io"
+SUBPROCESS_POOL = "subprocess"
+INFERENCE_POOL = "inference"
+CPU_POOL = "cpu"
+JOBS_POOL = "jobs"
+NATIVE_POOL = "native"
+JVM_POOL = "jvm"
+
+_executors: Dict[str, Executor] = {}
+_lock = threading.Lock()
+
+
+def _create_executor(name: str) -> Executor:
+    settings = get_settings()
+    if name == IO_POOL:
+        return ThreadPoolExecutor(max_workers=settings.EXECUTOR_IO_WORKERS, thread_name_prefix="allkit-io")
+    if name == SUBPROCESS_POOL:
+        return ThreadPoolExecutor(max_workers=settings.EXECUTOR_SUBPROCESS_WORKERS, thread_name_prefix="allkit-subprocess")
+    if name == INFERENCE_POOL:
+        return ThreadPoolExecutor(max_workers=settings.EXECUTOR_INFERENCE_WORKERS, thread_name_prefix="allkit-inference")
+    if name == JOBS_POOL:
+        return ThreadPoolExecutor(max_workers=settings.EXECUTOR_JOB_WORKERS, thread_name_prefix="allkit-jobs")
+    if name == NATIVE_POOL:
+        return ThreadPoolExecutor(max_workers=settings.EXECUTOR_NATIVE_WORKERS, thread_name_prefix="allkit-native")
+    if name == JVM_POOL:
+        return ThreadPoolExecutor(max_workers=settings.EXECUTOR_JVM_WORKERS, thread_name_prefix="allkit-jvm")
+    if name == CPU_POOL:
+        if multiprocessing.current_process().daemon:
+            # A daemonic process cannot start the pool's workers; it is already
+            # a worker of its own, so its cpu work runs on threads
+            return ThreadPoolExecutor(max_workers=settings.EXECUTOR_CPU_WORKERS, thread_name_prefix="allkit-cpu")
+        # spawn keeps workers independent of the threads running in the API process
+        return ProcessPoolExecutor(
+            max_workers=settings.EXECUTOR_CPU_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    raise ValueError(f"Unknown executor: {name}")
+
+
+def get_executor(name: str) -> Executor:
+    """
+    Return the shared executor called ``name``, creating it on first use.
+
+    A pool that broke (a worker crashed or was killed) is replaced, so one bad
+    task does not fail every later call until the API restarts.
+    """
+    with _lock:
+        executor = _executors.get(name)
+        if executor is not None and getattr(executor, "_broken", False):
+            logger.warning(f"Replacing broken {name} executor")
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = None
+        if executor is None:
+            executor = _create_executor(name)
+            _executors[name] = executor
+        return executor
+
+
+async def run_in_pool(name: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run ``func(*args, **kwargs)`` on the named pool without blocking the event loop.
+
+    A worker process dying fails every call in flight on its pool with 503.
+    Those calls are not retried: the pool cannot tell which one killed it,
+    and rerunning the culprit would break the replacement pool too.
+    """
+    call = functools.partial(func, *args, **kwargs)
+    try:
+        future = get_executor(name).submit(call)
+    except BrokenProcessPool:
+        # The pool broke after get_executor() handed it out; this call never
+        # ran, so it is safe to submit to the replacement
+        future = get_executor(name).submit(call)
+    try:
+        return await asyncio.wrap_future(future)
+    except BrokenProcessPool as e:
+        logger.warning(f"{name} executor broke while running {getattr(func, '__name__', func)}")
+        raise HTTPException(status_code=503, detail="A worker process crashed; please retry") from e
+
+
+async def run_io(func: Callable[..., T], *args, **kwargs) -> T:
+    return await run_in_pool(IO_POOL, func, *args, **kwargs)
+
+
+async def run_subprocess(func: Callable[..., T], *args, **kwargs) -> T:
+    return await run_in_pool(SUBPROCESS_POOL, func, *args, **kwargs)
+
+
+async def run_inference(func: Callable[..., T], *args, **kwargs) -> T:
+    return await run_in_pool(INFERENCE_POOL, func, *args, **kwargs)
+
+
+async def run_native(func: Callable[..., T], *args, **kwargs) -> T:
+    return await run_in_pool(NATIVE_POOL, func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run ``func`` in a worker process. ``func`` and its arguments must be picklable."""
+    return await run_in_pool(CPU_POOL, func, *args, **kwargs)
+
+
+async def map_bounded(func: Callable[[I], Awaitable[T]], items: Iterable[I],
+                      limit: Optional[int] = None, return_exceptions: bool = False) -> List[T]:
+    """
+    Await ``func(item)`` for every item with at most ``limit`` in flight.
+
+    Results keep the order of ``items``. With ``return_exceptions`` a failing item
+    yields its exception in place; otherwise the first failure cancels the rest.
+    """
+    semaphore = asyncio.Semaphore(limit or get_settings().BATCH_MAX_PARALLELISM)
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def map_bounded_iter(func: Callable[[I], Awaitable[T]], items: Iterable[I],
+                           limit: Optional[int] = None) -> AsyncIterator[T]:
+    """
+    Like ``map_bounded`` but yield each result as soon as it and every earlier
+    result are done, so callers can stream output in input order. At most
+    ``limit`` results are in flight or waiting to be consumed at any time.
+    """
+    limit = limit or get_settings().BATCH_MAX_PARALLELISM
+    iterator = iter(items)
+    pending = collections.deque(asyncio.ensure_future(func(item)) for item in itertools.islice(iterator, limit))
+    try:
+        while pending:
+            result = await pending.popleft()
+            for item in itertools.islice(iterator, 1):
+                pending.append(asyncio.ensure_future(func(item)))
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def shutdown_executors():
+    with _lock:
+        for name, executor in _executors.items():
+            logger.info(f"Shutting down {name} executor")
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
@@ -0,0 +1,113 @@
+"""
+Pixel budgets and bounded-memory helpers for large images.
+
+Decoded bitmaps, not upload sizes, are what exhaust memory: a 20k x 20k scan
+is a few megabytes as a JPEG and over a gigabyte decoded. Image sizes are
+read from headers, which decodes no pixels, and checked against a per-image
+limit and a per-request budget before any decoding starts. Importing this
+module also sets Pillow's decompression-bomb limit to the per-image limit, in
+the API process and in every worker process that imports it.
+
+Images over IMAGE_LARGE_PIXELS are resized in horizontal strips, which avoids
+the full-height intermediate bitmap a one-shot LANCZOS resize allocates. Only
+the resample is split: Pillow still decodes the whole source (JPEG downscales
+excepted, which decode at reduced size via draft()), and format conversion
+without a resize decodes and encodes whole images. The pixel budget is what
+bounds that memory.
+"""
+import io
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, UnidentifiedImageError
+
+from .config import get_settings
+
+ImageSource = Union[str, bytes, memoryview, BinaryIO]
+
+Image.MAX_IMAGE_PIXELS = get_settings().IMAGE_MAX_PIXELS
+
+
+class PixelBudgetExceeded(ValueError):
+    """An image, or a request's images together, has more pixels than allowed."""
+
+
+def image_pixels(source: ImageSource) -> int:
+    """Width x height, read from the image header without decoding pixels."""
+    if isinstance(source, (bytes, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        with Image.open(source) as image:
+            return image.width * image.height
+    except Image.DecompressionBombError as e:
+        raise PixelBudgetExceeded(str(e))
+
+
+class PixelBudget:
+    """Pixels a request may decode: IMAGE_MAX_PIXELS per image, IMAGE_REQUEST_MAX_PIXELS in total."""
+
+    def __init__(self, image_limit: int = None, request_limit: int = None):
+        settings = get_settings()
+        self.image_limit = image_limit or settings.IMAGE_MAX_PIXELS
+        self.request_limit = request_limit or settings.IMAGE_REQUEST_MAX_PIXELS
+        self.used = 0
+
+    def charge(self, pixels: int, name: str = "image"):
+        if pixels > self.image_limit:
+            raise PixelBudgetExceeded(
+                f"{name} has {pixels / 1e6:.0f} MP; the limit is {self.image_limit / 1e6:.0f} MP per image"
+            )
+        if self.used + pixels > self.request_limit:
+            raise PixelBudgetExceeded(
+                f"Images in this request exceed the {self.request_limit / 1e6:.0f} MP budget"
+            )
+        self.used += pixels
+
+
+def check_pixel_budget(files: List[UploadFile], budget: Optional[PixelBudget] = None) -> PixelBudget:
+    """
+    Charge every upload to ``budget`` from its header, or fail the request with 413.
+
+    Files that are not readable images are skipped; the tool reports them
+    when it tries to decode them.
+    """
+    budget = budget or PixelBudget()
+    for file in files:
+        file.file.seek(0)
+        try:
+            pixels = image_pixels(file.file)
+        except (UnidentifiedImageError, OSError):
+            continue
+        except PixelBudgetExceeded as e:
+            raise HTTPException(status_code=413, detail=f"{file.filename}: {e}")
+        finally:
+            file.file.seek(0)
+        try:
+            budget.charge(pixels, file.filename)
+        except PixelBudgetExceeded as e:
+            raise HTTPException(status_code=413, detail=str(e))
+    return budget
+
+
+def is_large(image: Image.Image) -> bool:
+    return image.width * image.height > get_settings().IMAGE_LARGE_PIXELS
+
+
+def resize_in_strips(image: Image.Image, size: Tuple[int, int],
+                     resample: int = Image.Resampling.LANCZOS, strip_height: int = None,
+                     reducing_gap: Optional[float] = None) -> Image.Image:
+    """
+    Resize ``image`` to ``size`` one band of output rows at a time.
+
+    Each band is resampled from its box of source rows (the filter still reads
+    the rows around the box), so the result matches a one-shot resize.
+    """
+    strip_height = strip_height or get_settings().IMAGE_STRIP_HEIGHT
+    output = Image.new(image.mode, size)
+    scale_y = image.height / size[1]
+    for top in range(0, size[1], strip_height):
+        bottom = min(top + strip_height, size[1])
+        box = (0, top * scale_y, image.width, bottom * scale_y)
+        strip = image.resize((size[0], bottom - top), resample, box=box, reducing_gap=reducing_gap)
+        output.paste(strip, (0, top))
+    return output
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .celery_app import celery_app
+from .config import get_settings
+from .executors import JOBS_POOL, get_executor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+# A handler gets the uploaded (filename, path) pairs, the job parameters, a
+# directory for its output and a progress callback taking 0.0-1.0. It returns
+# (result path, download filename, media type).
+JobHandler = Callable[[List[Tuple[str, str]], dict, str, Callable[[float], None]], Tuple[str, str, str]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(tool: str):
+    """Register the function that runs jobs submitted for ``tool``."""
+    def register(func: JobHandler) -> JobHandler:
+        _handlers[tool] = func
+        return func
+    return register
+
+
+def job_tools() -> List[str]:
+    return sorted(_handlers)
+
+
+class JobStore:
+    """
+    Job records, inputs and results kept on disk under one directory per job.
+
+    The directory is the only state shared between the API and the workers,
+    so it must be on storage both can reach.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def input_dir(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "inputs")
+
+    def output_dir(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "output")
+
+    def create(self, tool: str, filenames: List[str], params: Optional[dict] = None) -> dict:
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.input_dir(job_id))
+        os.makedirs(self.output_dir(job_id))
+        now = time.time()
+        job = {
+            "id": job_id,
+            "tool": tool,
+            "status": QUEUED,
+            "progress": 0.0,
+            "params": params or {},
+            "files": filenames,
+            "error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._write(job)
+        return job
+
+    def input_path(self, job_id: str, index: int) -> str:
+        # Uploads are stored by position; the original names stay in the record
+        return os.path.join(self.input_dir(job_id), str(index))
+
+    def inputs(self, job: dict) -> List[Tuple[str, str]]:
+        return [(name, self.input_path(job["id"], i)) for i, name in enumerate(job["files"])]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        # Job ids are uuid hex strings; anything else cannot name a job directory
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.job_dir(job_id), "job.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def update(self, job_id: str, **fields) -> dict:
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            job.update(fields, updated_at=time.time())
+            self._write(job)
+            return job
+
+    def _write(self, job: dict):
+        job_dir = self.job_dir(job["id"])
+        fd, temp_path = tempfile.mkstemp(dir=job_dir, prefix=".tmp_")
+        with os.fdopen(fd, "w") as f:
+            json.dump(job, f)
+        os.replace(temp_path, os.path.join(job_dir, "job.json"))
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in os.listdir(self.directory):
+            job = self.get(job_id)
+            if job is not None and job["updated_at"] < cutoff:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            settings = get_settings()
+            _store = JobStore(settings.JOBS_DIR, settings.JOBS_TTL_SECONDS)
+        return _store
+
+
+@celery_app.task(name="allkit.run_job")
+def run_job(job_id: str):
+    """Run a queued job to completion, recording progress, result or error."""
+    store = get_job_store()
+    job = store.update(job_id, status=RUNNING)
+    handler = _handlers.get(job["tool"])
+
+    def report(progress: float):
+        store.update(job_id, progress=round(min(max(progress, 0.0), 1.0), 3))
+
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job tool: {job['tool']}")
+        result_path, filename, media_type = handler(
+            store.inputs(job), job["params"], store.output_dir(job_id), report
+        )
+        store.update(job_id, status=SUCCEEDED, progress=1.0, result={
+            "path": result_path,
+            "filename": filename,
+            "media_type": media_type,
+        })
+    except Exception as e:
+        logger.exception(f"Job {job_id} ({job['tool']}) failed")
+        store.update(job_id, status=FAILED, error=str(e))
+    finally:
+        shutil.rmtree(store.input_dir(job_id), ignore_errors=True)
+
+
+def enqueue_job(job_id: str):
+    """Hand a job to the Celery workers, or to the in-process jobs pool in eager mode."""
+    if get_settings().JOBS_EAGER:
+        # Still returns immediately; the job runs on a thread of this process
+        get_executor(JOBS_POOL).submit(run_job.apply, args=(job_id,))
+    else:
+        run_job.delay(job_id)
@@ -0,0 +1,317 @@
+import os
+import sys
+import time
+import shutil
+import queue
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Optional
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# pyuno ships with LibreOffice rather than pip. Without it the workers fall back
+# to one-shot CLI conversions, still isolated by their own user profile.
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:
+    uno = None
+
+WINDOWS_SOFFICE_PATH = r'C:\Program Files\LibreOffice\program\soffice.exe'
+
+
+class OfficeConversionError(Exception):
+    """Raised when LibreOffice fails to convert a document."""
+
+
+class OfficeWorkerCrashed(OfficeConversionError):
+    """Raised when the LibreOffice process behind a worker is no longer usable."""
+
+
+def find_soffice() -> str:
+    """Return the LibreOffice executable for this platform."""
+    if sys.platform == 'win32' and os.path.exists(WINDOWS_SOFFICE_PATH):
+        return WINDOWS_SOFFICE_PATH
+    return shutil.which('soffice') or shutil.which('libreoffice') or 'soffice'
+
+
+def _prop(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def _export_filter(document) -> str:
+    if document.supportsService("com.sun.star.sheet.SpreadsheetDocument"):
+        return "calc_pdf_Export"
+    if document.supportsService("com.sun.star.presentation.PresentationDocument"):
+        return "impress_pdf_Export"
+    if document.supportsService("com.sun.star.drawing.DrawingDocument"):
+        return "draw_pdf_Export"
+    return "writer_pdf_Export"
+
+
+class OfficeWorker:
+    """A single long-lived soffice process with its own user profile."""
+
+    def __init__(self, index: int, soffice_cmd: str, port: int, profile_dir: str, startup_timeout: float):
+        self.index = index
+        self.soffice_cmd = soffice_cmd
+        self.port = port
+        self.profile_dir = profile_dir
+        self.startup_timeout = startup_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.jobs = 0
+        self._desktop = None
+
+    @property
+    def profile_url(self) -> str:
+        return Path(self.profile_dir).resolve().as_uri()
+
+    def start(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.jobs = 0
+        if uno is None:
+            return
+        self.process = subprocess.Popen([
+            self.soffice_cmd,
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--nodefault',
+            '--norestore',
+            '--nofirststartwizard',
+            f'-env:UserInstallation={self.profile_url}',
+            f'--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext',
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._desktop = self._connect()
+        logger.info(f"LibreOffice worker {self.index} listening on port {self.port}")
+
+    def _connect(self):
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        url = f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            if self.process.poll() is not None:
+                raise OfficeWorkerCrashed(f"LibreOffice worker {self.index} exited during startup")
+            try:
+                ctx = resolver.resolve(url)
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise OfficeWorkerCrashed(f"LibreOffice worker {self.index} did not start listening on port {self.port}")
+                time.sleep(0.25)
+
+    def is_healthy(self) -> bool:
+        if uno is None:
+            return True
+        if self.process is None or self.process.poll() is not None or self._desktop is None:
+            return False
+        try:
+            self._desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def convert(self, input_path: str, output_dir: str) -> str:
+        output_path = os.path.join(output_dir, f"{Path(input_path).stem}.pdf")
+        if uno is None:
+            self._convert_cli(input_path, output_dir)
+        else:
+            self._convert_uno(input_path, output_path)
+        self.jobs += 1
+        return output_path
+
+    def _convert_uno(self, input_path: str, output_path: str):
+        try:
+            document = self._desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+                (_prop("Hidden", True), _prop("ReadOnly", True)),
+            )
+        except Exception as e:
+            if not self.is_healthy():
+                raise OfficeWorkerCrashed(str(e))
+            raise OfficeConversionError(f"Failed to load {os.path.basename(input_path)}: {e}")
+        if document is None:
+            raise OfficeConversionError(f"LibreOffice could not open {os.path.basename(input_path)}")
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                (_prop("FilterName", _export_filter(document)),),
+            )
+        except Exception as e:
+            if not self.is_healthy():
+                raise OfficeWorkerCrashed(str(e))
+            raise OfficeConversionError(f"Failed to export {os.path.basename(input_path)}: {e}")
+        finally:
+            try:
+                document.close(True)
+            except Exception:
+                pass
+
+    def _convert_cli(self, input_path: str, output_dir: str):
+        result = subprocess.run([
+            self.soffice_cmd,
+            '--headless',
+            f'-env:UserInstallation={self.profile_url}',
+            '--convert-to', 'pdf',
+            '--outdir', output_dir,
+            input_path
+        ], capture_output=True)
+        if result.returncode != 0:
+            raise OfficeConversionError(result.stderr.decode(errors='ignore'))
+
+    def stop(self):
+        if self._desktop is not None:
+            try:
+                self._desktop.terminate()
+            except Exception:
+                pass
+            self._desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+
+class OfficePool:
+    """
+    Pool of warm LibreOffice workers shared by every Office to PDF conversion.
+
+    Workers are health-checked when checked out, recycled after
+    ``max_jobs`` conversions and restarted when their process crashes.
+    """
+
+    def __init__(self, size: int, max_jobs: int, base_port: int, profile_root: str,
+                 startup_timeout: float = 30.0, acquire_timeout: float = 120.0,
+                 soffice_cmd: Optional[str] = None):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.base_port = base_port
+        self.profile_root = profile_root
+        self.startup_timeout = startup_timeout
+        self.acquire_timeout = acquire_timeout
+        self.soffice_cmd = soffice_cmd or find_soffice()
+        self._workers: List[OfficeWorker] = []
+        self._idle: "queue.Queue[OfficeWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            if uno is None:
+                logger.warning("pyuno is not available: every conversion starts its own soffice process")
+            for index in range(self.size):
+                worker = OfficeWorker(
+                    index,
+                    self.soffice_cmd,
+                    self.base_port + index,
+                    os.path.join(self.profile_root, f"worker_{index}"),
+                    self.startup_timeout,
+                )
+                try:
+                    worker.start()
+                except FileNotFoundError:
+                    raise
+                except Exception as e:
+                    # Restarted on first checkout by the health check
+                    logger.error(f"LibreOffice worker {index} failed to start: {e}")
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._started = True
+
+    @contextmanager
+    def _checkout(self):
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise OfficeConversionError("Timed out waiting for a free LibreOffice worker")
+        try:
+            if not worker.is_healthy():
+                logger.warning(f"LibreOffice worker {worker.index} failed health check, restarting")
+                worker.restart()
+            yield worker
+            if worker.jobs >= self.max_jobs:
+                logger.info(f"Recycling LibreOffice worker {worker.index} after {worker.jobs} jobs")
+                worker.restart()
+        finally:
+            self._idle.put(worker)
+
+    def convert(self, input_path: str, output_dir: str) -> str:
+        """Convert ``input_path`` to PDF inside ``output_dir`` and return the PDF path."""
+        self.start()
+        with self._checkout() as worker:
+            try:
+                return worker.convert(input_path, output_dir)
+            except OfficeWorkerCrashed as e:
+                logger.warning(f"LibreOffice worker {worker.index} crashed ({e}), restarting and retrying")
+                worker.restart()
+                return worker.convert(input_path, output_dir)
+
+    def health(self) -> List[dict]:
+        return [
+            {"worker": w.index, "port": w.port, "jobs": w.jobs, "healthy": w.is_healthy()}
+            for w in self._workers
+        ]
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+            self._idle = queue.Queue()
+            self._started = False
+
+
+_pool: Optional[OfficePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_office_pool() -> OfficePool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            _pool = OfficePool(
+                size=settings.LIBREOFFICE_POOL_SIZE,
+                max_jobs=settings.LIBREOFFICE_MAX_JOBS_PER_WORKER,
+                base_port=settings.LIBREOFFICE_BASE_PORT,
+                profile_root=settings.LIBREOFFICE_PROFILE_DIR,
+                startup_timeout=settings.LIBREOFFICE_STARTUP_TIMEOUT,
+                acquire_timeout=settings.LIBREOFFICE_ACQUIRE_TIMEOUT,
+            )
+        return _pool
+
+
+def warm_up_office_pool():
+    """Start the LibreOffice workers ahead of the first conversion; failures only log a warning."""
+    try:
+        get_office_pool().start()
+    except Exception as e:
+        logger.warning(f"LibreOffice pool not started: {e}")
+
+
+def shutdown_office_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,274 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.ndimage import uniform_filter
+from PIL import Image, ImageChops
+from rembg import new_session, remove
+from rembg.bg import naive_cutout
+from rembg.sessions.base import BaseSession
+from rembg.sessions.silueta import SiluetaSession
+from rembg.sessions.u2net import U2netSession
+from rembg.sessions.u2net_human_seg import U2netHumanSegSession
+from rembg.sessions.u2netp import U2netpSession
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Sessions whose predict() is the plain U^2-Net normalize/run/rescale pipeline
+_U2NET_SESSIONS = (U2netSession, U2netpSession, U2netHumanSegSession, SiluetaSession)
+_U2NET_MEAN = (0.485, 0.456, 0.406)
+_U2NET_STD = (0.229, 0.224, 0.225)
+_U2NET_SIZE = (320, 320)
+# Guided-filter window radius (working-resolution pixels) and regularisation
+# used when fast mode upsamples masks; a smaller eps follows image edges more closely
+_REFINE_RADIUS = 4
+_REFINE_EPS = 1e-3
+# Edge refinement works on tiles of this many working-resolution pixels, and
+# skips tiles whose mask is within _SOLID of fully transparent or opaque
+_REFINE_TILE = 32
+_SOLID = 8
+
+_sessions: Dict[str, BaseSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_rembg_session(model_name: Optional[str] = None) -> BaseSession:
+    """
+    Return the process-wide rembg session for ``model_name``.
+
+    The ONNX model is loaded once; concurrent callers wait for that load
+    instead of each creating their own session.
+    """
+    model_name = model_name or get_settings().REMBG_MODEL
+    with _sessions_lock:
+        if model_name not in _sessions:
+            logger.info(f"Loading rembg model {model_name}")
+            _sessions[model_name] = new_session(model_name)
+        return _sessions[model_name]
+
+
+def warm_up_rembg(model_name: Optional[str] = None):
+    """Load the model and run one inference so the first request skips both."""
+    try:
+        session = get_rembg_session(model_name)
+        remove(Image.new("RGB", _U2NET_SIZE), session=session)
+    except Exception as e:
+        logger.warning(f"rembg warm-up failed: {e}")
+
+
+def supports_batching(session: BaseSession) -> bool:
+    """True when the model accepts several images in one run (dynamic batch axis)."""
+    if not isinstance(session, _U2NET_SESSIONS):
+        return False
+    batch_dim = session.inner_session.get_inputs()[0].shape[0]
+    return not isinstance(batch_dim, int)
+
+
+def _batched_masks(session: BaseSession, images: List[Image.Image]) -> List[Image.Image]:
+    input_name = session.inner_session.get_inputs()[0].name
+    batch = np.concatenate([
+        session.normalize(image, _U2NET_MEAN, _U2NET_STD, _U2NET_SIZE)[input_name]
+        for image in images
+    ])
+    predictions = session.inner_session.run(None, {input_name: batch})[0][:, 0, :, :]
+
+    masks = []
+    for prediction, image in zip(predictions, images):
+        # Same per-image rescaling as U2netSession.predict
+        low, high = np.min(prediction), np.max(prediction)
+        prediction = (prediction - low) / (high - low)
+        mask = Image.fromarray((prediction.clip(0, 1) * 255).astype("uint8"), mode="L")
+        masks.append(mask.resize(image.size, Image.Resampling.LANCZOS))
+    return masks
+
+
+def _single_mask(session: BaseSession, image: Image.Image) -> Image.Image:
+    # Models that find several objects return one mask each: keep them all
+    masks = session.predict(image)
+    mask = masks[0]
+    for other in masks[1:]:
+        mask = ImageChops.lighter(mask, other)
+    return mask
+
+
+def predict_masks(images: List[Image.Image], model_name: Optional[str] = None,
+                  batch_size: Optional[int] = None) -> List[Image.Image]:
+    """
+    Predict each image's foreground alpha mask ("L", same size as the image).
+
+    Models with a dynamic batch axis run ``batch_size`` images per inference;
+    others run one image at a time.
+    """
+    session = get_rembg_session(model_name)
+    if len(images) < 2 or not supports_batching(session):
+        return [_single_mask(session, image) for image in images]
+
+    batch_size = batch_size or get_settings().REMBG_BATCH_SIZE
+    masks = []
+    for start in range(0, len(images), batch_size):
+        masks.extend(_batched_masks(session, images[start:start + batch_size]))
+    return masks
+
+
+def _working_size(size: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+    scale = max_side / max(size)
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+def _guided_coefficients(guide: np.ndarray, mask: np.ndarray, radius: int, eps: float):
+    # Guided filter (He et al.): per window, the mask is a linear function a * guide + b
+    size = 2 * radius + 1
+    mean_guide = uniform_filter(guide, size)
+    mean_mask = uniform_filter(mask, size)
+    covariance = uniform_filter(guide * mask, size) - mean_guide * mean_mask
+    variance = uniform_filter(guide * guide, size) - mean_guide * mean_guide
+    a = covariance / (variance + eps)
+    b = mean_mask - a * mean_guide
+    return uniform_filter(a, size), uniform_filter(b, size)
+
+
+def refine_mask(mask: Image.Image, working_image: Image.Image, image: Image.Image,
+                radius: int = _REFINE_RADIUS, eps: float = _REFINE_EPS) -> Image.Image:
+    """
+    Upsample a mask predicted on ``working_image`` to the size of ``image``.
+
+    Fast guided upsampling: the guided filter's linear coefficients are fitted
+    at working resolution, upsampled, and applied to the full-resolution
+    image, so mask edges follow the edges in the photo instead of being
+    interpolated. Only tiles near the mask boundary are refined; the solid
+    foreground and background are upsampled directly.
+    """
+    # Away from edges the mask is flat, so nearest-neighbour upsampling is exact enough
+    refined = mask.resize(image.size, Image.Resampling.NEAREST)
+    working_mask = np.asarray(mask)
+    # Working pixels whose guided-filter window reaches a soft mask edge
+    soft = (working_mask > _SOLID) & (working_mask < 255 - _SOLID)
+    boundary = uniform_filter(soft.astype(np.float32), 2 * radius + 1) > 0
+    if not boundary.any():
+        return refined
+
+    guide = np.asarray(working_image.convert("L"), dtype=np.float32) / 255
+    a, b = _guided_coefficients(guide, working_mask.astype(np.float32) / 255, radius, eps)
+    a, b = Image.fromarray(a, mode="F"), Image.fromarray(b, mode="F")
+    full_guide = image.convert("L")
+    scale_x, scale_y = image.width / mask.width, image.height / mask.height
+
+    tile = _REFINE_TILE
+    for top in range(0, mask.height, tile):
+        for left in range(0, mask.width, tile):
+            if not boundary[top:top + tile, left:left + tile].any():
+                continue
+            right, bottom = min(left + tile, mask.width), min(top + tile, mask.height)
+            x0, y0 = round(left * scale_x), round(top * scale_y)
+            x1, y1 = round(right * scale_x), round(bottom * scale_y)
+            size = (x1 - x0, y1 - y0)
+            box = (x0 / scale_x, y0 / scale_y, x1 / scale_x, y1 / scale_y)
+            tile_a = np.asarray(a.resize(size, Image.Resampling.BILINEAR, box=box))
+            tile_b = np.asarray(b.resize(size, Image.Resampling.BILINEAR, box=box))
+            tile_guide = np.asarray(full_guide.crop((x0, y0, x1, y1)), dtype=np.float32) / 255
+            values = (tile_a * tile_guide + tile_b).clip(0, 1) * 255
+            refined.paste(Image.fromarray((values + 0.5).astype("uint8"), mode="L"), (x0, y0))
+    return refined
+
+
+def predict_masks_fast(images: List[Image.Image], max_side: Optional[int] = None,
+                       model_name: Optional[str] = None, batch_size: Optional[int] = None) -> List[Image.Image]:
+    """
+    Like ``predict_masks``, but segment a copy of each image whose longer side
+    is at most ``max_side`` (REMBG_FAST_MAX_SIDE) and upsample the mask with
+    ``refine_mask``.
+
+    U^2-Net models see a 320 x 320 input either way; this skips resampling the
+    full photo down to it and the plain LANCZOS upscale of the mask.
+    """
+    max_side = max_side or get_settings().REMBG_FAST_MAX_SIDE
+    working_images = [
+        image.resize(_working_size(image.size, max_side), Image.Resampling.BILINEAR, reducing_gap=1.0)
+        if max(image.size) > max_side else image
+        for image in images
+    ]
+    masks = predict_masks(working_images, model_name, batch_size)
+    return [
+        mask if working_image is image else refine_mask(mask, working_image, image)
+        for image, working_image, mask in zip(images, working_images, masks)
+    ]
+
+
+def remove_backgrounds(images: List[Image.Image], model_name: Optional[str] = None,
+                       batch_size: Optional[int] = None) -> List[Image.Image]:
+    """Cut out the foreground of each image with the shared session."""
+    images = [image if image.mode == "RGBA" else image.convert("RGBA") for image in images]
+    return [naive_cutout(image, mask) for image, mask in zip(images, predict_masks(images, model_name, batch_size))]
+
+
+class MaskCache:
+    """
+    In-memory cache of predicted alpha masks, keyed by image content and model.
+
+    Changing only the background colour of an image reuses its mask instead
+    of running the model again. The cache holds at most ``max_bytes`` of mask
+    pixels; the least recently used masks are evicted first.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._masks: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Image.Image]:
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is None:
+                self.misses += 1
+                return None
+            self._masks.move_to_end(key)
+            self.hits += 1
+            return mask
+
+    def put(self, key: str, mask: Image.Image):
+        size = mask.width * mask.height
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._masks.pop(key, None)
+            if previous is not None:
+                self._size -= previous.width * previous.height
+            self._masks[key] = mask
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._masks.popitem(last=False)
+                self._size -= evicted.width * evicted.height
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._masks),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._masks.clear()
+            self._size = 0
+
+
+_mask_cache: Optional[MaskCache] = None
+_mask_cache_lock = threading.Lock()
+
+
+def get_mask_cache() -> MaskCache:
+    global _mask_cache
+    with _mask_cache_lock:
+        if _mask_cache is None:
+            _mask_cache = MaskCache(get_settings().REMBG_MASK_CACHE_BYTES)
+        return _mask_cache
@@ -0,0 +1,76 @@
+"""
+Process-wide tabula-java JVM.
+
+tabula-py runs tabula-java inside the Python process through JPype when it is
+installed, and otherwise starts a ``java`` subprocess for every call. The
+in-process JVM is started once per process and reused by every extraction;
+Java calls release the GIL, so page batches can be extracted concurrently.
+"""
+import logging
+import os
+import tempfile
+import threading
+
+import fitz
+import tabula
+
+logger = logging.getLogger(__name__)
+
+_jvm_lock = threading.Lock()
+# Set once the warm-up has run, even when it failed: without Java it fails the
+# same way every time, and retrying would rerun it under the lock on every call
+_warmed_up = False
+
+
+def jvm_available() -> bool:
+    """True when JPype is installed, so tabula can keep its JVM in-process."""
+    try:
+        import jpype  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def in_process_jvm() -> bool:
+    """True once the in-process JVM is running."""
+    if not jvm_available():
+        return False
+    import jpype
+    return jpype.isJVMStarted()
+
+
+def ensure_tabula_jvm() -> bool:
+    """
+    Start the in-process JVM and load tabula-java's classes, once per process.
+
+    Concurrent callers wait for the first start instead of racing it. Returns
+    whether extractions will run in-process; without JPype tabula falls back
+    to one subprocess per call. A failed start is raised to the first caller
+    only; later callers get False.
+    """
+    global _warmed_up
+    if not jvm_available():
+        return False
+    with _jvm_lock:
+        if not _warmed_up:
+            logger.info("Starting the tabula JVM")
+            try:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    path = os.path.join(temp_dir, "warmup.pdf")
+                    with fitz.open() as doc:
+                        doc.new_page().insert_text((72, 72), "warm-up")
+                        doc.save(path)
+                    # The first extraction starts the JVM and loads the PDFBox classes
+                    tabula.read_pdf(path, pages=1, silent=True)
+            finally:
+                _warmed_up = True
+    return in_process_jvm()
+
+
+def warm_up_tabula():
+    """Start the JVM ahead of the first conversion; failures only log a warning."""
+    try:
+        if not ensure_tabula_jvm():
+            logger.warning("JPype is not installed; tabula will start a java subprocess per conversion")
+    except Exception as e:
+        logger.warning(f"tabula warm-up failed: {e}")
@@ -0,0 +1,159 @@
+import io
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, Iterator, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+from .executors import run_io
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _too_large(limit: int) -> str:
+    return f"Upload exceeds the {limit // (1024 * 1024)}MB size limit for this tool"
+
+
+class UploadLimitMiddleware:
+    """
+    Enforce per-tool request body limits while the body is still streaming.
+
+    Requests that declare an oversized Content-Length are rejected before any
+    body is read. Otherwise bytes are counted as they arrive, and the upload is
+    aborted with 413 as soon as the limit is crossed, instead of after the
+    whole body has been spooled.
+    """
+
+    def __init__(self, app: ASGIApp, default_limit: Optional[int] = None,
+                 limits: Optional[Dict[str, int]] = None):
+        settings = get_settings()
+        self.app = app
+        self.default_limit = default_limit or settings.UPLOAD_MAX_BYTES
+        # Longest prefix wins, so check the most specific paths first
+        self.limits = sorted((limits or settings.UPLOAD_LIMITS).items(), key=lambda item: -len(item[0]))
+
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return self.default_limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": _too_large(limit)})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing, so FastAPI turns it into a 413 response
+                    raise HTTPException(status_code=413, detail=_too_large(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+@contextmanager
+def upload_view(file: UploadFile) -> Iterator[memoryview]:
+    """
+    Yield a read-only memoryview of an upload without copying it.
+
+    Uploads that Starlette already rolled over to disk are memory-mapped;
+    small in-memory spools are at most one spool threshold in size.
+    """
+    spool = file.file
+    if isinstance(spool, SpooledTemporaryFile) and not spool._rolled:
+        yield memoryview(spool._file.getvalue())
+        return
+    try:
+        spool.flush()
+        fileno = spool.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        spool.seek(0)
+        yield memoryview(spool.read())
+        spool.seek(0)
+        return
+    if os.fstat(fileno).st_size == 0:
+        yield memoryview(b"")
+        return
+    mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        view.release()
+        mapped.close()
+
+
+def iter_file(output: BinaryIO) -> Iterator[bytes]:
+    """
+    Read ``output`` in chunks for a StreamingResponse, closing it at the end.
+    A sync generator: Starlette reads it on its thread pool, one chunk at a time.
+    """
+    try:
+        while True:
+            chunk = output.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        output.close()
+
+
+def process_path(file: BinaryIO) -> Optional[str]:
+    """
+    A path other processes of this user can open ``file`` by, even once it is
+    unlinked (an anonymous temporary file): /proc/<pid>/fd/<fd> on Linux.
+    None where /proc is not available.
+    """
+    path = f"/proc/{os.getpid()}/fd/{file.fileno()}"
+    return path if os.path.exists(path) else None
+
+
+def worker_source(file: UploadFile, view: memoryview) -> Optional[Union[str, bytes]]:
+    """
+    An upload in a form the cpu pool can take without a temp file or a copy of
+    a large upload: the bytes of an in-memory spool (at most one spool
+    threshold), or a process_path() to Starlette's file once it rolled over
+    to disk. None when the worker cannot open that file.
+    """
+    spool = file.file
+    if isinstance(spool, SpooledTemporaryFile) and not spool._rolled:
+        return bytes(view)
+    try:
+        spool.flush()
+        return process_path(spool)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _copy_upload(file: UploadFile, path: str):
+    file.file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file.file, out, CHUNK_SIZE)
+    file.file.seek(0)
+
+
+async def spool_to_path(file: UploadFile, path: str) -> str:
+    """Copy an upload to ``path`` in bounded chunks on the I/O pool and return the path."""
+    await run_io(_copy_upload, file, path)
+    return path
@@ -0,0 +1,91 @@
+import os
+import time
+import zipfile
+from typing import AsyncIterable, AsyncIterator, Tuple
+
+from fastapi.responses import StreamingResponse
+
+# Payloads that are already compressed gain nothing from another deflate pass
+STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.webp', '.gif', '.pdf', '.zip',
+    '.docx', '.xlsx', '.pptx', '.jp2', '.avif', '.heic',
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def compress_type_for(name: str) -> int:
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class _DrainBuffer:
+    """Write-only sink for ZipFile; the bytes written so far are handed out by drain()."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(entries: AsyncIterable[Tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive piece by piece as ``(name, data)`` entries arrive.
+
+    Nothing is buffered beyond one ``CHUNK_SIZE`` slice of the current entry, and
+    already-compressed payloads are stored rather than deflated again.
+    """
+    buffer = _DrainBuffer()
+    # An unseekable sink makes zipfile write sizes in data descriptors after each entry
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        async for name, data in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = compress_type_for(name)
+            view = memoryview(data)
+            with zip_file.open(info, 'w', force_zip64=len(data) > zipfile.ZIP64_LIMIT) as dest:
+                for start in range(0, len(view), CHUNK_SIZE):
+                    dest.write(view[start:start + CHUNK_SIZE])
+                    chunk = buffer.drain()
+                    if chunk:
+                        yield chunk
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+async def zip_response(entries: AsyncIterable[Tuple[str, bytes]], filename: str,
+                       media_type: str = "application/zip") -> StreamingResponse:
+    """
+    Build a StreamingResponse that sends each ZIP entry as soon as it is ready.
+
+    The first entry is produced before the response starts, so a failure on it
+    still becomes a normal HTTP error instead of a truncated download.
+    """
+    stream = stream_zip(entries)
+    first = await stream.__anext__()
+
+    async def body():
+        yield first
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
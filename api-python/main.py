@@ -3,15 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from PIL import Image
 import io
+import asyncio
 import os
 import zipfile
 from typing import List, Optional
-import rembg
 import tempfile
 import shutil
 import uuid
 from PyPDF2 import PdfReader, PdfWriter
 import json
+from core.executors import run_cpu, run_inference, shutdown_executors
+from core.rembg_sessions import warm_up_rembg, remove_backgrounds
 
 # Import the convert_word_to_pdf function
 from src.pdf.from.word_to_pdf import convert_word_to_pdf
@@ -52,6 +54,9 @@ def convert_image(image: Image.Image, format: str, quality: int = 85) -> bytes:
     
     return output.getvalue()
 
+def convert_image_bytes(contents: bytes, format: str, quality: int = 85) -> bytes:
+    return convert_image(Image.open(io.BytesIO(contents)), format, quality)
+
 @app.post("/convert")
 async def convert_images(
     files: List[UploadFile] = File(...),
@@ -69,10 +74,9 @@ async def convert_images(
             for file in files:
                 # Read and convert image
                 contents = await file.read()
-                image = Image.open(io.BytesIO(contents))
                 
-                # Convert image
-                converted_data = convert_image(image, format, quality)
+                # Convert image in a worker process
+                converted_data = await run_cpu(convert_image_bytes, contents, format, quality)
                 
                 # Save converted image
                 output_filename = f"{os.path.splitext(file.filename)[0]}.{format}"
@@ -127,14 +131,16 @@ async def remove_background(
         # Create a ZIP file in memory
         zip_buffer = io.BytesIO()
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            # Read the uploaded files
+            input_images = []
             for file in files:
-                # Read the uploaded file
                 contents = await file.read()
-                input_image = Image.open(io.BytesIO(contents))
-                
-                # Remove background
-                output_image = rembg.remove(input_image)
-                
+                input_images.append(Image.open(io.BytesIO(contents)))
+            
+            # Remove backgrounds with the shared model session, batched where supported
+            output_images = await run_inference(remove_backgrounds, input_images)
+            
+            for file, output_image in zip(files, output_images):
                 # If background color is specified and not 'transparent', add the color
                 if background_color and background_color.lower() != 'transparent':
                     # Create a new image with the specified background color
@@ -207,6 +213,15 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.on_event("startup")
+async def start_rembg_warmup():
+    # Load the background removal model before the first request needs it
+    asyncio.ensure_future(run_inference(warm_up_rembg))
+
+@app.on_event("shutdown")
+async def stop_executors():
+    shutdown_executors()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,458 @@
+"""
+PDF compression backends.
+
+    pymupdf      in-process: downsample and recompress images, recompress
+                 streams, drop unused objects and pack objects into object streams
+    ghostscript  the Ghostscript binary for this platform (gs, or gswin64c/gswin32c
+                 on Windows), or GHOSTSCRIPT_PATH
+
+Both take the same presets. A result is never larger than its input: when
+compression does not help, the original file is kept.
+
+Large inputs can be compressed in parallel (pymupdf only): the document is
+split into page-range chunks, the chunks are compressed on a process pool and
+stitched back together, and a final garbage-collecting save merges the fonts,
+colour profiles and images the chunks had each copied. Splitting and joining
+are pool tasks as well, so no PyMuPDF work runs on the caller's thread.
+
+Target-size mode (pymupdf only) replaces the presets with a per-image search:
+images are analysed once, each is re-encoded only at the ladder levels the
+search visits, and the document is saved once at the end. Only each image's
+size table is kept between steps; pixels and candidate encodings are dropped
+as soon as they are measured.
+"""
+import io
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import Executor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import fitz
+from PIL import Image
+
+from core.config import get_settings
+
+BACKENDS = ("pymupdf", "ghostscript")
+
+
+class CompressionPreset(NamedTuple):
+    image_dpi: int          # images above this resolution are downsampled to it
+    jpeg_quality: int       # quality for recompressed lossy images
+    gs_pdfsettings: str     # the matching Ghostscript -dPDFSETTINGS
+
+
+PRESETS = {
+    "extreme": CompressionPreset(72, 40, "/screen"),         # lowest quality, smallest size
+    "recommended": CompressionPreset(150, 65, "/ebook"),     # good quality, small size
+    "less": CompressionPreset(300, 85, "/printer"),          # high quality, larger size
+}
+
+
+class CompressionError(RuntimeError):
+    """The backend failed to produce a compressed PDF."""
+
+
+def find_ghostscript() -> Optional[str]:
+    """Return the path of the Ghostscript executable, or None if it is not installed."""
+    configured = get_settings().GHOSTSCRIPT_PATH
+    if configured:
+        candidates = [configured]
+    elif os.name == "nt":
+        candidates = ["gswin64c", "gswin32c", "gs"]
+    else:
+        candidates = ["gs"]
+    for candidate in candidates:
+        path = shutil.which(candidate)
+        if path:
+            return path
+    return None
+
+
+def compress_with_pymupdf(input_path: str, output_path: str, preset: CompressionPreset):
+    try:
+        doc = fitz.open(input_path)
+    except Exception as e:
+        raise CompressionError(f"Failed to read PDF: {e}")
+    try:
+        # Only images noticeably above the target resolution are resampled
+        doc.rewrite_images(
+            dpi_threshold=int(preset.image_dpi * 1.5),
+            dpi_target=preset.image_dpi,
+            quality=preset.jpeg_quality,
+        )
+        doc.save(output_path, **SAVE_OPTIONS)
+    except Exception as e:
+        raise CompressionError(f"PyMuPDF compression failed: {e}")
+    finally:
+        doc.close()
+
+
+def compress_with_ghostscript(input_path: str, output_path: str, preset: CompressionPreset,
+                              gs_path: Optional[str] = None):
+    gs_path = gs_path or find_ghostscript()
+    if gs_path is None:
+        raise CompressionError("Ghostscript is not installed")
+    gs_command = [
+        gs_path,
+        "-sDEVICE=pdfwrite",
+        "-dCompatibilityLevel=1.4",
+        f"-dPDFSETTINGS={preset.gs_pdfsettings}",
+        "-dNOPAUSE",
+        "-dQUIET",
+        "-dBATCH",
+        f"-sOutputFile={output_path}",
+        input_path
+    ]
+    result = subprocess.run(gs_command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise CompressionError(f"Ghostscript failed: {result.stderr.strip() or result.returncode}")
+    if not os.path.exists(output_path):
+        raise CompressionError("Ghostscript did not create an output PDF")
+
+
+# Target-size search ladder: (maximum DPI, JPEG quality), from gentlest to harshest.
+# Level 0 keeps the original image.
+TARGET_LADDER = [(300, 85), (200, 80), (150, 70), (120, 60), (96, 50), (72, 40), (50, 30)]
+
+# Structural save options shared by the preset and target modes
+SAVE_OPTIONS = dict(garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, use_objstms=1)
+
+
+class _TargetImage:
+    """
+    One embedded image and its stream size at each ladder level evaluated so far.
+
+    Only the sizes are kept: pixels are decoded from the untouched source
+    document for each encoding and dropped with the encoding once measured.
+    """
+
+    def __init__(self, source: fitz.Document, xref: int, dpi: float, raw_size: int):
+        self.source = source
+        self.xref = xref
+        self.dpi = dpi
+        self.level = 0
+        self.applied = 0
+        self.gray = False
+        self.failed = False
+        self.sizes = {0: raw_size}
+
+    def size(self, level: int) -> int:
+        if level not in self.sizes:
+            try:
+                self.sizes[level] = len(self.encode(level)[0])
+            except Exception:
+                # Not decodable as plain pixels: the image keeps its current level
+                self.failed = True
+                return self.sizes[self.level]
+        return self.sizes[level]
+
+    def encode(self, level: int) -> Tuple[bytes, int, int]:
+        max_dpi, quality = TARGET_LADDER[level - 1]
+        pixmap = fitz.Pixmap(self.source, self.xref)
+        if pixmap.alpha:
+            raise ValueError("image has an alpha channel")
+        if pixmap.n not in (1, 3):
+            pixmap = fitz.Pixmap(fitz.csRGB, pixmap)
+        self.gray = pixmap.n == 1
+        image = Image.frombytes("L" if self.gray else "RGB", (pixmap.width, pixmap.height), pixmap.samples)
+        del pixmap
+        scale = min(1.0, max_dpi / self.dpi)
+        if scale < 1.0:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+        return buffer.getvalue(), image.width, image.height
+
+
+def _analyse_images(source: fitz.Document) -> List[_TargetImage]:
+    """Collect the re-encodable images with their lowest displayed DPI; nothing is decoded yet."""
+    dpis: Dict[int, float] = {}
+    for page in source:
+        for info in page.get_image_info(xrefs=True):
+            xref = info.get("xref", 0)
+            bbox = fitz.Rect(info["bbox"])
+            if xref <= 0 or bbox.is_empty:
+                continue
+            # Largest placement decides: it has the fewest pixels per inch
+            dpi = max(info["width"] / (bbox.width / 72), info["height"] / (bbox.height / 72))
+            dpis[xref] = min(dpi, dpis.get(xref, dpi))
+
+    images = []
+    for xref, dpi in dpis.items():
+        # Masks, transparency and 1-bit images do not survive JPEG; leave them alone
+        if source.xref_get_key(xref, "SMask")[0] != "null" or source.xref_get_key(xref, "ImageMask")[1] == "true":
+            continue
+        if source.xref_get_key(xref, "BitsPerComponent")[1] == "1":
+            continue
+        images.append(_TargetImage(source, xref, dpi, len(source.xref_stream_raw(xref))))
+    return images
+
+
+def _choose_levels(images: List[_TargetImage], total: int, target: int) -> int:
+    """
+    Step images down the ladder until the estimated total fits ``target``.
+
+    Each step takes the move that saves the most bytes, except that once a
+    single move can close the gap, the smallest such move is taken so the
+    result lands just under the target. Returns the new estimated total.
+    """
+    while total > target:
+        moves = []
+        for image in images:
+            if image.level < len(TARGET_LADDER) and not image.failed:
+                saving = image.size(image.level) - image.size(image.level + 1)
+                if not image.failed:
+                    moves.append((saving, image))
+        if not moves:
+            break
+        deficit = total - target
+        closing = [move for move in moves if move[0] >= deficit]
+        saving, image = min(closing, key=lambda m: m[0]) if closing else max(moves, key=lambda m: m[0])
+        image.level += 1
+        total -= saving
+    return total
+
+
+def _apply_levels(doc: fitz.Document, images: List[_TargetImage]):
+    # The chosen level is encoded once more here rather than kept from the search
+    for image in images:
+        if image.level == image.applied:
+            continue
+        data, width, height = image.encode(image.level)
+        doc.update_stream(image.xref, data, compress=False)
+        doc.xref_set_key(image.xref, "Filter", "/DCTDecode")
+        doc.xref_set_key(image.xref, "Width", str(width))
+        doc.xref_set_key(image.xref, "Height", str(height))
+        doc.xref_set_key(image.xref, "ColorSpace", "/DeviceGray" if image.gray else "/DeviceRGB")
+        doc.xref_set_key(image.xref, "BitsPerComponent", "8")
+        doc.xref_set_key(image.xref, "DecodeParms", "null")
+        doc.xref_set_key(image.xref, "Decode", "null")
+        image.applied = image.level
+
+
+def _saved_bytes(doc: fitz.Document) -> bytes:
+    # A garbage-collecting save renumbers the document's objects in place,
+    # which would leave the collected image xrefs stale: save a throwaway copy
+    with fitz.open("pdf", doc.tobytes()) as copy:
+        return copy.tobytes(**SAVE_OPTIONS)
+
+
+def compress_to_target(input_path: str, output_path: str, target_bytes: int, max_saves: int = 3) -> bool:
+    """
+    Compress with PyMuPDF so the output lands just under ``target_bytes``.
+
+    Returns whether the target was met; when it cannot be, the smallest
+    result the ladder allows is written.
+    """
+    try:
+        doc = fitz.open(input_path)
+        # Images are decoded from an unmodified copy, so deeper levels never
+        # re-encode an already recompressed stream
+        source = fitz.open(input_path)
+    except Exception as e:
+        raise CompressionError(f"Failed to read PDF: {e}")
+    try:
+        images = _analyse_images(source)
+        # One structural save gives the size of everything except the images
+        base = len(_saved_bytes(doc)) - sum(image.size(0) for image in images)
+        for _ in range(max_saves):
+            estimate = _choose_levels(images, base + sum(image.size(image.level) for image in images), target_bytes)
+            _apply_levels(doc, images)
+            data = _saved_bytes(doc)
+            if len(data) <= target_bytes or all(image.level == len(TARGET_LADDER) for image in images):
+                break
+            # The estimate was optimistic; correct the base and search further
+            base += len(data) - estimate
+        with open(output_path, "wb") as output_file:
+            output_file.write(data)
+        return len(data) <= target_bytes
+    except CompressionError:
+        raise
+    except Exception as e:
+        raise CompressionError(f"Target-size compression failed: {e}")
+    finally:
+        doc.close()
+        source.close()
+
+
+def split_pdf(input_path: str, chunk_dir: str, workers: int, pages_per_chunk: int = 0,
+              min_pages: int = 0) -> List[str]:
+    """
+    Write consecutive page ranges of ``input_path`` to chunk files, without recompressing.
+
+    ``pages_per_chunk`` of 0 spreads the pages evenly over ``workers``. Returns
+    no chunks when the input is shorter than ``min_pages`` or would make a
+    single chunk; it is then compressed as one task.
+    """
+    try:
+        source = fitz.open(input_path)
+    except Exception as e:
+        raise CompressionError(f"Failed to read PDF: {e}")
+    try:
+        page_count = source.page_count
+        pages_per_chunk = pages_per_chunk or math.ceil(page_count / max(workers, 1))
+        if page_count < max(min_pages, 2) or pages_per_chunk >= page_count:
+            return []
+        chunk_paths = []
+        for start in range(0, page_count, pages_per_chunk):
+            chunk = fitz.open()
+            chunk.insert_pdf(source, from_page=start, to_page=min(start + pages_per_chunk, page_count) - 1,
+                             links=True, annots=True)
+            chunk_path = os.path.join(chunk_dir, f"chunk_{len(chunk_paths)}.pdf")
+            chunk.save(chunk_path)
+            chunk.close()
+            chunk_paths.append(chunk_path)
+        return chunk_paths
+    finally:
+        source.close()
+
+
+def join_pdfs(input_path: str, chunk_paths: List[str], output_path: str):
+    """
+    Stitch compressed chunks back together in order.
+
+    Every chunk carries its own copy of shared fonts, ICC profiles and images;
+    they were compressed identically, so the ``garbage=4`` save merges the
+    duplicates. Metadata and the outline come from the original document.
+    """
+    source = fitz.open(input_path)
+    joined = fitz.open()
+    try:
+        for chunk_path in chunk_paths:
+            with fitz.open(chunk_path) as chunk:
+                joined.insert_pdf(chunk, links=True, annots=True)
+        joined.set_metadata(source.metadata)
+        toc = source.get_toc(simple=False)
+        if toc:
+            joined.set_toc(toc)
+        joined.save(output_path, **SAVE_OPTIONS)
+    except Exception as e:
+        raise CompressionError(f"Failed to join compressed chunks: {e}")
+    finally:
+        joined.close()
+        source.close()
+
+
+def compressed_chunk_path(chunk_path: str) -> str:
+    return f"{chunk_path[:-4]}_compressed.pdf"
+
+
+def compress_chunk(chunk_path: str, preset: str) -> str:
+    output_path = compressed_chunk_path(chunk_path)
+    compress_with_pymupdf(chunk_path, output_path, PRESETS[preset])
+    return output_path
+
+
+def parallel_stats(input_path: str, output_path: str, preset: str, chunks: int, start_time: float) -> dict:
+    """Stats for a joined parallel run, keeping the original when the result is not smaller."""
+    original_size = os.path.getsize(input_path)
+    compressed_size = os.path.getsize(output_path)
+    kept_original = compressed_size >= original_size
+    if kept_original:
+        shutil.copyfile(input_path, output_path)
+        compressed_size = original_size
+    return {
+        "backend": "pymupdf",
+        "preset": preset,
+        "chunks": chunks,
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "kept_original": kept_original,
+        "seconds": round(time.perf_counter() - start_time, 3),
+    }
+
+
+def compress_pdf_parallel(input_path: str, output_path: str, preset: str, executor: Executor,
+                          workers: int, pages_per_chunk: int = 0, min_pages: int = 0) -> dict:
+    """
+    Compress ``input_path`` with pymupdf, in page-range chunks on ``executor``.
+
+    ``workers`` is the executor's size, used to size chunks (see split_pdf).
+    Splitting, compressing and joining all run as executor tasks; the calling
+    thread only waits, so it suits job workers. Async callers run the same
+    steps with run_cpu instead.
+    """
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset: {preset}")
+    start_time = time.perf_counter()
+    with tempfile.TemporaryDirectory() as chunk_dir:
+        chunk_paths = executor.submit(split_pdf, input_path, chunk_dir, workers, pages_per_chunk, min_pages).result()
+        if not chunk_paths:
+            stats = executor.submit(compress_pdf_file, input_path, output_path, preset, "pymupdf").result()
+            stats["chunks"] = 1
+            return stats
+        futures = [executor.submit(compress_chunk, chunk_path, preset) for chunk_path in chunk_paths]
+        compressed_paths = [future.result() for future in futures]
+        executor.submit(join_pdfs, input_path, compressed_paths, output_path).result()
+    return parallel_stats(input_path, output_path, preset, len(chunk_paths), start_time)
+
+
+def compress_pdf_file(input_path: str, output_path: str, preset: str = "recommended",
+                      backend: str = "pymupdf", target_bytes: Optional[int] = None) -> dict:
+    """
+    Compress ``input_path`` into ``output_path`` and return size and timing stats.
+
+    With ``target_bytes`` the preset is ignored and the pymupdf target-size
+    search is used. Picklable in and out, so it can run in the cpu pool.
+    """
+    if target_bytes is not None:
+        if backend != "pymupdf":
+            raise ValueError("target_bytes is only supported by the pymupdf backend")
+        return _compress_to_target_file(input_path, output_path, target_bytes)
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset: {preset}")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown compression backend: {backend}. Available: {', '.join(BACKENDS)}")
+
+    start_time = time.perf_counter()
+    if backend == "ghostscript":
+        compress_with_ghostscript(input_path, output_path, PRESETS[preset])
+    else:
+        compress_with_pymupdf(input_path, output_path, PRESETS[preset])
+
+    original_size = os.path.getsize(input_path)
+    compressed_size = os.path.getsize(output_path)
+    kept_original = compressed_size >= original_size
+    if kept_original:
+        shutil.copyfile(input_path, output_path)
+        compressed_size = original_size
+    return {
+        "backend": backend,
+        "preset": preset,
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "kept_original": kept_original,
+        "seconds": round(time.perf_counter() - start_time, 3),
+    }
+
+
+def _compress_to_target_file(input_path: str, output_path: str, target_bytes: int) -> dict:
+    if target_bytes <= 0:
+        raise ValueError("target_bytes must be positive")
+    start_time = time.perf_counter()
+    original_size = os.path.getsize(input_path)
+    if original_size <= target_bytes:
+        # Already small enough: nothing to trade quality for
+        shutil.copyfile(input_path, output_path)
+        target_met = True
+    else:
+        target_met = compress_to_target(input_path, output_path, target_bytes)
+    compressed_size = os.path.getsize(output_path)
+    kept_original = compressed_size >= original_size
+    if kept_original:
+        shutil.copyfile(input_path, output_path)
+        compressed_size = original_size
+    return {
+        "backend": "pymupdf",
+        "target_bytes": target_bytes,
+        "target_met": target_met,
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "kept_original": kept_original,
+        "seconds": round(time.perf_counter() - start_time, 3),
+    }
@@ -0,0 +1,289 @@
+"""
+Streaming OCR for scanned PDFs.
+
+Pages with a usable text layer are read directly with PyMuPDF; only pages
+without one are OCRed. Those are rendered one at a time inside the worker
+that OCRs them, so no process holds more than the page it is working on, and
+only a small window of pages is in flight at once: peak memory does not grow
+with the page count.
+
+OCR backends:
+
+    tesserocr    libtesseract in-process; each worker thread keeps an API
+                 handle per language, so language data is loaded once
+    pytesseract  one ``tesseract`` subprocess per page; the fallback when
+                 tesserocr is not installed
+
+Columns are rebuilt from word boxes, Tesseract's (``image_to_data``) or the
+text layer's: words on a line are split into cells at wide horizontal gaps,
+and cells are assigned to columns by clustering their left edges across the
+page.
+"""
+import collections
+import itertools
+import logging
+import statistics
+import threading
+from concurrent.futures import Executor
+from typing import Dict, Iterator, List, Optional
+
+import fitz
+import pytesseract
+from PIL import Image
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+OCR_BACKENDS = ("tesserocr", "pytesseract")
+
+# Words further apart than this many line heights start a new cell
+CELL_GAP = 1.2
+# Cell left edges closer than this many line heights share a column
+COLUMN_TOLERANCE = 1.5
+# A text layer needs this many visible characters to count as usable...
+MIN_TEXT_CHARS = 16
+# ...and at most this share of unmapped glyphs (U+FFFD) from broken font encodings
+MAX_UNMAPPED_SHARE = 0.1
+
+
+def tesserocr_available() -> bool:
+    try:
+        import tesserocr  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_ocr_backend(backend: Optional[str] = None) -> str:
+    """Return the backend to use: ``backend`` or OCR_BACKEND, falling back to pytesseract."""
+    backend = backend or get_settings().OCR_BACKEND
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {backend}. Available: {', '.join(OCR_BACKENDS)}")
+    if backend == "tesserocr" and not tesserocr_available():
+        logger.warning("tesserocr is not installed; OCR falls back to pytesseract")
+        return "pytesseract"
+    return backend
+
+
+# tesserocr handles are not thread-safe: one per thread and language
+_tesserocr_handles = threading.local()
+
+
+def _tesserocr_api(lang: str):
+    import tesserocr
+    handles = getattr(_tesserocr_handles, "apis", None)
+    if handles is None:
+        handles = _tesserocr_handles.apis = {}
+    api = handles.get(lang)
+    if api is None:
+        tessdata = get_settings().OCR_TESSDATA_PATH
+        api = tesserocr.PyTessBaseAPI(lang=lang, **({"path": tessdata} if tessdata else {}))
+        handles[lang] = api
+    return api
+
+
+def _tesserocr_words(image: Image.Image, lang: str) -> Dict[str, list]:
+    import tesserocr
+    api = _tesserocr_api(lang)
+    api.SetImage(image)
+    api.Recognize()
+    data = {key: [] for key in ("text", "conf", "left", "top", "width", "height")}
+    iterator = api.GetIterator()
+    level = tesserocr.RIL.WORD
+    for word in tesserocr.iterate_level(iterator, level):
+        text = word.GetUTF8Text(level)
+        box = word.BoundingBox(level)
+        if not text or box is None:
+            continue
+        x0, y0, x1, y1 = box
+        data["text"].append(text)
+        data["conf"].append(word.Confidence(level))
+        data["left"].append(x0)
+        data["top"].append(y0)
+        data["width"].append(x1 - x0)
+        data["height"].append(y1 - y0)
+    api.Clear()
+    return data
+
+
+def ocr_words(image: Image.Image, lang: str = "eng", backend: str = "pytesseract") -> Dict[str, list]:
+    """Run Tesseract on ``image`` and return its word boxes as a dict of columns."""
+    if backend == "tesserocr":
+        return _tesserocr_words(image, lang)
+    return pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+
+
+def _lines(data: Dict[str, list]) -> List[List[dict]]:
+    """
+    Group recognised words into visual lines, top to bottom, each sorted left to right.
+
+    Words are grouped by their vertical centre rather than by block and line
+    number: table columns often come back as separate blocks.
+    """
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = (text or "").strip()
+        if not text or float(data["conf"][i]) < 0:
+            continue
+        words.append({
+            "text": text,
+            "left": data["left"][i],
+            "top": data["top"][i],
+            "width": data["width"][i],
+            "height": data["height"][i],
+        })
+    if not words:
+        return []
+    half_height = statistics.median(word["height"] for word in words) / 2
+
+    lines = []
+    for word in sorted(words, key=lambda word: word["top"] + word["height"] / 2):
+        centre = word["top"] + word["height"] / 2
+        if lines and centre - lines[-1][0] <= half_height:
+            lines[-1][1].append(word)
+        else:
+            lines.append((centre, [word]))
+    return [sorted(line, key=lambda word: word["left"]) for _, line in lines]
+
+
+def rows_from_words(data: Dict[str, list]) -> List[List[Optional[str]]]:
+    """
+    Rebuild table rows from ``image_to_data`` output.
+
+    Returns one row per text line; each cell sits in the column whose left
+    edge it lines up with, and missing cells are None.
+    """
+    lines = _lines(data)
+    if not lines:
+        return []
+    line_height = statistics.median(word["height"] for words in lines for word in words) or 1
+
+    # Split each line into cells at gaps wider than CELL_GAP line heights
+    cell_lines = []
+    for words in lines:
+        cells = [[words[0]]]
+        for previous, word in zip(words, words[1:]):
+            if word["left"] - (previous["left"] + previous["width"]) > CELL_GAP * line_height:
+                cells.append([word])
+            else:
+                cells[-1].append(word)
+        cell_lines.append([(cell[0]["left"], " ".join(word["text"] for word in cell)) for cell in cells])
+
+    # Cluster left edges into column anchors
+    anchors = []
+    for left in sorted(left for cells in cell_lines for left, _ in cells):
+        if anchors and left - anchors[-1][-1] <= COLUMN_TOLERANCE * line_height:
+            anchors[-1].append(left)
+        else:
+            anchors.append([left])
+    starts = [cluster[0] for cluster in anchors]
+
+    rows = []
+    for cells in cell_lines:
+        row: List[Optional[str]] = [None] * len(starts)
+        for left, text in cells:
+            column = max(i for i, start in enumerate(starts) if start <= left)
+            row[column] = text if row[column] is None else f"{row[column]} {text}"
+        while row and row[-1] is None:
+            row.pop()
+        rows.append(row)
+    return rows
+
+
+def has_text_layer(page: fitz.Page) -> bool:
+    """True when ``page`` carries enough readable text to skip OCR."""
+    text = "".join(page.get_text("text").split())
+    if len(text) < MIN_TEXT_CHARS:
+        return False
+    return text.count("\ufffd") / len(text) <= MAX_UNMAPPED_SHARE
+
+
+def text_layer_words(page: fitz.Page) -> Dict[str, list]:
+    """The page's text-layer words in ``image_to_data`` form, for ``rows_from_words``."""
+    data = {key: [] for key in ("text", "conf", "left", "top", "width", "height", "block_num", "par_num", "line_num")}
+    for x0, y0, x1, y1, text, block, line, _ in page.get_text("words"):
+        data["text"].append(text)
+        data["conf"].append(100)
+        data["left"].append(x0)
+        data["top"].append(y0)
+        data["width"].append(x1 - x0)
+        data["height"].append(y1 - y0)
+        data["block_num"].append(block)
+        data["par_num"].append(0)
+        data["line_num"].append(line)
+    return data
+
+
+def render_page_image(path: str, page_number: int, dpi: int) -> Image.Image:
+    """Render one 1-based page of the PDF at ``path`` to a grayscale image."""
+    with fitz.open(path) as doc:
+        pixmap = doc[page_number - 1].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def ensure_ocr_available(backend: str):
+    """Raise RuntimeError unless ``backend`` can run here, before any page is sent to a worker."""
+    if backend == "pytesseract":
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception as e:
+            raise RuntimeError(f"Tesseract is not available: {e}")
+
+
+def ocr_page(path: str, page_number: int, dpi: int = 300, lang: str = "eng",
+             backend: str = "pytesseract") -> List[List[Optional[str]]]:
+    """Render and OCR one page, returning its rows. Picklable for the cpu pool."""
+    try:
+        image = render_page_image(path, page_number, dpi)
+        return rows_from_words(ocr_words(image, lang, backend))
+    except Exception as e:
+        # Some library errors (pytesseract's among them) cannot be unpickled in
+        # the parent, which would break the whole process pool
+        raise RuntimeError(f"OCR failed on page {page_number}: {e}") from None
+
+
+def pages_needing_ocr(path: str) -> List[bool]:
+    """For each page, whether it lacks a usable text layer. Picklable for the cpu pool."""
+    with fitz.open(path) as doc:
+        return [not has_text_layer(page) for page in doc]
+
+
+def text_page_rows(path: str, page_number: int) -> List[List[Optional[str]]]:
+    """Rows of one 1-based page read from its text layer. Picklable for the cpu pool."""
+    with fitz.open(path) as doc:
+        return rows_from_words(text_layer_words(doc[page_number - 1]))
+
+
+def ocr_pdf_rows(path: str, executor: Executor, dpi: int = 300, lang: str = "eng",
+                 window: int = 4, backend: Optional[str] = None) -> Iterator[List[List[Optional[str]]]]:
+    """
+    Yield each page's rows in page order.
+
+    Pages are classified, read from their text layer or OCRed on
+    ``executor``, so this thread does no PyMuPDF work; at most ``window``
+    pages are in flight or waiting to be consumed at a time, so memory stays
+    flat however long the document is.
+    """
+    backend = resolve_ocr_backend(backend)
+    needs_ocr = executor.submit(pages_needing_ocr, path).result()
+    logger.info(f"{sum(needs_ocr)} of {len(needs_ocr)} pages need OCR")
+    if any(needs_ocr):
+        ensure_ocr_available(backend)
+
+    def submit(page_number: int):
+        if needs_ocr[page_number - 1]:
+            return executor.submit(ocr_page, path, page_number, dpi, lang, backend)
+        return executor.submit(text_page_rows, path, page_number)
+
+    page_numbers = iter(range(1, len(needs_ocr) + 1))
+    pending = collections.deque(submit(page_number) for page_number in itertools.islice(page_numbers, window))
+    try:
+        while pending:
+            rows = pending.popleft().result()
+            for next_page in itertools.islice(page_numbers, 1):
+                pending.append(submit(next_page))
+            yield rows
+    finally:
+        for future in pending:
+            future.cancel()
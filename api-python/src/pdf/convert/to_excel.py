@@ -1,15 +1,27 @@
 import os
 import tempfile
+import fitz
 import pandas as pd
 import tabula
-from pdf2image import convert_from_path
-import pytesseract
-from PIL import Image
 import logging
+from openpyxl import Workbook
+from core.config import get_settings
+from core.executors import CPU_POOL, JVM_POOL, get_executor
+from core.tabula_jvm import ensure_tabula_jvm
+from .ocr import ocr_pdf_rows
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _page_count(input_path: str) -> int:
+    with fitz.open(input_path) as doc:
+        return doc.page_count
+
+def _write_tables(tables: list, output_path: str):
+    with pd.ExcelWriter(output_path) as writer:
+        for i, table in enumerate(tables):
+            table.to_excel(writer, sheet_name=f'Table_{i+1}', index=False)
+
 class PDFToExcelConverter:
     def __init__(self):
         self.temp_dir = tempfile.mkdtemp()
@@ -28,14 +40,13 @@ class PDFToExcelConverter:
         try:
             # First try to extract tables using tabula-py
             logger.info("Attempting to extract tables using tabula-py...")
-            tables = tabula.read_pdf(input_path, pages='all', multiple_tables=True)
+            tables = self._read_tables(input_path)
             
             if tables:
-                # If tables are found, convert them to Excel
+                # If tables are found, convert them to Excel; the workbook is
+                # built in a worker process, away from this thread's GIL
                 logger.info(f"Found {len(tables)} tables in the PDF")
-                with pd.ExcelWriter(output_path) as writer:
-                    for i, table in enumerate(tables):
-                        table.to_excel(writer, sheet_name=f'Table_{i+1}', index=False)
+                get_executor(CPU_POOL).submit(_write_tables, tables, output_path).result()
                 return True
             
             # If no tables found, try OCR
@@ -49,6 +60,34 @@ class PDFToExcelConverter:
             # Clean up temporary files
             self._cleanup()
     
+    def _read_tables(self, input_path: str) -> list:
+        """
+        Extract every table with tabula, in page order
+        
+        With the in-process JVM, documents longer than one batch are split into
+        page batches that are extracted concurrently on the jvm pool. Without
+        it, one call keeps the cost to a single java subprocess.
+        """
+        batch_size = get_settings().TABULA_PAGES_PER_BATCH
+        if not ensure_tabula_jvm():
+            return tabula.read_pdf(input_path, pages='all', multiple_tables=True)
+        
+        page_count = get_executor(CPU_POOL).submit(_page_count, input_path).result()
+        if page_count <= batch_size:
+            return tabula.read_pdf(input_path, pages='all', multiple_tables=True)
+        
+        batches = [
+            list(range(start, min(start + batch_size - 1, page_count) + 1))
+            for start in range(1, page_count + 1, batch_size)
+        ]
+        logger.info(f"Extracting {page_count} pages in {len(batches)} batches")
+        tables = []
+        for batch_tables in get_executor(JVM_POOL).map(
+            lambda pages: tabula.read_pdf(input_path, pages=pages, multiple_tables=True), batches
+        ):
+            tables.extend(batch_tables)
+        return tables
+    
     def _convert_with_ocr(self, input_path: str, output_path: str) -> bool:
         """
         Convert PDF to Excel using OCR
@@ -60,23 +99,23 @@ class PDFToExcelConverter:
         Returns:
             bool: True if conversion successful, False otherwise
         """
+        settings = get_settings()
         try:
-            # Convert PDF to images
-            images = convert_from_path(input_path)
-            
-            # Extract text from images using OCR
-            data = []
-            for i, image in enumerate(images):
-                text = pytesseract.image_to_string(image)
-                # Split text into rows and columns
-                rows = [row.split() for row in text.split('\n') if row.strip()]
-                if rows:
-                    data.extend(rows)
+            # Pages are rendered and OCRed one at a time in the cpu pool; rows
+            # stream into a write-only workbook as each page finishes
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Sheet1")
+            row_count = 0
+            for rows in ocr_pdf_rows(
+                input_path, get_executor(CPU_POOL), settings.OCR_DPI, settings.OCR_LANG,
+                window=settings.EXECUTOR_CPU_WORKERS * 2
+            ):
+                for row in rows:
+                    sheet.append(row)
+                    row_count += 1
             
-            if data:
-                # Convert to DataFrame and save as Excel
-                df = pd.DataFrame(data)
-                df.to_excel(output_path, index=False, header=False)
+            if row_count:
+                workbook.save(output_path)
                 return True
             
             return False
@@ -3,12 +3,13 @@ from fastapi.responses import StreamingResponse, JSONResponse
 import os
 import tempfile
 from pathlib import Path
-import subprocess
 import logging
 import io
 import zipfile
 from typing import List
-import platform
+from core.libreoffice import get_office_pool, OfficeConversionError
+from core.executors import run_subprocess, map_bounded
+from core.uploads import spool_to_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,9 +17,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def get_soffice_cmd():
-    return "soffice" if platform.system() == "Windows" else "libreoffice"
-
 @router.post("/from/word")
 async def convert_word_to_pdf(files: List[UploadFile] = File(...)):
     if not files:
@@ -26,61 +24,45 @@ async def convert_word_to_pdf(files: List[UploadFile] = File(...)):
     if len(files) > 10:
         return JSONResponse(status_code=400, content={"detail": "Maximum 10 files allowed per request."})
 
-    pdf_files = []
-    temp_files = []
     output_dirs = []
-    errors = []
-
-    soffice_cmd = get_soffice_cmd()
 
-    for file in files:
+    async def convert_file(file: UploadFile):
+        """Return ``((filename, pdf_bytes), None)`` on success or ``(None, error)``."""
         if not file.filename.endswith((".doc", ".docx")):
-            errors.append(f"Unsupported file: {file.filename}")
-            continue
+            return None, f"Unsupported file: {file.filename}"
+        temp_doc_path = None
         try:
             with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as temp_doc:
-                content = await file.read()
-                temp_doc.write(content)
                 temp_doc_path = temp_doc.name
-                temp_files.append(temp_doc_path)
+            await spool_to_path(file, temp_doc_path)
 
             output_dir = tempfile.mkdtemp()
             output_dirs.append(output_dir)
-            pdf_path = None
-            result = subprocess.run([
-                soffice_cmd,
-                "--headless",
-                "--convert-to", "pdf",
-                "--outdir", output_dir,
-                temp_doc_path
-            ], capture_output=True, text=True)
-
-            logger.info(f"LibreOffice stdout for {file.filename}: {result.stdout}")
-            logger.info(f"LibreOffice stderr for {file.filename}: {result.stderr}")
-
-            if result.returncode != 0:
-                logger.error(f"LibreOffice error for {file.filename}: {result.stderr}")
-                errors.append(f"LibreOffice error for {file.filename}: {result.stderr}")
-                continue
-
-            pdf_filename = Path(temp_doc_path).with_suffix('.pdf').name
-            pdf_path = os.path.join(output_dir, pdf_filename)
+            try:
+                pdf_path = await run_subprocess(get_office_pool().convert, temp_doc_path, output_dir)
+            except OfficeConversionError as e:
+                logger.error(f"LibreOffice error for {file.filename}: {e}")
+                return None, f"LibreOffice error for {file.filename}: {e}"
 
             if not os.path.exists(pdf_path):
-                errors.append(f"PDF not created for {file.filename}.")
-                continue
+                return None, f"PDF not created for {file.filename}."
 
             with open(pdf_path, "rb") as f:
-                pdf_content = f.read()
-                pdf_files.append((Path(file.filename).stem + ".pdf", pdf_content))
+                return (Path(file.filename).stem + ".pdf", f.read()), None
         except Exception as e:
             logger.error(f"Error processing {file.filename}: {str(e)}")
-            errors.append(f"Error processing {file.filename}: {str(e)}")
+            return None, f"Error processing {file.filename}: {str(e)}"
         finally:
-            try:
-                os.unlink(temp_doc_path)
-            except Exception:
-                pass
+            if temp_doc_path:
+                try:
+                    os.unlink(temp_doc_path)
+                except Exception:
+                    pass
+
+    # Convert files concurrently; output and errors keep upload order
+    results = await map_bounded(convert_file, files)
+    pdf_files = [pdf for pdf, _ in results if pdf is not None]
+    errors = [error for _, error in results if error is not None]
 
     # Clean up output dirs
     for output_dir in output_dirs:
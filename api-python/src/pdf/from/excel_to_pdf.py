@@ -1,26 +1,20 @@
 import os
 import tempfile
 from fastapi import UploadFile, HTTPException
-import subprocess
-import sys
 import io
+from core.libreoffice import get_office_pool, OfficeConversionError
+from core.executors import run_subprocess
+from core.uploads import spool_to_path
 
 async def convert_excel_to_pdf(file: UploadFile) -> bytes:
     try:
         with tempfile.TemporaryDirectory() as temp_dir:
             input_path = os.path.join(temp_dir, file.filename)
-            with open(input_path, 'wb') as f:
-                f.write(await file.read())
-            output_path = os.path.join(temp_dir, f"{os.path.splitext(file.filename)[0]}.pdf")
-            soffice_cmd = 'soffice'
-            if sys.platform == 'win32':
-                soffice_path = r'C:\Program Files\LibreOffice\program\soffice.exe'
-                soffice_cmd = soffice_path if os.path.exists(soffice_path) else 'soffice'
-            result = subprocess.run([
-                soffice_cmd, '--headless', '--convert-to', 'pdf', '--outdir', temp_dir, input_path
-            ], capture_output=True)
-            if result.returncode != 0:
-                raise HTTPException(status_code=500, detail=f"LibreOffice conversion failed: {result.stderr.decode(errors='ignore')}")
+            await spool_to_path(file, input_path)
+            try:
+                output_path = await run_subprocess(get_office_pool().convert, input_path, temp_dir)
+            except OfficeConversionError as e:
+                raise HTTPException(status_code=500, detail=f"LibreOffice conversion failed: {e}")
             if not os.path.exists(output_path):
                 raise HTTPException(status_code=500, detail="PDF not created.")
             with open(output_path, 'rb') as f:
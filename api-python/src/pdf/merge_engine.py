@@ -0,0 +1,134 @@
+"""
+PDF merging from in-memory buffers or files.
+
+Sources are file paths or any buffers (bytes, memoryviews over mmapped
+uploads); buffers are never copied or written to disk. Each source can be
+limited to a page range spec such as "1-3,7" (see
+organize_engine.parse_page_ranges).
+"""
+import io
+from typing import BinaryIO, List, Optional, Sequence, Tuple
+
+import fitz
+import pikepdf
+
+from .organize_engine import BufferReader, parse_page_ranges
+
+BACKENDS = ("pymupdf", "pikepdf")
+
+
+class MergeError(ValueError):
+    """A source could not be read or an option is invalid."""
+
+
+class _UnnamedStream:
+    """
+    Forward writes to a file object while hiding its ``name``: PyMuPDF treats
+    any object with a ``name`` attribute as a path, including spooled files
+    whose name is None.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+
+    def write(self, data) -> int:
+        return self._stream.write(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._stream.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._stream.tell()
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        return self._stream.truncate(size)
+
+    def flush(self):
+        self._stream.flush()
+
+
+def page_runs(pages: Sequence[int]) -> List[Tuple[int, int]]:
+    """Group 1-based page numbers into (first, last) runs of consecutive pages."""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+def _merge_pymupdf(sources, page_ranges, output: BinaryIO) -> int:
+    merged = fitz.open()
+    try:
+        for index, (source, ranges) in enumerate(zip(sources, page_ranges)):
+            try:
+                if isinstance(source, str):
+                    doc = fitz.open(source, filetype="pdf")
+                else:
+                    doc = fitz.open(stream=source, filetype="pdf")
+            except Exception as e:
+                raise MergeError(f"Failed to read PDF #{index + 1}: {e}")
+            try:
+                if ranges is None:
+                    merged.insert_pdf(doc)
+                else:
+                    for first, last in page_runs(parse_page_ranges(ranges, doc.page_count)):
+                        merged.insert_pdf(doc, from_page=first - 1, to_page=last - 1)
+            finally:
+                doc.close()
+        page_count = merged.page_count
+        merged.save(_UnnamedStream(output), garbage=1)
+        return page_count
+    finally:
+        merged.close()
+
+
+def _merge_pikepdf(sources, page_ranges, output: BinaryIO) -> int:
+    merged = pikepdf.new()
+    opened = []
+    try:
+        for index, (source, ranges) in enumerate(zip(sources, page_ranges)):
+            try:
+                pdf = pikepdf.open(source if isinstance(source, str) else BufferReader(source))
+            except Exception as e:
+                raise MergeError(f"Failed to read PDF #{index + 1}: {e}")
+            # Page objects are copied when the merged file is saved, so keep sources open until then
+            opened.append(pdf)
+            if ranges is None:
+                merged.pages.extend(pdf.pages)
+            else:
+                for page in parse_page_ranges(ranges, len(pdf.pages)):
+                    merged.pages.append(pdf.pages[page - 1])
+        page_count = len(merged.pages)
+        merged.save(output)
+        return page_count
+    finally:
+        merged.close()
+        for pdf in opened:
+            pdf.close()
+
+
+def merge_pdfs(sources: Sequence, output: BinaryIO, backend: str = "pymupdf",
+               page_ranges: Optional[Sequence[Optional[str]]] = None) -> int:
+    """
+    Merge ``sources`` in order into ``output`` and return the merged page count.
+
+    ``page_ranges`` has one entry per source; None takes every page.
+    """
+    if backend not in BACKENDS:
+        raise MergeError(f"Unknown merge backend: {backend}. Available: {', '.join(BACKENDS)}")
+    if page_ranges is None:
+        page_ranges = [None] * len(sources)
+    elif len(page_ranges) != len(sources):
+        raise MergeError("pageRanges must have one entry per file")
+    if backend == "pikepdf":
+        return _merge_pikepdf(sources, page_ranges, output)
+    return _merge_pymupdf(sources, page_ranges, output)
+
+
+def merge_pdf_files(sources: Sequence, output_path: str, backend: str = "pymupdf",
+                    page_ranges: Optional[Sequence[Optional[str]]] = None) -> int:
+    """Merge ``sources`` (paths or bytes) into ``output_path``; picklable for the cpu pool."""
+    with open(output_path, "wb") as output:
+        return merge_pdfs(sources, output, backend, page_ranges)
@@ -1,86 +1,69 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
-import tempfile
-import os
-from PyPDF2 import PdfReader, PdfWriter
+from fastapi.responses import StreamingResponse
+from contextlib import ExitStack
+from typing import BinaryIO, List
 import json
-import traceback
+import logging
+import tempfile
+from core.executors import run_cpu, run_native
+from core.uploads import iter_file, process_path, upload_view, worker_source
+from .organize_engine import OrganizeError, write_organized_pdf
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def parse_page_order(pageOrder: str) -> List[dict]:
+    try:
+        page_order = json.loads(pageOrder)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="pageOrder must be a JSON list")
+    if not isinstance(page_order, list):
+        raise HTTPException(status_code=400, detail="pageOrder must be a JSON list")
+    return page_order
+
+async def organize_uploads(files: List[UploadFile], page_order: List[dict]) -> BinaryIO:
+    """
+    Assemble the organized PDF into an anonymous temporary file, returned at
+    offset 0. PyPDF2 is pure Python, so it runs in a worker process that
+    reads the uploads' own spools; where they cannot be shared (no /proc),
+    it runs on a thread over the in-memory views.
+    """
+    output = tempfile.TemporaryFile()
+    try:
+        with ExitStack() as stack:
+            views = {file.filename: stack.enter_context(upload_view(file)) for file in files}
+            sources = {file.filename: worker_source(file, views[file.filename]) for file in files}
+            output_path = process_path(output)
+            logger.debug("Organizing %d operations over %s", len(page_order), list(views))
+            if output_path is not None and all(source is not None for source in sources.values()):
+                await run_cpu(write_organized_pdf, sources, page_order, output_path)
+            else:
+                await run_native(write_organized_pdf, views, page_order, output)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
 @router.post("/api/pdf/organize/")
 async def organize_pdf(
     files: list[UploadFile] = File(...),
     pageOrder: str = Form(...)
 ):
+    page_order = parse_page_order(pageOrder)
     try:
-        print("DEBUG: Endpoint hit")
-        print("DEBUG: Received files:", [f.filename for f in files])
-        print("DEBUG: Received pageOrder:", pageOrder)
-        # Parse page order from form data
-        page_order = json.loads(pageOrder)
-        print("DEBUG: Parsed page_order:", page_order)
-        
-        # Create a temporary directory to store files
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Save uploaded files
-            file_paths = []
-            for file in files:
-                file_path = os.path.join(temp_dir, file.filename)
-                with open(file_path, "wb") as buffer:
-                    content = await file.read()
-                    buffer.write(content)
-                file_paths.append(file_path)
-            print("DEBUG: Files saved to temp:", file_paths)
-            
-            # Create output PDF
-            output = PdfWriter()
-            default_width, default_height = 595, 842  # A4 size in points
-            
-            # Process pages according to order
-            for page_info in page_order:
-                print("DEBUG: Processing page_info:", page_info)
-                file_name = page_info.get("fileName")
-                page_number = page_info.get("pageNumber")
-                is_blank = page_info.get("isBlank", False)
-                
-                if is_blank:
-                    # Try to use previous page size, else default
-                    if len(output.pages) > 0:
-                        prev_page = output.pages[-1]
-                        width = float(prev_page.mediabox.width)
-                        height = float(prev_page.mediabox.height)
-                    else:
-                        width, height = default_width, default_height
-                    print(f"DEBUG: Adding blank page with size {width}x{height}")
-                    output.add_blank_page(width=width, height=height)
-                else:
-                    # Find the corresponding file
-                    file_path = next((p for p in file_paths if os.path.basename(p) == file_name), None)
-                    print(f"DEBUG: Adding page {page_number} from file {file_name} (path: {file_path})")
-                    if file_path:
-                        reader = PdfReader(file_path)
-                        if 0 <= page_number - 1 < len(reader.pages):
-                            output.add_page(reader.pages[page_number - 1])
-                        else:
-                            print(f"DEBUG: Invalid page number {page_number} for file {file_name}")
-                    else:
-                        print(f"DEBUG: File not found for {file_name}")
-            
-            # Save the organized PDF
-            output_path = os.path.join(temp_dir, "organized.pdf")
-            with open(output_path, "wb") as output_file:
-                output.write(output_file)
-            print("DEBUG: PDF written to", output_path)
-            
-            # Return the organized PDF
-            return FileResponse(
-                output_path,
-                media_type="application/pdf",
-                filename="organized.pdf"
-            )
-            
+        output = await organize_uploads(files, page_order)
+    except HTTPException:
+        raise
+    except OrganizeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print("DEBUG: Exception occurred")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        logger.exception("organize-pdf failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        iter_file(output),
+        media_type="application/pdf",
+        headers={"Content-Disposition": "attachment; filename=organized.pdf"}
+    )
@@ -0,0 +1,180 @@
+"""
+Page assembly for organize-pdf.
+
+The page order is a list of operations, applied in order:
+
+    {"fileName": "a.pdf", "pageNumber": 3}              one page
+    {"fileName": "a.pdf", "pages": "1-5,8,10-"}         page ranges ("all" for every page)
+    {"fileName": "a.pdf", "pageNumber": 2, "rotation": 90}
+    {"isBlank": true}                                   blank page, sized like the previous page
+    {"isBlank": true, "width": 612, "height": 792}
+
+Every source file is parsed once, however many of its pages are used.
+Sources are paths or in-memory buffers (bytes, memoryview).
+"""
+import io
+import math
+from typing import BinaryIO, Dict, List, Union
+
+from PyPDF2 import PdfReader, PdfWriter
+
+# A4 in points, used for blank pages when there is no previous page to match
+DEFAULT_PAGE_SIZE = (595, 842)
+
+
+class OrganizeError(ValueError):
+    """The page order refers to a missing file, an invalid page or a bad option."""
+
+
+def parse_page_ranges(spec: str, page_count: int) -> List[int]:
+    """Expand "1-3,7,9-" into 1-based page numbers, checked against ``page_count``."""
+    spec = str(spec).strip().lower()
+    if spec == "all":
+        return list(range(1, page_count + 1))
+
+    pages = []
+    for part in spec.split(","):
+        part = part.strip()
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else page_count
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise OrganizeError(f"Invalid page range: {part!r}")
+        if not 1 <= start <= end <= page_count:
+            raise OrganizeError(f"Page range {part!r} is outside 1-{page_count}")
+        pages.extend(range(start, end + 1))
+    return pages
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable file object over a buffer, without copying it."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        else:
+            self._position = len(self._view) + offset
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+
+class PageSources:
+    """Source PDFs by file name, each opened on first use and then reused."""
+
+    def __init__(self, file_paths: Dict[str, Union[str, bytes, memoryview]]):
+        self.file_paths = file_paths
+        self._readers: Dict[str, PdfReader] = {}
+
+    def reader(self, file_name: str) -> PdfReader:
+        reader = self._readers.get(file_name)
+        if reader is None:
+            path = self.file_paths.get(file_name)
+            if path is None:
+                raise OrganizeError(f"File not found for {file_name}")
+            try:
+                reader = PdfReader(path if isinstance(path, str) else BufferReader(path))
+            except Exception as e:
+                raise OrganizeError(f"Failed to read PDF {file_name}: {e}")
+            self._readers[file_name] = reader
+        return reader
+
+
+def _dimension(operation: dict, key: str, default: float) -> float:
+    value = operation.get(key, default)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise OrganizeError(f"Blank page {key} must be a number, got {value!r}")
+    if not math.isfinite(value) or value <= 0:
+        raise OrganizeError(f"Blank page {key} must be positive, got {value!r}")
+    return value
+
+
+def _rotation(operation: dict) -> int:
+    rotation = operation.get("rotation", 0) or 0
+    if not isinstance(rotation, int) or rotation % 90:
+        raise OrganizeError(f"Rotation must be a multiple of 90, got {rotation!r}")
+    return rotation % 360
+
+
+def assemble_pages(file_paths: Dict[str, Union[str, bytes, memoryview]], page_order: List[dict]) -> PdfWriter:
+    """Build a PdfWriter holding the pages described by ``page_order``."""
+    sources = PageSources(file_paths)
+    output = PdfWriter()
+
+    for operation in page_order:
+        if not isinstance(operation, dict):
+            raise OrganizeError(f"Invalid page order entry: {operation!r}")
+        if operation.get("isBlank", False):
+            if "width" in operation or "height" in operation:
+                width = _dimension(operation, "width", DEFAULT_PAGE_SIZE[0])
+                height = _dimension(operation, "height", DEFAULT_PAGE_SIZE[1])
+            elif len(output.pages) > 0:
+                previous = output.pages[-1].mediabox
+                width, height = float(previous.width), float(previous.height)
+            else:
+                width, height = DEFAULT_PAGE_SIZE
+            output.add_blank_page(width=width, height=height)
+            continue
+
+        file_name = operation.get("fileName")
+        reader = sources.reader(file_name)
+        page_count = len(reader.pages)
+        if "pages" in operation:
+            page_numbers = parse_page_ranges(operation["pages"], page_count)
+        else:
+            page_number = operation.get("pageNumber")
+            if not isinstance(page_number, int) or not 1 <= page_number <= page_count:
+                raise OrganizeError(f"Invalid page number {page_number} for file {file_name}")
+            page_numbers = [page_number]
+
+        rotation = _rotation(operation)
+        for page_number in page_numbers:
+            # add_page copies the page dictionary, so rotating the copy leaves
+            # other uses of the same source page untouched
+            page = output.add_page(reader.pages[page_number - 1])
+            if rotation:
+                page.rotate(rotation)
+
+    if len(output.pages) == 0:
+        raise OrganizeError("The page order produced no pages")
+    return output
+
+
+def write_organized_pdf(file_paths: Dict[str, Union[str, bytes, memoryview]], page_order: List[dict],
+                        output: Union[str, BinaryIO]) -> int:
+    """Assemble the pages and write the PDF to a path or stream; returns the page count."""
+    writer = assemble_pages(file_paths, page_order)
+    try:
+        if isinstance(output, str):
+            with open(output, "wb") as output_file:
+                writer.write(output_file)
+        else:
+            writer.write(output)
+    except Exception as e:
+        raise RuntimeError(f"Failed to write output PDF: {e}")
+    return len(writer.pages)
@@ -0,0 +1,191 @@
+"""
+Page rasterization for pdf-to-any image output.
+
+Pages are rendered in small batches so a process pool can spread them over
+its workers and the results can be streamed in page order. Documents come
+as a path or as bytes. Each worker keeps the last document it opened by path,
+so a worker parses a document once however many batches of it it renders; the
+document is closed, releasing its file, once it has been idle for
+RENDER_DOCUMENT_IDLE_SECONDS.
+
+Pages whose bitmap would exceed ``max_page_pixels`` are rendered as a grid of
+``tile_size`` tiles (page_3_r1_c2.png, ...), so one huge page never needs a
+full-page pixmap in memory.
+"""
+import io
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import fitz
+from PIL import Image
+
+from core.config import get_settings
+
+from .organize_engine import parse_page_ranges
+
+# format -> file extension
+IMAGE_FORMATS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+MIN_DPI = 36
+MAX_DPI = 600
+
+
+class RenderError(ValueError):
+    """Invalid render options or an unreadable document."""
+
+
+class RenderOptions(NamedTuple):
+    dpi: int = 200
+    image_format: str = "png"
+    quality: int = 85               # JPEG and WebP only
+    tile_size: int = 4096           # tile edge, in pixels
+    max_page_pixels: int = 40_000_000
+
+    def validate(self) -> "RenderOptions":
+        if self.image_format not in IMAGE_FORMATS:
+            raise RenderError(f"Unknown image format {self.image_format}. Available: {', '.join(IMAGE_FORMATS)}")
+        if not MIN_DPI <= self.dpi <= MAX_DPI:
+            raise RenderError(f"DPI must be between {MIN_DPI} and {MAX_DPI}")
+        if not 1 <= self.quality <= 100:
+            raise RenderError("Quality must be between 1 and 100")
+        return self
+
+
+# The document this worker process rendered last by path:
+# ((path, device, inode, mtime, size), document, last use)
+_worker_document: Optional[Tuple[tuple, fitz.Document, float]] = None
+# Held while the document is in use; the idle timer takes it before closing
+_document_lock = threading.Lock()
+_idle_timer: Optional[threading.Timer] = None
+
+
+def _open_document(path: str) -> fitz.Document:
+    global _worker_document
+    stat = os.stat(path)
+    key = (path, stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _worker_document is not None:
+        if _worker_document[0] == key:
+            return _worker_document[1]
+        _worker_document[1].close()
+        _worker_document = None
+    try:
+        document = fitz.open(path)
+    except Exception as e:
+        raise RenderError(f"Failed to read PDF: {e}")
+    _worker_document = (key, document, time.monotonic())
+    return document
+
+
+def _close_idle_document():
+    global _worker_document, _idle_timer
+    idle_seconds = get_settings().RENDER_DOCUMENT_IDLE_SECONDS
+    with _document_lock:
+        _idle_timer = None
+        if _worker_document is None:
+            return
+        idle = time.monotonic() - _worker_document[2]
+        if idle < idle_seconds:
+            _schedule_idle_close(idle_seconds - idle)
+            return
+        _worker_document[1].close()
+        _worker_document = None
+
+
+def _schedule_idle_close(delay: float):
+    global _idle_timer
+    if _idle_timer is None:
+        _idle_timer = threading.Timer(delay, _close_idle_document)
+        _idle_timer.daemon = True
+        _idle_timer.start()
+
+
+@contextmanager
+def _document(source: Union[str, bytes]) -> Iterator[fitz.Document]:
+    global _worker_document
+    if not isinstance(source, str):
+        try:
+            document = fitz.open(stream=source, filetype="pdf")
+        except Exception as e:
+            raise RenderError(f"Failed to read PDF: {e}")
+        with document:
+            yield document
+        return
+    with _document_lock:
+        document = _open_document(source)
+        try:
+            yield document
+        finally:
+            _worker_document = _worker_document[:2] + (time.monotonic(),)
+            _schedule_idle_close(get_settings().RENDER_DOCUMENT_IDLE_SECONDS)
+
+
+def _encode(pixmap: fitz.Pixmap, options: RenderOptions) -> bytes:
+    if options.image_format == "png":
+        return pixmap.tobytes("png")
+    if options.image_format == "jpeg":
+        return pixmap.tobytes("jpeg", jpg_quality=options.quality)
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=options.quality)
+    return buffer.getvalue()
+
+
+def render_page(page: fitz.Page, page_number: int, options: RenderOptions) -> List[Tuple[str, bytes]]:
+    """Render one page to ``(name, image bytes)`` entries: the page, or its tiles."""
+    extension = IMAGE_FORMATS[options.image_format]
+    scale = options.dpi / 72
+    matrix = fitz.Matrix(scale, scale)
+    rect = page.rect
+    if math.ceil(rect.width * scale) * math.ceil(rect.height * scale) <= options.max_page_pixels:
+        pixmap = page.get_pixmap(matrix=matrix, alpha=False)
+        return [(f"page_{page_number}.{extension}", _encode(pixmap, options))]
+
+    step = options.tile_size / scale
+    rows = math.ceil(rect.height / step)
+    columns = math.ceil(rect.width / step)
+    tiles = []
+    for row in range(rows):
+        for column in range(columns):
+            clip = fitz.Rect(
+                rect.x0 + column * step, rect.y0 + row * step,
+                min(rect.x0 + (column + 1) * step, rect.x1), min(rect.y0 + (row + 1) * step, rect.y1),
+            )
+            pixmap = page.get_pixmap(matrix=matrix, clip=clip, alpha=False)
+            tiles.append((f"page_{page_number}_r{row + 1}_c{column + 1}.{extension}", _encode(pixmap, options)))
+            pixmap = None
+    return tiles
+
+
+def render_pages(source: Union[str, bytes], page_numbers: List[int],
+                 options: RenderOptions) -> List[Tuple[str, bytes]]:
+    """Render 1-based ``page_numbers`` of the PDF at a path or in bytes. Picklable for the cpu pool."""
+    entries = []
+    with _document(source) as document:
+        for page_number in page_numbers:
+            entries.extend(render_page(document[page_number - 1], page_number, options))
+    return entries
+
+
+def select_document_pages(document: fitz.Document, pages: str = "all") -> List[int]:
+    """Expand a page range spec such as "1-3,7,9-" against ``document``."""
+    try:
+        return parse_page_ranges(pages, document.page_count)
+    except ValueError as e:
+        raise RenderError(str(e))
+
+
+def select_pages(source: Union[str, bytes], pages: str = "all") -> List[int]:
+    """Like ``select_document_pages``, for the document at a path or in bytes."""
+    try:
+        document = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    except Exception as e:
+        raise RenderError(f"Failed to read PDF: {e}")
+    with document:
+        return select_document_pages(document, pages)
+
+
+def page_batches(page_numbers: List[int], batch_size: int) -> List[List[int]]:
+    return [page_numbers[i:i + batch_size] for i in range(0, len(page_numbers), batch_size)]
@@ -0,0 +1,68 @@
+import io
+import statistics
+import threading
+import time
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+
+@pytest.fixture(scope="module")
+def client():
+    # Entering the client runs every request on one shared event loop, like a uvicorn worker
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="module")
+def large_pdf():
+    doc = fitz.open()
+    for i in range(20):
+        page = doc.new_page()
+        for line in range(60):
+            page.insert_text((40, 40 + line * 12), f"Page {i + 1} line {line} " + "lorem ipsum " * 6)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+def measure_health(client, count=20, interval=0.05):
+    latencies = []
+    for _ in range(count):
+        start_time = time.time()
+        response = client.get('/health')
+        latencies.append(time.time() - start_time)
+        assert response.status_code == 200
+        time.sleep(interval)
+    return latencies
+
+def test_health_latency_flat_during_heavy_conversion(client, large_pdf):
+    """/health must keep answering while a heavy conversion runs"""
+    baseline = measure_health(client)
+
+    conversion = {}
+    def convert():
+        start_time = time.time()
+        response = client.post(
+            '/api/pdf/pdf-to-any',
+            params={'output_type': 'image'},
+            files={'file': ('large.pdf', io.BytesIO(large_pdf), 'application/pdf')}
+        )
+        conversion['status'] = response.status_code
+        conversion['time'] = time.time() - start_time
+
+    worker = threading.Thread(target=convert)
+    worker.start()
+    time.sleep(0.2)
+    during = []
+    while worker.is_alive():
+        during.extend(measure_health(client, count=5))
+    worker.join()
+
+    assert conversion['status'] == 200
+    assert during, "conversion finished before /health could be measured"
+    print(f"\n/health median baseline: {statistics.median(baseline) * 1000:.1f}ms, "
+          f"during conversion: {statistics.median(during) * 1000:.1f}ms "
+          f"(max {max(during) * 1000:.1f}ms, conversion {conversion['time']:.2f}s)")
+
+    # A blocked event loop would hold /health for the whole conversion
+    assert max(during) < 1.0
+    assert max(during) < conversion['time']
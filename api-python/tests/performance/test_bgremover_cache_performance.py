@@ -0,0 +1,60 @@
+import io
+import time
+import pytest
+from PIL import Image, ImageDraw
+from fastapi.testclient import TestClient
+from core.rembg_sessions import get_mask_cache, get_rembg_session
+from app.routers.tools.image.bgremover import _mask_keys
+from app.main import app
+
+SIZE = (1600, 1200)
+COLORS = ['#ffffff', '#000000', '#ff0000', '#00ff00', '#0000ff', '#ffff00']
+
+def photo():
+    image = Image.new('RGB', SIZE, (240, 240, 240))
+    ImageDraw.Draw(image).ellipse((300, 200, 1300, 1000), fill=(200, 40, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+def timed_request(client, content, bg_color, headers=None):
+    start_time = time.time()
+    response = client.post('/tools/image/bgremover/remove-background',
+                           files=[('files', ('photo.jpg', content, 'image/jpeg'))],
+                           data={'bg_color': bg_color}, headers=headers or {})
+    assert response.status_code == 200
+    return (time.time() - start_time) * 1000
+
+def test_mask_hit_latency():
+    """Background-colour changes for one photo, served from a cached mask"""
+    content = photo()
+    mask = Image.new('L', SIZE, 0)
+    ImageDraw.Draw(mask).ellipse((300, 200, 1300, 1000), fill=255)
+    get_mask_cache().clear()
+    get_mask_cache().put(_mask_keys([memoryview(content)])[0], mask)
+
+    client = TestClient(app)
+    timed_request(client, content, COLORS[0])
+    latencies = sorted(timed_request(client, content, color) for color in COLORS)
+    print(f"\nmask hit: median {latencies[len(latencies) // 2]:.0f} ms, max {latencies[-1]:.0f} ms "
+          f"({SIZE[0]}x{SIZE[1]} JPEG, PNG output)")
+    assert get_mask_cache().stats()['misses'] == 0
+    assert latencies[len(latencies) // 2] < 500
+    get_mask_cache().clear()
+
+def test_hit_vs_model_run():
+    """Same photo, new background colour: model run vs cached mask"""
+    try:
+        get_rembg_session()
+    except Exception as e:
+        pytest.skip(f"rembg model not available: {e}")
+    content = photo()
+    get_mask_cache().clear()
+    client = TestClient(app)
+    timed_request(client, content, COLORS[0], headers={'Cache-Control': 'no-cache'})  # model load and first run
+
+    miss = timed_request(client, content, COLORS[0])
+    hits = sorted(timed_request(client, content, color) for color in COLORS[1:])
+    print(f"\nmodel run {miss:.0f} ms, mask hit median {hits[len(hits) // 2]:.0f} ms")
+    assert hits[len(hits) // 2] < miss / 2
+    get_mask_cache().clear()
@@ -0,0 +1,45 @@
+import io
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+from PIL import Image
+from src.pdf.compress_engine import compress_pdf_file, compress_pdf_parallel
+
+PAGES = 48
+
+def scanned_pdf(path):
+    doc = fitz.open()
+    for i in range(PAGES):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"scanned page {i + 1}")
+        scan = io.BytesIO()
+        Image.effect_noise((1000, 1300), 50).convert('L').save(scan, format='PNG')
+        page.insert_image(fitz.Rect(36, 90, 576, 790), stream=scan.getvalue())
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_parallel_vs_serial_compression(tmp_path):
+    """Compress a 48-page scan serially and split over a process pool"""
+    source = scanned_pdf(tmp_path / 'scan.pdf')
+    workers = min(4, os.cpu_count() or 1)
+
+    start_time = time.time()
+    serial = compress_pdf_file(source, str(tmp_path / 'serial.pdf'), 'recommended')
+    serial_time = time.time() - start_time
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        executor.submit(int).result()  # start the workers outside the timing
+        start_time = time.time()
+        parallel = compress_pdf_parallel(source, str(tmp_path / 'parallel.pdf'), 'recommended', executor, workers)
+        parallel_time = time.time() - start_time
+
+    print(f"\nCompress {PAGES} pages: serial {serial_time:.2f}s, "
+          f"{parallel['chunks']} chunks on {workers} workers {parallel_time:.2f}s")
+    print(f"Sizes: serial {serial['compressed_size']}, parallel {parallel['compressed_size']}")
+
+    assert parallel['compressed_size'] <= serial['compressed_size'] * 1.01
+    if workers >= 4:
+        assert parallel_time < serial_time
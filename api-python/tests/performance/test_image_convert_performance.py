@@ -0,0 +1,51 @@
+import io
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+from app.routers.tools.image.converter import _convert_image
+
+PHOTOS = 12
+SIZE = (4000, 3000)  # a 12 MP phone photo
+
+def phone_photos(directory):
+    paths = []
+    for i in range(PHOTOS):
+        # Smooth noise compresses like a photo rather than like static
+        pixels = (np.random.default_rng(i).random((SIZE[1] // 8, SIZE[0] // 8, 3)) * 255).astype('uint8')
+        path = os.path.join(directory, f'photo_{i}.jpg')
+        Image.fromarray(pixels).resize(SIZE, Image.Resampling.BICUBIC).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+def full_decode(path, output_format, quality, scale):
+    # The previous behaviour: decode every pixel, then LANCZOS down
+    img = Image.open(path)
+    img = img.resize((int(img.width * scale / 100), int(img.height * scale / 100)), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    img.save(output, format=output_format.upper(), quality=quality)
+    return output.getvalue()
+
+def test_downscale_megapixels_per_second(tmp_path):
+    """Convert 12 photos to 25% JPEG: full decode, draft decode, and draft decode on a process pool"""
+    paths = phone_photos(str(tmp_path))
+    megapixels = PHOTOS * SIZE[0] * SIZE[1] / 1e6
+    workers = min(4, os.cpu_count() or 1)
+
+    times = {}
+    for name, convert in (('full decode', full_decode), ('draft decode', _convert_image)):
+        start_time = time.time()
+        for path in paths:
+            convert(path, 'jpeg', 80, 25)
+        times[name] = time.time() - start_time
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        executor.submit(_convert_image, paths[0], 'jpeg', 80, 25).result()  # start and import outside the timing
+        start_time = time.time()
+        list(executor.map(_convert_image, paths, ['jpeg'] * PHOTOS, [80] * PHOTOS, [25] * PHOTOS))
+        times[f'draft decode, {workers} workers'] = time.time() - start_time
+
+    print("\n" + ", ".join(f"{name} {megapixels / seconds:.0f} MP/s" for name, seconds in times.items()))
+    assert times['draft decode'] < times['full decode'] / 2
@@ -0,0 +1,57 @@
+import os
+import time
+import fitz
+import img2pdf
+import numpy as np
+from PIL import Image
+from app.converters.image import _prepare_image
+
+PHOTOS = 24
+SIZE = (3000, 2000)
+
+def photos(directory):
+    paths = []
+    for i in range(PHOTOS):
+        pixels = (np.random.default_rng(i).random((SIZE[1] // 8, SIZE[0] // 8, 3)) * 255).astype('uint8')
+        path = os.path.join(directory, f'photo_{i}.jpg')
+        Image.fromarray(pixels).resize(SIZE, Image.Resampling.BICUBIC).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+def per_image_then_merge(paths):
+    # The previous flow: verify and convert each image, then merge-pdf parses every PDF again
+    merged = fitz.open()
+    for path in paths:
+        with Image.open(path) as img:
+            img.verify()
+        with fitz.open(stream=img2pdf.convert(path), filetype='pdf') as doc:
+            merged.insert_pdf(doc)
+    return merged.tobytes(garbage=3)
+
+def pillow_pdf(paths):
+    # Decode and re-encode every image
+    images = [Image.open(path) for path in paths]
+    output = os.path.join(os.path.dirname(paths[0]), 'pillow.pdf')
+    images[0].save(output, save_all=True, append_images=images[1:])
+    return open(output, 'rb').read()
+
+def combined(paths):
+    return img2pdf.convert([_prepare_image(path) for path in paths])
+
+def test_combined_pdf_from_photos(tmp_path):
+    """Build one PDF from 24 JPEG photos: per-image PDFs plus merge, Pillow re-encode, single img2pdf pass"""
+    paths = photos(str(tmp_path))
+    source_bytes = sum(os.path.getsize(path) for path in paths)
+
+    times, sizes = {}, {}
+    for name, build in (('per image + merge', per_image_then_merge), ('pillow', pillow_pdf), ('combined', combined)):
+        start_time = time.time()
+        sizes[name] = len(build(paths))
+        times[name] = time.time() - start_time
+
+    print("\n" + ", ".join(f"{name} {times[name] * 1000:.0f} ms, {sizes[name] / source_bytes:.2f}x input"
+                           for name in times))
+    assert times['combined'] < times['per image + merge']
+    assert times['combined'] < times['pillow'] / 5
+    # JPEG data is embedded as is: the PDF is barely larger than the photos
+    assert sizes['combined'] < source_bytes * 1.01
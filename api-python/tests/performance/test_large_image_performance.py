@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from PIL import Image
+
+SIZE = (8000, 8000)  # a 64 MP scan
+API_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs in a fresh interpreter so ru_maxrss is this conversion's peak alone
+CONVERT = """
+import resource, sys, time
+from core.config import get_settings
+get_settings().IMAGE_LARGE_PIXELS = int(sys.argv[3])
+from app.routers.tools.image.converter import _convert_image
+start = time.time()
+_convert_image(sys.argv[1], 'jpeg', 80, int(sys.argv[2]))
+print(time.time() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024)
+"""
+
+def large_scan(path):
+    pixels = (np.random.default_rng(0).random((SIZE[1] // 16, SIZE[0] // 16, 3)) * 255).astype('uint8')
+    Image.fromarray(pixels).resize(SIZE, Image.Resampling.BICUBIC).save(path, compress_level=1)
+    return path
+
+def peak_rss(path, scale, large_pixels):
+    output = subprocess.run([sys.executable, '-c', CONVERT, path, str(scale), str(large_pixels)],
+                            cwd=API_ROOT, capture_output=True, text=True, check=True).stdout
+    seconds, megabytes = output.split()
+    return float(seconds), int(megabytes)
+
+def test_strip_resize_peak_memory(tmp_path):
+    """
+    Resize a 64 MP PNG to 50% and 150% JPEG: one-shot resize vs strips, peak RSS of a fresh process.
+    Both decode the whole PNG; the strips only save the resample's intermediate bitmap.
+    """
+    path = large_scan(str(tmp_path / 'scan.png'))
+    results = {}
+    for scale in (50, 150):
+        one_shot = peak_rss(path, scale, SIZE[0] * SIZE[1])
+        strips = peak_rss(path, scale, 0)
+        results[scale] = (one_shot, strips)
+        print(f"\n{scale}%: one-shot {one_shot[1]} MB in {one_shot[0]:.1f}s, "
+              f"strips {strips[1]} MB in {strips[0]:.1f}s")
+    for (one_shot, strips) in results.values():
+        assert strips[1] < one_shot[1] * 0.9
@@ -0,0 +1,58 @@
+import io
+import os
+import tempfile
+import time
+import fitz
+import pytest
+from PyPDF2 import PdfMerger
+from src.pdf.merge_engine import BACKENDS, merge_pdfs
+
+INPUT_COUNTS = [2, 20, 200]
+
+def make_pdf(label, pages=3):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(10):
+            page.insert_text((72, 72 + line * 14), f"{label} page {i + 1} line {line} " + "lorem ipsum " * 5)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+def pdf_merger_path(contents):
+    # The previous behaviour: temp file per upload, PdfMerger, BytesIO result
+    temp_files = []
+    try:
+        for content in contents:
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+            temp_file.write(content)
+            temp_file.close()
+            temp_files.append(temp_file.name)
+        merger = PdfMerger()
+        for path in temp_files:
+            merger.append(path)
+        output_buffer = io.BytesIO()
+        merger.write(output_buffer)
+        merger.close()
+        return output_buffer.getvalue()
+    finally:
+        for path in temp_files:
+            os.unlink(path)
+
+def timed(func, *args):
+    start_time = time.time()
+    func(*args)
+    return time.time() - start_time
+
+@pytest.mark.parametrize("count", INPUT_COUNTS)
+def test_merge_backends_vs_pdf_merger(count):
+    """Merge ``count`` 3-page inputs with each backend and with the old PdfMerger path"""
+    contents = [make_pdf(f"doc{i}") for i in range(count)]
+
+    times = {"pdfmerger": timed(pdf_merger_path, contents)}
+    for backend in BACKENDS:
+        times[backend] = timed(merge_pdfs, contents, io.BytesIO(), backend)
+    print(f"\nMerge {count} inputs: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in times.items()))
+
+    if count >= 20:
+        assert times["pymupdf"] < times["pdfmerger"]
@@ -0,0 +1,80 @@
+import os
+import shutil
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+import psutil
+import pytest
+from src.pdf.convert.ocr import OCR_BACKENDS, ocr_pdf_rows, tesserocr_available
+
+pytestmark = pytest.mark.skipif(shutil.which('tesseract') is None, reason="OCR needs Tesseract")
+
+def scanned_pdf(path, pages, digital_every=0):
+    # Text rendered to images, so the PDF has no text layer. With digital_every
+    # only every digital_every-th page is scanned; the others keep a text layer
+    doc = fitz.open()
+    for n in range(pages):
+        if digital_every and n % digital_every:
+            page = doc.new_page()
+            for row in range(12):
+                page.insert_text((60, 80 + row * 30), f"Item {row}")
+                page.insert_text((300, 80 + row * 30), f"{n}.{row}0")
+            continue
+        source = fitz.open()
+        page = source.new_page()
+        for row in range(12):
+            page.insert_text((60, 80 + row * 30), f"Item {row}")
+            page.insert_text((300, 80 + row * 30), f"{n}.{row}0")
+        pixmap = page.get_pixmap(dpi=150)
+        doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), pixmap=pixmap)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def run(path, executor, backend='pytesseract'):
+    process = psutil.Process(os.getpid())
+    peak = process.memory_info().rss
+    start_time = time.time()
+    page_count = 0
+    for rows in ocr_pdf_rows(path, executor, dpi=200, window=4, backend=backend):
+        page_count += 1
+        peak = max(peak, process.memory_info().rss)
+    return time.time() - start_time, peak, page_count
+
+def test_ocr_memory_flat_in_page_count(tmp_path):
+    """OCR 8 and 32 scanned pages; peak memory of the API process should not grow with length"""
+    workers = min(4, os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        short_time, short_peak, _ = run(scanned_pdf(tmp_path / 'short.pdf', 8), executor)
+        long_time, long_peak, pages = run(scanned_pdf(tmp_path / 'long.pdf', 32), executor)
+
+    print(f"\nOCR 8 pages {short_time:.2f}s (peak {short_peak / 2**20:.0f}MB), "
+          f"32 pages {long_time:.2f}s (peak {long_peak / 2**20:.0f}MB) on {workers} workers")
+    assert pages == 32
+    assert long_peak - short_peak < 50 * 2**20
+
+def test_mixed_document_only_ocrs_scanned_pages(tmp_path):
+    """A document where one page in four is scanned should cost a fraction of a fully scanned one"""
+    workers = min(4, os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        scanned_time, _, _ = run(scanned_pdf(tmp_path / 'scanned.pdf', 16), executor)
+        mixed_time, _, pages = run(scanned_pdf(tmp_path / 'mixed.pdf', 16, digital_every=4), executor)
+
+    print(f"\nOCR 16 pages: all scanned {scanned_time:.2f}s, 4 of 16 scanned {mixed_time:.2f}s")
+    assert pages == 16
+    assert mixed_time < scanned_time / 2
+
+@pytest.mark.parametrize("backend", OCR_BACKENDS)
+def test_backend_pages_per_second(tmp_path, backend):
+    """Report OCR throughput of the in-process tesserocr engine and the pytesseract subprocess path"""
+    if backend == 'tesserocr' and not tesserocr_available():
+        pytest.skip("tesserocr is not installed")
+    path = scanned_pdf(tmp_path / 'scan.pdf', 12)
+    workers = min(4, os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        run(scanned_pdf(tmp_path / 'warm.pdf', workers), executor, backend)  # load language data in every worker
+        seconds, _, pages = run(path, executor, backend)
+
+    print(f"\n{backend}: {pages / seconds:.2f} pages/s on {workers} workers")
+    assert pages == 12
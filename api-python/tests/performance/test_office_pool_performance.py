@@ -0,0 +1,79 @@
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import pytest
+from docx import Document
+from core import libreoffice
+from core.libreoffice import OfficePool, find_soffice
+
+pytestmark = pytest.mark.skipif(
+    shutil.which(find_soffice()) is None,
+    reason="LibreOffice is not installed"
+)
+
+RUNS = 5
+
+@pytest.fixture
+def sample_docx():
+    temp_dir = tempfile.mkdtemp()
+    path = os.path.join(temp_dir, 'sample.docx')
+    document = Document()
+    for i in range(20):
+        document.add_paragraph(f"Paragraph {i} " + "lorem ipsum " * 20)
+    document.save(path)
+    yield path
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_cold_start_vs_warm_pool(sample_docx):
+    """Compare one-shot soffice conversions with the warm worker pool"""
+    if libreoffice.uno is None:
+        pytest.skip("pyuno is not available, so the pool would convert through the CLI as well")
+    soffice_cmd = find_soffice()
+
+    cold_times = []
+    for _ in range(RUNS):
+        with tempfile.TemporaryDirectory() as output_dir:
+            start_time = time.time()
+            subprocess.run([
+                soffice_cmd, '--headless', '--convert-to', 'pdf', '--outdir', output_dir, sample_docx
+            ], check=True, capture_output=True)
+            cold_times.append(time.time() - start_time)
+            assert os.path.exists(os.path.join(output_dir, 'sample.pdf'))
+
+    profile_root = tempfile.mkdtemp()
+    pool = OfficePool(size=1, max_jobs=100, base_port=2102, profile_root=profile_root)
+    try:
+        pool.start()
+        warm_times = []
+        for _ in range(RUNS):
+            with tempfile.TemporaryDirectory() as output_dir:
+                start_time = time.time()
+                pdf_path = pool.convert(sample_docx, output_dir)
+                warm_times.append(time.time() - start_time)
+                assert os.path.exists(pdf_path)
+    finally:
+        pool.shutdown()
+        shutil.rmtree(profile_root, ignore_errors=True)
+
+    cold_median = statistics.median(cold_times)
+    warm_median = statistics.median(warm_times)
+    print(f"\nLibreOffice cold start median: {cold_median:.3f}s, warm pool median: {warm_median:.3f}s")
+
+    # The warm pool must not be slower than paying soffice startup every time
+    assert warm_median <= cold_median
+
+def test_worker_recycling(sample_docx):
+    """Workers are restarted after max_jobs conversions and keep converting"""
+    profile_root = tempfile.mkdtemp()
+    pool = OfficePool(size=1, max_jobs=2, base_port=2112, profile_root=profile_root)
+    try:
+        for _ in range(5):
+            with tempfile.TemporaryDirectory() as output_dir:
+                assert os.path.exists(pool.convert(sample_docx, output_dir))
+        assert all(worker["jobs"] < 2 for worker in pool.health())
+    finally:
+        pool.shutdown()
+        shutil.rmtree(profile_root, ignore_errors=True)
@@ -0,0 +1,56 @@
+import io
+import time
+import fitz
+import pytest
+from PyPDF2 import PdfReader, PdfWriter
+from src.pdf.organize_engine import write_organized_pdf
+
+SOURCE_PAGES = 300
+
+@pytest.fixture(scope="module")
+def source_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("organize") / "source.pdf"
+    doc = fitz.open()
+    for i in range(SOURCE_PAGES):
+        page = doc.new_page()
+        for line in range(5):
+            page.insert_text((72, 72 + line * 14), f"Page {i + 1} line {line} " + "lorem ipsum " * 5)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def reparse_per_page(path, page_order):
+    # The previous behaviour: a fresh PdfReader for every entry in the page order
+    output = PdfWriter()
+    for page_info in page_order:
+        reader = PdfReader(path)
+        output.add_page(reader.pages[page_info["pageNumber"] - 1])
+    output.write(io.BytesIO())
+
+def timed(func, *args):
+    start_time = time.time()
+    func(*args)
+    return time.time() - start_time
+
+def test_single_parse_vs_reparse(source_pdf):
+    """Reversing a 300-page file: one parse vs one parse per output page"""
+    page_order = [{"fileName": "source.pdf", "pageNumber": n} for n in range(SOURCE_PAGES, 0, -1)]
+    sources = {"source.pdf": source_pdf}
+
+    reparse_time = timed(reparse_per_page, source_pdf, page_order)
+    engine_time = timed(write_organized_pdf, sources, page_order, io.BytesIO())
+    print(f"\nOrganize {SOURCE_PAGES} pages: reparse per page {reparse_time:.3f}s, single parse {engine_time:.3f}s")
+
+    assert engine_time * 3 < reparse_time
+
+def test_cost_scales_with_output_pages(source_pdf):
+    """Time per output page stays flat as the order grows"""
+    sources = {"source.pdf": source_pdf}
+    per_page = {}
+    for count in (50, SOURCE_PAGES):
+        page_order = [{"fileName": "source.pdf", "pageNumber": n} for n in range(1, count + 1)]
+        per_page[count] = timed(write_organized_pdf, sources, page_order, io.BytesIO()) / count
+    print(f"\nPer output page: 50 pages {per_page[50] * 1000:.2f}ms, {SOURCE_PAGES} pages {per_page[SOURCE_PAGES] * 1000:.2f}ms")
+
+    # Re-parsing would make the per-page cost grow with the source size; allow generous noise
+    assert per_page[SOURCE_PAGES] < per_page[50] * 3
@@ -0,0 +1,28 @@
+import time
+import fitz
+from app.converters.pdf_converter import PDFConverter
+
+def table_pdf(pages):
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        for r in range(20):
+            for c in range(4):
+                rect = fitz.Rect(50 + c * 120, 60 + r * 24, 170 + c * 120, 84 + r * 24)
+                page.draw_rect(rect, color=(0, 0, 0), width=0.8)
+                page.insert_text((rect.x0 + 4, rect.y0 + 16), f"p{n} r{r} c{c}")
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+def test_excel_conversion_scales_linearly():
+    """Convert 25- and 100-page table PDFs; per-page time should not grow with document size"""
+    times = {}
+    for pages in (25, 100):
+        content = table_pdf(pages)
+        start_time = time.time()
+        PDFConverter.to_excel(content)
+        times[pages] = time.time() - start_time
+    print(f"\nExcel: 25 pages {times[25]:.2f}s, 100 pages {times[100]:.2f}s "
+          f"({times[100] / 100 * 1000:.0f}ms per page)")
+    assert times[100] < times[25] * 4 * 1.5
@@ -0,0 +1,73 @@
+import time
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+from core import rembg_sessions
+from core.rembg_sessions import get_rembg_session, predict_masks, predict_masks_fast
+
+SIZES = [(4000, 3000), (6000, 4000)]  # 12 and 24 MP photos
+
+def photo(size):
+    width, height = size
+    rng = np.random.default_rng(0)
+    background = (rng.random((height // 50, width // 50, 3)) * 80 + 150).astype('uint8')
+    image = Image.fromarray(background).resize(size, Image.Resampling.BICUBIC)
+    truth = Image.new('L', size, 0)
+    draw = ImageDraw.Draw(truth)
+    draw.polygon([(width * 0.25, height * 0.15), (width * 0.77, height * 0.22), (width * 0.7, height * 0.87),
+                  (width * 0.2, height * 0.82), (width * 0.42, height * 0.5)], fill=255)
+    draw.ellipse((width * 0.72, height * 0.12, width * 0.87, height * 0.35), fill=255)
+    image.paste((200, 40, 40), mask=truth)
+    return image, truth
+
+class ColourSession:
+    """Stand-in for U^2-Net: segments by colour through the same 320 x 320 bottleneck"""
+
+    def predict(self, image):
+        small = np.asarray(image.convert('RGB').resize((320, 320), Image.Resampling.LANCZOS), dtype=np.float32)
+        foreground = np.abs(small - (200, 40, 40)).sum(axis=2) < 120
+        mask = Image.fromarray((foreground * 255).astype('uint8'), 'L').filter(ImageFilter.GaussianBlur(1.5))
+        return [mask.resize(image.size, Image.Resampling.LANCZOS)]
+
+def iou(mask, other):
+    mask, other = np.asarray(mask) >= 128, np.asarray(other) >= 128
+    return (mask & other).sum() / (mask | other).sum()
+
+def compare(model_name=None):
+    results = []
+    for size in SIZES:
+        image, truth = photo(size)
+        row = {'size': size}
+        for mode, predict in (('full', predict_masks), ('fast', predict_masks_fast)):
+            predict([image], model_name=model_name)  # warm-up
+            timings = []
+            for _ in range(3):
+                start_time = time.time()
+                row[mode] = predict([image], model_name=model_name)[0]
+                timings.append((time.time() - start_time) * 1000)
+            row[f'{mode} ms'] = min(timings)
+            row[f'{mode} IoU truth'] = iou(row[mode], truth)
+        row['IoU fast vs full'] = iou(row['fast'], row['full'])
+        print(f"\n{size[0] * size[1] / 1e6:.0f} MP: full {row['full ms']:.0f} ms, fast {row['fast ms']:.0f} ms, "
+              f"IoU vs full {row['IoU fast vs full']:.4f}, IoU vs truth full {row['full IoU truth']:.4f} "
+              f"fast {row['fast IoU truth']:.4f}")
+        results.append(row)
+    return results
+
+def test_fast_mode_resampling_cost(monkeypatch):
+    """Full vs fast mode around a colour-threshold stand-in model: resolution-dependent cost and mask IoU"""
+    monkeypatch.setitem(rembg_sessions._sessions, 'colour-threshold', ColourSession())
+    for row in compare('colour-threshold'):
+        assert row['fast ms'] < row['full ms']
+        assert row['IoU fast vs full'] > 0.99
+        assert row['fast IoU truth'] >= row['full IoU truth'] - 0.002
+
+def test_fast_mode_with_model():
+    """Full vs fast mode with the configured rembg model: latency and mask IoU"""
+    try:
+        get_rembg_session()
+    except Exception as e:
+        pytest.skip(f"rembg model not available: {e}")
+    for row in compare():
+        assert row['fast ms'] < row['full ms']
+        assert row['IoU fast vs full'] > 0.97
@@ -0,0 +1,47 @@
+import time
+import pytest
+from PIL import Image, ImageDraw
+from core.rembg_sessions import get_rembg_session, remove_backgrounds, supports_batching
+
+IMAGES = 8
+
+@pytest.fixture(scope="module")
+def session():
+    try:
+        return get_rembg_session()
+    except Exception as e:
+        pytest.skip(f"rembg model not available: {e}")
+
+@pytest.fixture
+def sample_images():
+    images = []
+    for i in range(IMAGES):
+        image = Image.new('RGB', (640, 480), (240, 240, 240))
+        draw = ImageDraw.Draw(image)
+        draw.ellipse((120 + i * 10, 80, 480 + i * 10, 400), fill=(200, 40, 40))
+        images.append(image)
+    return images
+
+def test_session_is_shared(session):
+    assert get_rembg_session() is session
+
+def test_single_vs_batched_throughput(session, sample_images):
+    """Compare images/second for one-at-a-time and batched inference"""
+    # Warm-up so neither run pays the first-inference cost
+    remove_backgrounds(sample_images[:1])
+
+    start_time = time.time()
+    singles = [remove_backgrounds([image])[0] for image in sample_images]
+    single_rate = len(sample_images) / (time.time() - start_time)
+
+    start_time = time.time()
+    batched = remove_backgrounds(sample_images, batch_size=4)
+    batched_rate = len(sample_images) / (time.time() - start_time)
+
+    print(f"\nrembg single: {single_rate:.2f} img/s, batched: {batched_rate:.2f} img/s "
+          f"(batching {'enabled' if supports_batching(session) else 'not supported by model'})")
+
+    assert len(batched) == len(singles)
+    for single, batch in zip(singles, batched):
+        assert single.size == batch.size
+        assert batch.mode == 'RGBA'
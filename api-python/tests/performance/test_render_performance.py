@@ -0,0 +1,49 @@
+import io
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+from app.converters.pdf_converter import PDFConverter
+from src.pdf.render_engine import RenderOptions, page_batches, render_pages
+
+PAGES = 60
+
+def text_pdf(path):
+    doc = fitz.open()
+    for i in range(PAGES):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((50, 50 + line * 18), f"page {i + 1} line {line} " + "lorem ipsum dolor " * 4)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_parallel_render_vs_serial(tmp_path):
+    """Render 60 pages at 200 DPI serially and in page batches over a process pool"""
+    path = text_pdf(tmp_path / 'doc.pdf')
+    workers = min(4, os.cpu_count() or 1)
+
+    start_time = time.time()
+    with open(path, 'rb') as pdf_file:
+        PDFConverter.to_images(pdf_file)
+    serial_time = time.time() - start_time
+
+    options = RenderOptions()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        executor.submit(int).result()  # start the workers outside the timing
+        start_time = time.time()
+        futures = [executor.submit(render_pages, path, batch, options) for batch in page_batches(list(range(1, PAGES + 1)), 4)]
+        first_page_time = None
+        for future in futures:
+            future.result()
+            first_page_time = first_page_time or time.time() - start_time
+        parallel_time = time.time() - start_time
+
+    print(f"\nRender {PAGES} pages: serial {serial_time:.2f}s, {workers} workers {parallel_time:.2f}s "
+          f"(first batch after {first_page_time:.2f}s)")
+
+    # Streaming: the first pages are ready long before the whole document
+    assert first_page_time < serial_time / 2
+    if workers >= 4:
+        assert parallel_time < serial_time
@@ -0,0 +1,109 @@
+import io
+import zipfile
+import pytest
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+from fastapi.testclient import TestClient
+from core import rembg_sessions
+from core.rembg_sessions import MaskCache, get_mask_cache, refine_mask
+from core.config import get_settings
+from app.routers.tools.image import bgremover
+from app.main import app
+
+def photo(size=(64, 48), color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+@pytest.fixture
+def model_runs(monkeypatch):
+    # Stand-in for the model: the left half of every image is foreground
+    runs = []
+    def predict_masks(images, *args):
+        runs.append(len(images))
+        masks = []
+        for image in images:
+            mask = Image.new('L', image.size, 0)
+            ImageDraw.Draw(mask).rectangle((0, 0, image.width // 2 - 1, image.height), fill=255)
+            masks.append(mask)
+        return masks
+    monkeypatch.setattr(bgremover, 'predict_masks', predict_masks)
+    monkeypatch.setattr(rembg_sessions, 'predict_masks', predict_masks)
+    get_mask_cache().clear()
+    yield runs
+    get_mask_cache().clear()
+
+def remove(client, content, bg_color=None, headers=None, mode=None):
+    data = {'bg_color': bg_color} if bg_color else {}
+    if mode:
+        data['mode'] = mode
+    response = client.post('/tools/image/bgremover/remove-background',
+                           files=[('files', ('a.png', content, 'image/png'))], data=data, headers=headers or {})
+    assert response.status_code == 200
+    return Image.open(io.BytesIO(zipfile.ZipFile(io.BytesIO(response.content)).read('a.png')))
+
+def test_new_background_colour_reuses_mask(model_runs):
+    client = TestClient(app)
+    content = photo()
+    cutout = remove(client, content)
+    assert cutout.getpixel((0, 0)) == (200, 40, 40, 255)
+    assert cutout.getpixel((63, 0))[3] == 0
+
+    for bg_color in ('#0000ff', '#00ff00'):
+        composited = remove(client, content, bg_color)
+        assert composited.getpixel((0, 0)) == (200, 40, 40, 255)
+        assert composited.getpixel((63, 0)) == tuple(int(bg_color[i:i + 2], 16) for i in (1, 3, 5)) + (255,)
+    assert model_runs == [1]
+
+    # Other images, and requests that opt out of caching, run the model
+    remove(client, photo(color=(10, 10, 10)), '#ffffff')
+    remove(client, content, '#ffffff', headers={'Cache-Control': 'no-cache'})
+    assert model_runs == [1, 1, 1]
+
+def test_mask_cache_evicts_least_recently_used():
+    cache = MaskCache(max_bytes=250)
+    for key in 'abc':
+        cache.put(key, Image.new('L', (10, 10)))
+    assert cache.get('a') is None
+    assert cache.get('c') is not None
+    cache.put('d', Image.new('L', (10, 10)))
+    assert cache.get('b') is None
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['size_bytes'] == 200
+    cache.put('huge', Image.new('L', (20, 20)))
+    assert cache.get('huge') is None
+
+def test_fast_mode_segments_a_smaller_copy(model_runs, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'REMBG_FAST_MAX_SIDE', 32)
+    client = TestClient(app)
+    content = photo()
+    cutout = remove(client, content, mode='fast')
+    assert cutout.size == (64, 48)
+    assert cutout.getpixel((0, 0))[3] == 255
+    assert cutout.getpixel((63, 47))[3] == 0
+    # Fast and full masks are cached separately
+    remove(client, content, mode='fast')
+    remove(client, content)
+    assert model_runs == [1, 1]
+
+    response = client.post('/tools/image/bgremover/remove-background',
+                           files=[('files', ('a.png', content, 'image/png'))], data={'mode': 'best'})
+    assert response.status_code == 400
+
+def test_refined_mask_follows_full_resolution_edges():
+    # A sharp edge at x = 601 that the 4x smaller working image can only place to within 4 pixels
+    image = Image.new('RGB', (1200, 800), (230, 230, 230))
+    image.paste((200, 40, 40), (0, 0, 601, 800))
+    working_image = image.resize((300, 200), Image.Resampling.BILINEAR)
+    truth = Image.new('L', (300, 200), 0)
+    truth.paste(255, (0, 0, 150, 200))
+    mask = truth.filter(ImageFilter.GaussianBlur(2))
+
+    refined = np.asarray(refine_mask(mask, working_image, image))
+    interpolated = np.asarray(mask.resize(image.size, Image.Resampling.BILINEAR))
+    assert refined.shape == (800, 1200)
+    # The refined edge lands on the photo's edge; plain interpolation smears it over ~16 pixels
+    row = refined[400]
+    assert row[599] > 200 and row[603] < 55
+    assert ((interpolated[400] > 55) & (interpolated[400] < 200)).sum() > 8
+    assert ((row > 55) & (row < 200)).sum() <= 3
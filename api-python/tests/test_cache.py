@@ -0,0 +1,89 @@
+import io
+import os
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+import core.cache
+from core.cache import ResultCache
+from app.main import app
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / 'cache'), max_bytes=100)
+
+def test_key_depends_on_input_tool_and_params():
+    key = ResultCache.make_key('compress-pdf', [b'pdf'], {'preset': 'recommended'})
+    assert key == ResultCache.make_key('compress-pdf', [b'pdf'], {'preset': 'recommended'})
+    assert key != ResultCache.make_key('compress-pdf', [b'pdf'], {'preset': 'extreme'})
+    assert key != ResultCache.make_key('pdf-to-any', [b'pdf'], {'preset': 'recommended'})
+    assert key != ResultCache.make_key('compress-pdf', [b'other'], {'preset': 'recommended'})
+    assert ResultCache.make_key('merge-pdf', [b'ab', b'c']) != ResultCache.make_key('merge-pdf', [b'a', b'bc'])
+
+def test_hit_and_miss_counters(cache):
+    assert cache.get('missing') is None
+    cache.put('key', b'result')
+    assert cache.get('key') == b'result'
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+def test_lru_eviction(cache):
+    cache.put('a', b'x' * 40)
+    cache.put('b', b'x' * 40)
+    cache.get('a')
+    cache.put('c', b'x' * 40)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.stats()['size_bytes'] <= 100
+
+def test_entries_survive_restart(cache):
+    cache.put('a', b'result')
+    reopened = ResultCache(cache.directory, max_bytes=100)
+    assert reopened.get('a') == b'result'
+
+def test_workers_sharing_a_directory_stay_within_the_limit(cache):
+    other = ResultCache(cache.directory, max_bytes=100)
+    cache.put('a', b'x' * 40)
+    other.put('b', b'x' * 40)
+    # Entries stored by another worker are found and counted
+    assert cache.get('b') == b'x' * 40
+    cache.put('c', b'x' * 40)
+    assert sum(os.path.getsize(os.path.join(cache.directory, name)) for name in os.listdir(cache.directory)) <= 100
+    assert other.get('a') is None
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.cache, '_cache', ResultCache(str(tmp_path / 'cache'), max_bytes=10 * 1024 * 1024))
+    with TestClient(app) as test_client:
+        yield test_client
+
+def sample_pdf():
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "cached")
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+def test_pdf_to_any_uses_cache(client):
+    content = sample_pdf()
+    def convert(headers=None):
+        return client.post(
+            '/api/pdf/pdf-to-any',
+            params={'output_type': 'word'},
+            files={'file': ('sample.pdf', io.BytesIO(content), 'application/pdf')},
+            headers=headers
+        )
+
+    first = convert()
+    second = convert()
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert client.get('/cache/stats').json()['hits'] == 1
+
+    # Cache-Control: no-cache bypasses the cache entirely
+    assert convert({'Cache-Control': 'no-cache'}).status_code == 200
+    stats = client.get('/cache/stats').json()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
@@ -0,0 +1,207 @@
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import fitz
+import pytest
+from PIL import Image
+from fastapi.testclient import TestClient
+from core.config import get_settings
+from src.pdf import compress_engine
+from src.pdf.compress_engine import CompressionError, compress_pdf_file, compress_pdf_parallel, find_ghostscript
+from app.main import app
+
+def image_pdf(path, size=1600):
+    # A large, noisy image on a small page: far above any preset's target DPI
+    image = Image.effect_noise((size, size), 64).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=300)
+    page.insert_image(page.rect, stream=buffer.getvalue())
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def text_pdf(path):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "compact")
+    doc.save(str(path), garbage=4, deflate=True)
+    doc.close()
+    return str(path)
+
+def test_pymupdf_backend_downsamples_images(tmp_path):
+    source = image_pdf(tmp_path / 'image.pdf')
+    stats = compress_pdf_file(source, str(tmp_path / 'out.pdf'), 'extreme', 'pymupdf')
+    assert stats['compressed_size'] < stats['original_size'] / 2
+    assert not stats['kept_original']
+    with fitz.open(str(tmp_path / 'out.pdf')) as doc:
+        assert doc.page_count == 1
+
+def test_never_larger_than_input(tmp_path):
+    source = text_pdf(tmp_path / 'text.pdf')
+    stats = compress_pdf_file(source, str(tmp_path / 'out.pdf'), 'less', 'pymupdf')
+    assert stats['compressed_size'] <= stats['original_size']
+    assert (tmp_path / 'out.pdf').stat().st_size == stats['compressed_size']
+
+def test_invalid_input_raises(tmp_path):
+    source = tmp_path / 'bad.pdf'
+    source.write_bytes(b'not a pdf')
+    with pytest.raises(CompressionError):
+        compress_pdf_file(str(source), str(tmp_path / 'out.pdf'), 'recommended', 'pymupdf')
+
+def test_find_ghostscript_honours_configured_path(monkeypatch):
+    monkeypatch.setattr(get_settings(), 'GHOSTSCRIPT_PATH', 'definitely-not-ghostscript')
+    assert find_ghostscript() is None
+
+def test_endpoint_reports_sizes_and_failures(tmp_path):
+    good = open(image_pdf(tmp_path / 'good.pdf', size=800), 'rb').read()
+    client = TestClient(app)
+    response = client.post('/tools/pdf/compress-pdf', files=[
+        ('files', ('good.pdf', good, 'application/pdf')),
+        ('files', ('bad.pdf', b'not a pdf', 'application/pdf')),
+    ], data={'preset': 'extreme', 'backend': 'pymupdf'}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 200
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == ['compressed_good.pdf', 'compression_report.json']
+    report = json.loads(archive.read('compression_report.json'))['files']
+    assert [entry['status'] for entry in report] == ['compressed', 'failed']
+    assert report[0]['original_size'] == len(good)
+    assert report[0]['compressed_size'] == len(archive.read('compressed_good.pdf'))
+    assert report[0]['seconds'] >= 0
+    assert report[1]['error']
+
+def test_unknown_backend_is_rejected():
+    client = TestClient(app)
+    response = client.post('/tools/pdf/compress-pdf', files=[('files', ('a.pdf', b'%PDF', 'application/pdf'))],
+                           data={'backend': 'nope'})
+    assert response.status_code == 400
+
+def test_target_bytes_lands_under_target(tmp_path):
+    source = image_pdf(tmp_path / 'image.pdf')
+    target = (tmp_path / 'image.pdf').stat().st_size * 2 // 5
+    stats = compress_pdf_file(source, str(tmp_path / 'out.pdf'), target_bytes=target)
+    assert stats['target_met']
+    assert stats['compressed_size'] <= target
+    with fitz.open(str(tmp_path / 'out.pdf')) as doc:
+        assert doc.page_count == 1
+        doc[0].get_pixmap()
+
+def test_target_search_decodes_lazily_and_keeps_only_sizes(tmp_path, monkeypatch):
+    decoded = []
+    pixmap = fitz.Pixmap
+
+    def counting_pixmap(*args):
+        decoded.append(args)
+        return pixmap(*args)
+
+    monkeypatch.setattr(compress_engine.fitz, 'Pixmap', counting_pixmap)
+    with fitz.open(image_pdf(tmp_path / 'image.pdf')) as doc:
+        [image] = compress_engine._analyse_images(doc)
+        assert not decoded
+        assert image.size(3) < image.size(0)
+        assert len(decoded) == 1
+        assert set(image.sizes) == {0, 3}
+        assert not any(isinstance(value, (bytes, pixmap)) for value in vars(image).values())
+
+def test_unreachable_target_reports_miss(tmp_path):
+    source = image_pdf(tmp_path / 'image.pdf', size=400)
+    stats = compress_pdf_file(source, str(tmp_path / 'out.pdf'), target_bytes=100)
+    assert not stats['target_met']
+    assert stats['compressed_size'] <= stats['original_size']
+
+def test_endpoint_target_bytes(tmp_path):
+    content = open(image_pdf(tmp_path / 'image.pdf', size=800), 'rb').read()
+    client = TestClient(app)
+    response = client.post('/tools/pdf/compress-pdf', files=[('files', ('a.pdf', content, 'application/pdf'))],
+                           data={'target_bytes': str(len(content) // 3)}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    report = json.loads(archive.read('compression_report.json'))['files'][0]
+    assert report['target_met']
+    assert len(archive.read('compressed_a.pdf')) <= len(content) // 3
+
+    response = client.post('/tools/pdf/compress-pdf', files=[('files', ('a.pdf', content, 'application/pdf'))],
+                           data={'target_bytes': '1000', 'backend': 'ghostscript'})
+    assert response.status_code == 400
+
+def shared_resource_pdf(path, pages=12):
+    # Every page uses the same embedded font and logo, plus a page-sized scan
+    font = fitz.Font('tiro').buffer
+    logo = io.BytesIO()
+    Image.effect_noise((200, 200), 30).convert('RGB').save(logo, format='PNG')
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_font(fontname='F1', fontbuffer=font)
+        page.insert_text((72, 72), f"page {i}", fontname='F1')
+        page.insert_image(fitz.Rect(72, 100, 172, 200), stream=logo.getvalue())
+        scan = io.BytesIO()
+        Image.effect_noise((600, 800), 50).convert('L').save(scan, format='PNG')
+        page.insert_image(fitz.Rect(72, 220, 500, 760), stream=scan.getvalue())
+    doc.set_toc([[1, 'Start', 1], [1, 'End', pages]])
+    doc.save(str(path), garbage=3)
+    doc.close()
+    return str(path)
+
+def test_parallel_matches_serial_size(tmp_path):
+    source = shared_resource_pdf(tmp_path / 'big.pdf')
+    serial = compress_pdf_file(source, str(tmp_path / 'serial.pdf'), 'recommended')
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        stats = compress_pdf_parallel(source, str(tmp_path / 'parallel.pdf'), 'recommended', executor, 3,
+                                      pages_per_chunk=4)
+    assert stats['chunks'] == 3
+    # Shared fonts and images are merged again, up to a little xref bookkeeping
+    assert stats['compressed_size'] <= serial['compressed_size'] * 1.01
+    with fitz.open(str(tmp_path / 'parallel.pdf')) as doc:
+        assert doc.page_count == 12
+        assert doc.get_toc() == [[1, 'Start', 1], [1, 'End', 12]]
+        fonts = {font[0] for page in doc for font in page.get_fonts()}
+        images = {image[0] for page in doc for image in page.get_images()}
+        assert len(fonts) == 1
+        assert len(images) == 12 + 1
+        assert doc[11].get_text().strip() == 'page 11'
+
+def test_parallel_small_input_runs_as_one_task(tmp_path):
+    source = shared_resource_pdf(tmp_path / 'small.pdf', pages=3)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        stats = compress_pdf_parallel(source, str(tmp_path / 'out.pdf'), 'recommended', executor, 2, min_pages=10)
+    assert stats['chunks'] == 1
+
+def test_target_bytes_with_stale_objects(tmp_path):
+    # Deleted pages saved without garbage collection leave objects that a
+    # compacting save renumbers away
+    doc = fitz.open()
+    for i in range(6):
+        page = doc.new_page(width=300, height=300)
+        buffer = io.BytesIO()
+        Image.effect_noise((800, 800), 40 + i).convert('RGB').save(buffer, format='PNG')
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    doc.delete_pages([0, 2, 3])
+    doc.save(str(tmp_path / 'edited.pdf'), garbage=0)
+    live_size = len(doc.tobytes(garbage=4, deflate=True))
+    doc.close()
+
+    stats = compress_pdf_file(str(tmp_path / 'edited.pdf'), str(tmp_path / 'out.pdf'), target_bytes=live_size // 3)
+    assert stats['target_met']
+    with fitz.open(str(tmp_path / 'out.pdf')) as out:
+        assert out.page_count == 3
+        for page in out:
+            assert page.get_images()[0][-1] == 'DCTDecode'
+            page.get_pixmap()
+
+def test_endpoint_parallel_runs_chunks_on_cpu_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'COMPRESSION_PAGES_PER_CHUNK', 4)
+    content = open(shared_resource_pdf(tmp_path / 'big.pdf'), 'rb').read()
+    client = TestClient(app)
+    response = client.post('/tools/pdf/compress-pdf', files=[('files', ('big.pdf', content, 'application/pdf'))],
+                           data={'parallel': 'true'}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    report = json.loads(archive.read('compression_report.json'))['files'][0]
+    assert report['status'] == 'compressed'
+    assert report['chunks'] == 3
+    with fitz.open(stream=archive.read('compressed_big.pdf'), filetype='pdf') as doc:
+        assert doc.page_count == 12
+        assert doc.get_toc() == [[1, 'Start', 1], [1, 'End', 12]]
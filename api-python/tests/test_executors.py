@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from core.executors import map_bounded, map_bounded_iter
+
+def test_map_bounded_preserves_order():
+    async def work(delay):
+        await asyncio.sleep(delay)
+        return delay
+
+    delays = [0.05, 0.01, 0.03, 0.0, 0.02]
+    assert asyncio.run(map_bounded(work, delays, limit=3)) == delays
+
+def test_map_bounded_respects_limit():
+    in_flight = 0
+    peak = 0
+
+    async def work(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return item
+
+    asyncio.run(map_bounded(work, range(10), limit=2))
+    assert peak == 2
+
+def test_map_bounded_return_exceptions():
+    async def work(item):
+        if item == 1:
+            raise ValueError("bad file")
+        return item
+
+    results = asyncio.run(map_bounded(work, [0, 1, 2], return_exceptions=True))
+    assert results[0] == 0
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 2
+
+def test_map_bounded_raises_first_error():
+    async def work(item):
+        if item == 1:
+            raise ValueError("bad file")
+        await asyncio.sleep(0.01)
+        return item
+
+    with pytest.raises(ValueError):
+        asyncio.run(map_bounded(work, [0, 1, 2]))
+
+def test_map_bounded_iter_streams_in_order():
+    finished = []
+
+    async def work(delay):
+        await asyncio.sleep(delay)
+        finished.append(delay)
+        return delay
+
+    async def collect():
+        results = []
+        async for result in map_bounded_iter(work, [0.03, 0.0, 0.01], limit=2):
+            results.append(result)
+        return results
+
+    assert asyncio.run(collect()) == [0.03, 0.0, 0.01]
+    # The second item finished first but was held back until the first was yielded
+    assert finished[0] == 0.0
+
+def test_broken_process_pool_is_replaced():
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+    from core.executors import CPU_POOL, get_executor, run_cpu
+
+    broken = get_executor(CPU_POOL)
+    with pytest.raises(BrokenProcessPool):
+        # A worker dying mid-task breaks the whole pool
+        broken.submit(os._exit, 1).result()
+    assert asyncio.run(run_cpu(len, [1, 2])) == 2
+    assert get_executor(CPU_POOL) is not broken
+
+def _start_and_crash(path):
+    import os
+    with open(path, 'a') as f:
+        f.write('started\n')
+    os._exit(1)
+
+def test_crashing_call_fails_with_503_without_retry(tmp_path):
+    from fastapi import HTTPException
+    from core.executors import CPU_POOL, get_executor, run_cpu
+
+    marker = tmp_path / 'runs'
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(run_cpu(_start_and_crash, str(marker)))
+    assert info.value.status_code == 503
+    # Rerunning the call that broke the pool would break its replacement as well
+    assert marker.read_text() == 'started\n'
+    assert asyncio.run(run_cpu(len, [1, 2, 3])) == 3
+    assert not getattr(get_executor(CPU_POOL), '_broken', False)
@@ -0,0 +1,61 @@
+import io
+import pytest
+from PIL import Image, ImageChops
+from fastapi.testclient import TestClient
+from core.config import get_settings
+from core.images import PixelBudget, PixelBudgetExceeded, image_pixels, resize_in_strips
+from app.routers.tools.image.converter import _convert_image
+from app.main import app
+
+def save(path, image_format, size=(801, 601)):
+    Image.linear_gradient('L').resize(size).convert('RGB').save(path, format=image_format)
+    return str(path)
+
+def test_downscale_keeps_exact_target_size(tmp_path):
+    for image_format in ('JPEG', 'PNG'):
+        path = save(tmp_path / f'photo.{image_format.lower()}', image_format)
+        result = Image.open(io.BytesIO(_convert_image(path, 'png', 80, 25)))
+        assert result.size == (200, 150)
+
+def test_upscale_and_unscaled(tmp_path):
+    path = save(tmp_path / 'photo.jpg', 'JPEG', size=(100, 50))
+    assert Image.open(io.BytesIO(_convert_image(path, 'png', 80, 150))).size == (150, 75)
+    assert Image.open(io.BytesIO(_convert_image(path, 'webp', 80, 100))).size == (100, 50)
+
+def test_tiny_scale_never_reaches_zero(tmp_path):
+    path = save(tmp_path / 'photo.jpg', 'JPEG', size=(40, 30))
+    assert Image.open(io.BytesIO(_convert_image(path, 'png', 80, 1))).size == (1, 1)
+
+def test_strip_resize_matches_one_shot_resize():
+    image = Image.effect_noise((900, 700), 40).convert('RGB')
+    for size, reducing_gap in (((300, 233), None), ((300, 233), 3.0), ((1350, 1050), None)):
+        expected = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+        strips = resize_in_strips(image, size, strip_height=64, reducing_gap=reducing_gap)
+        assert max(high for _, high in ImageChops.difference(expected, strips).getextrema()) <= 1
+
+def test_large_images_resample_in_strips(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'IMAGE_LARGE_PIXELS', 1000)
+    path = save(tmp_path / 'photo.png', 'PNG')
+    assert Image.open(io.BytesIO(_convert_image(path, 'png', 80, 50))).size == (400, 300)
+
+def test_pixel_budget():
+    budget = PixelBudget(image_limit=100, request_limit=150)
+    budget.charge(100)
+    with pytest.raises(PixelBudgetExceeded):
+        budget.charge(101)
+    with pytest.raises(PixelBudgetExceeded):
+        budget.charge(60)
+    assert budget.used == 100
+
+def test_endpoint_rejects_images_over_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'IMAGE_REQUEST_MAX_PIXELS', 801 * 601 + 1)
+    content = open(save(tmp_path / 'photo.png', 'PNG'), 'rb').read()
+    assert image_pixels(content) == 801 * 601
+    client = TestClient(app)
+    response = client.post('/tools/image/converter/convert', files=[
+        ('files', ('a.png', content, 'image/png')),
+        ('files', ('b.png', content, 'image/png')),
+    ], data={'output_format': 'jpeg'})
+    assert response.status_code == 413
+    assert client.post('/tools/image/converter/convert', files=[('files', ('a.png', content, 'image/png'))],
+                       data={'output_format': 'jpeg'}, headers={'Cache-Control': 'no-cache'}).status_code == 200
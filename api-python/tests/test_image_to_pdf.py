@@ -0,0 +1,89 @@
+import io
+import fitz
+from PIL import Image
+from fastapi.testclient import TestClient
+from app.converters.image import _needs_reencoding, _prepare_image
+from app.main import app
+
+def encode(image_format, size=(120, 80), **params):
+    buffer = io.BytesIO()
+    Image.linear_gradient('L').resize(size).convert('RGB').save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+def encode_rgba(image_format, size=(120, 80)):
+    buffer = io.BytesIO()
+    Image.new('RGBA', size, (255, 0, 0, 128)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def test_only_images_img2pdf_would_decode_are_reencoded(tmp_path):
+    cases = {
+        'photo.jpg': (encode('JPEG'), False),
+        'plain.png': (encode('PNG'), False),
+        'palette.gif': (encode('GIF'), True),
+        'bitmap.bmp': (encode('BMP'), True),
+        'alpha.png': (encode_rgba('PNG'), False),
+        'alpha.webp': (encode_rgba('WEBP'), True),
+        'alpha.tiff': (encode_rgba('TIFF'), True),
+        'transparent.gif': (encode('GIF', transparency=0), True),
+    }
+    for name, (content, reencode) in cases.items():
+        path = tmp_path / name
+        path.write_bytes(content)
+        with Image.open(path) as img:
+            assert _needs_reencoding(img) == reencode, name
+        prepared = _prepare_image(str(path))
+        assert (prepared != str(path)) == reencode, name
+
+def test_combine_builds_one_pdf_in_upload_order():
+    jpeg = encode('JPEG', size=(200, 100))
+    client = TestClient(app)
+    response = client.post('/api/convert-to-pdf', files=[
+        ('files', ('a.jpg', jpeg, 'image/jpeg')),
+        ('files', ('b.bmp', encode('BMP', size=(50, 100)), 'image/bmp')),
+        ('files', ('c.gif', encode('GIF'), 'image/gif')),
+    ], data={'type': 'image', 'combine': 'true'}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/pdf'
+    with fitz.open(stream=response.content, filetype='pdf') as doc:
+        # img2pdf's default 96 dpi: 0.75 points per pixel
+        assert [(page.rect.width, page.rect.height) for page in doc] == [(150, 75), (37.5, 75), (90, 60)]
+        # The JPEG is embedded without re-encoding
+        xref = doc[0].get_images()[0][0]
+        assert doc.xref_stream_raw(xref) == jpeg
+
+def test_combine_rejects_invalid_images_and_other_types():
+    client = TestClient(app)
+    response = client.post('/api/convert-to-pdf', files=[
+        ('files', ('a.jpg', encode('JPEG'), 'image/jpeg')),
+        ('files', ('b.png', b'not an image', 'image/png')),
+    ], data={'type': 'image', 'combine': 'true'}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 400
+    assert 'b.png' in response.json()['detail']
+
+    response = client.post('/api/convert-to-pdf', files=[('files', ('a.docx', b'x', 'application/octet-stream'))],
+                           data={'type': 'word', 'combine': 'true'})
+    assert response.status_code == 400
+
+def test_combine_embeds_alpha_images_with_a_soft_mask():
+    client = TestClient(app)
+    response = client.post('/api/convert-to-pdf', files=[
+        ('files', ('a.webp', encode_rgba('WEBP'), 'image/webp')),
+        ('files', ('b.tiff', encode_rgba('TIFF'), 'image/tiff')),
+    ], data={'type': 'image', 'combine': 'true'}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 200
+    with fitz.open(stream=response.content, filetype='pdf') as doc:
+        assert doc.page_count == 2
+        assert all(page.get_images()[0][1] for page in doc)
+
+def test_image_rejected_by_img2pdf_is_a_client_error():
+    # Animated images pass through as is, so img2pdf sees the alpha channel
+    frames = [Image.new('RGBA', (40, 40), (0, 0, 255, alpha)) for alpha in (64, 192)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format='WEBP', save_all=True, append_images=frames[1:])
+    client = TestClient(app)
+    response = client.post('/api/convert-to-pdf', files=[
+        ('files', ('a.jpg', encode('JPEG'), 'image/jpeg')),
+        ('files', ('b.webp', buffer.getvalue(), 'image/webp')),
+    ], data={'type': 'image', 'combine': 'true'}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith('b.webp: ')
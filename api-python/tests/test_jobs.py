@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+import core.jobs
+from core.jobs import JobStore, job_handler
+from app.main import app
+
+@job_handler("test-upper")
+def upper(inputs, params, output_dir, progress):
+    output_path = os.path.join(output_dir, "upper.txt")
+    with open(output_path, "wb") as out:
+        for i, (name, path) in enumerate(inputs):
+            with open(path, "rb") as f:
+                out.write(f.read().upper())
+            progress((i + 1) / len(inputs))
+    return output_path, "upper.txt", "text/plain"
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.jobs, '_store', JobStore(str(tmp_path / 'jobs'), ttl_seconds=3600))
+    with TestClient(app) as test_client:
+        yield test_client
+
+def wait_for(client, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').json()
+        if job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_submit_poll_and_download(client):
+    response = client.post('/api/jobs/test-upper', files=[
+        ('files', ('a.txt', b'hello ')),
+        ('files', ('b.txt', b'world')),
+    ])
+    assert response.status_code == 202
+    submitted = response.json()
+    assert submitted['status'] == 'queued'
+    assert submitted['files'] == ['a.txt', 'b.txt']
+
+    job = wait_for(client, submitted['id'])
+    assert job['status'] == 'succeeded'
+    assert job['progress'] == 1.0
+
+    result = client.get(job['result_url'])
+    assert result.status_code == 200
+    assert result.content == b'HELLO WORLD'
+    assert 'upper.txt' in result.headers['content-disposition']
+
+def test_failed_job_reports_error(client):
+    # A preset the compress handler does not know fails inside the worker
+    response = client.post('/api/jobs/compress-pdf', files=[('files', ('a.pdf', b'%PDF'))],
+                           data={'params': '{"preset": "nope"}'})
+    job = wait_for(client, response.json()['id'])
+    assert job['status'] == 'failed'
+    assert 'nope' in job['error']
+    assert client.get(f"/api/jobs/{job['id']}/result").status_code == 410
+
+def test_compress_job_runs_on_cpu_pool(client):
+    import fitz
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), 'job')
+    content = doc.tobytes()
+    response = client.post('/api/jobs/compress-pdf', files=[('files', ('a.pdf', content))],
+                           data={'params': '{"target_bytes": 100000}'})
+    job = wait_for(client, response.json()['id'], timeout=60)
+    assert job['status'] == 'succeeded'
+    assert client.get(job['result_url']).status_code == 200
+
+def run_handler(tool, inputs, params, output_dir, results):
+    try:
+        results.put(core.jobs._handlers[tool](inputs, params, output_dir, lambda progress: None)[1])
+    except Exception as e:
+        results.put(repr(e))
+
+@pytest.mark.parametrize('params', [{}, {'target_bytes': 100000}])
+def test_compress_handler_runs_in_daemonic_worker(tmp_path, params):
+    # Celery's prefork workers are daemonic processes, which may not start children
+    import fitz
+    doc = fitz.open()
+    for i in range(4):
+        doc.new_page().insert_text((72, 72), f'page {i}')
+    doc.save(str(tmp_path / 'a.pdf'))
+    doc.close()
+    os.makedirs(tmp_path / 'out')
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    worker = context.Process(target=run_handler, daemon=True, args=(
+        'compress-pdf', [('a.pdf', str(tmp_path / 'a.pdf'))], params, str(tmp_path / 'out'), results
+    ))
+    worker.start()
+    try:
+        assert results.get(timeout=60) == 'compressed_pdfs.zip'
+    finally:
+        worker.join(timeout=10)
+
+def test_unknown_tool_and_job(client):
+    assert client.post('/api/jobs/nope', files=[('files', ('a.txt', b'x'))]).status_code == 404
+    assert client.get('/api/jobs/0123456789abcdef').status_code == 404
+    assert client.post('/api/jobs/test-upper', files=[('files', ('a.txt', b'x'))],
+                       data={'params': '[1]'}).status_code == 400
+
+def test_expired_jobs_are_purged(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs'), ttl_seconds=0)
+    job = store.create('test-upper', ['a.txt'])
+    time.sleep(0.01)
+    store.purge_expired()
+    assert store.get(job['id']) is None
@@ -0,0 +1,95 @@
+import io
+import os
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from core import cache
+from core.config import get_settings
+from src.pdf.merge_engine import BACKENDS, MergeError, merge_pdf_files, merge_pdfs, page_runs
+
+def make_pdf(label, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"{label}{i + 1}")
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+def page_texts(data):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [page.get_text().strip() for page in doc]
+
+def test_page_runs():
+    assert page_runs([1, 2, 3, 7, 5, 6]) == [(1, 3), (7, 7), (5, 6)]
+    assert page_runs([]) == []
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_merge_in_order(backend):
+    output = io.BytesIO()
+    count = merge_pdfs([make_pdf('A', 2), memoryview(make_pdf('B', 1))], output, backend)
+    assert count == 3
+    assert page_texts(output.getvalue()) == ['A1', 'A2', 'B1']
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_merge_page_ranges(backend):
+    output = io.BytesIO()
+    merge_pdfs([make_pdf('A', 5), make_pdf('B', 3)], output, backend, ['4-5,1', None])
+    assert page_texts(output.getvalue()) == ['A4', 'A5', 'A1', 'B1', 'B2', 'B3']
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_merge_files_by_path(backend, tmp_path):
+    paths = []
+    for label, pages in (('A', 2), ('B', 3)):
+        path = tmp_path / f"{label}.pdf"
+        path.write_bytes(make_pdf(label, pages))
+        paths.append(str(path))
+    count = merge_pdf_files(paths, str(tmp_path / 'merged.pdf'), backend, [None, '3'])
+    assert count == 3
+    assert page_texts((tmp_path / 'merged.pdf').read_bytes()) == ['A1', 'A2', 'B3']
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_merge_rejects_bad_input(backend):
+    with pytest.raises(MergeError):
+        merge_pdfs([make_pdf('A', 1), b'not a pdf'], io.BytesIO(), backend)
+    with pytest.raises(ValueError):
+        merge_pdfs([make_pdf('A', 1)], io.BytesIO(), backend, ['3'])
+
+def test_unknown_backend():
+    with pytest.raises(MergeError):
+        merge_pdfs([make_pdf('A', 1)], io.BytesIO(), 'nope')
+
+def large_pdf(label, pages):
+    # Incompressible padding pushes the upload past Starlette's in-memory spool
+    doc = fitz.open(stream=make_pdf(label, pages), filetype="pdf")
+    doc.embfile_add("padding", os.urandom(2 * 1024 * 1024))
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("headers", [{'Cache-Control': 'no-cache'}, {}])
+def test_endpoint_merges_large_uploads(backend, headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, '_cache', cache.ResultCache(str(tmp_path / 'cache'), 64 * 1024 * 1024))
+    # Above the threshold the merge streams without going through the cache
+    monkeypatch.setattr(get_settings(), 'MERGE_CACHE_MAX_BYTES', 1024)
+    client = TestClient(app)
+    response = client.post('/tools/pdf/merge-pdf', files=[
+        ('files', ('a.pdf', large_pdf('A', 2), 'application/pdf')),
+        ('files', ('b.pdf', make_pdf('B', 3), 'application/pdf')),
+    ], data={'backend': backend, 'pageRanges': '[null, "2-3"]'}, headers=headers)
+    assert response.status_code == 200
+    assert page_texts(response.content) == ['A1', 'A2', 'B2', 'B3']
+    assert cache.get_result_cache().stats()['entries'] == 0
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_endpoint_caches_small_merges(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, '_cache', cache.ResultCache(str(tmp_path / 'cache'), 64 * 1024 * 1024))
+    client = TestClient(app)
+    files = [('files', ('a.pdf', make_pdf('A', 1), 'application/pdf')),
+             ('files', ('b.pdf', make_pdf('B', 1), 'application/pdf'))]
+    for _ in range(2):
+        response = client.post('/tools/pdf/merge-pdf', files=files, data={'backend': backend})
+        assert response.status_code == 200
+        assert page_texts(response.content) == ['A1', 'B1']
+    assert cache.get_result_cache().stats()['hits'] == 1
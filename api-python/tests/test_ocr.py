@@ -0,0 +1,123 @@
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import fitz
+import pytest
+import pytesseract
+from src.pdf.convert import ocr
+from src.pdf.convert.ocr import ocr_pdf_rows, rows_from_words
+
+def words(*entries):
+    # (text, left, top, line) with 20px high words, all in one block and paragraph
+    data = {key: [] for key in ('text', 'conf', 'left', 'top', 'width', 'height', 'block_num', 'par_num', 'line_num')}
+    for text, left, top, line in entries:
+        data['text'].append(text)
+        data['conf'].append(90)
+        data['left'].append(left)
+        data['top'].append(top)
+        data['width'].append(len(text) * 10)
+        data['height'].append(20)
+        data['block_num'].append(1)
+        data['par_num'].append(1)
+        data['line_num'].append(line)
+    return data
+
+def test_rows_from_words_rebuilds_columns():
+    data = words(
+        ('Name', 100, 10, 1), ('Unit', 400, 10, 1), ('price', 450, 10, 1), ('Qty', 700, 10, 1),
+        ('Apple', 100, 50, 2), ('1.20', 405, 50, 2), ('3', 702, 50, 2),
+        ('Pear', 100, 90, 3), ('7', 698, 90, 3),
+        ('', 300, 90, 3),
+    )
+    assert rows_from_words(data) == [
+        ['Name', 'Unit price', 'Qty'],
+        ['Apple', '1.20', '3'],
+        ['Pear', None, '7'],
+    ]
+
+def test_rows_from_words_orders_lines_top_down():
+    data = words(('second', 100, 60, 2), ('first', 100, 20, 1))
+    assert rows_from_words(data) == [['first'], ['second']]
+    assert rows_from_words(words()) == []
+
+def test_ocr_pdf_rows_keeps_order_and_bounds_window(tmp_path, monkeypatch):
+    doc = fitz.open()
+    for _ in range(12):
+        doc.new_page()
+    doc.save(str(tmp_path / 'scan.pdf'))
+
+    lock = threading.Lock()
+    active = {'now': 0, 'max': 0}
+    def ocr_page(path, page_number, dpi, lang, backend):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(0.01 * (page_number % 3))
+        with lock:
+            active['now'] -= 1
+        return [[f'page {page_number}']]
+
+    monkeypatch.setattr(ocr, 'ocr_page', ocr_page)
+    monkeypatch.setattr(ocr, 'ensure_ocr_available', lambda backend: None)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pages = list(ocr_pdf_rows(str(tmp_path / 'scan.pdf'), executor, window=3))
+    assert pages == [[[f'page {n}']] for n in range(1, 13)]
+    assert active['max'] <= 3
+
+def test_only_pages_without_text_are_ocred(tmp_path, monkeypatch):
+    doc = fitz.open()
+    for n in range(1, 7):
+        page = doc.new_page()
+        if n % 3:
+            # Digital page: a two-column text layer
+            page.insert_text((60, 80), f"Digital page {n}")
+            page.insert_text((300, 80), f"{n}.00")
+        else:
+            # Scanned page: an image and no text
+            page.insert_image(fitz.Rect(50, 50, 150, 150), pixmap=fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 40, 40), 0))
+    doc.save(str(tmp_path / 'mixed.pdf'))
+
+    ocred = []
+    def ocr_page(path, page_number, dpi, lang, backend):
+        ocred.append(page_number)
+        return [[f'scanned {page_number}']]
+
+    monkeypatch.setattr(ocr, 'ocr_page', ocr_page)
+    monkeypatch.setattr(ocr, 'ensure_ocr_available', lambda backend: None)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pages = list(ocr_pdf_rows(str(tmp_path / 'mixed.pdf'), executor))
+    assert sorted(ocred) == [3, 6]
+    assert pages == [
+        [['Digital page 1', '1.00']], [['Digital page 2', '2.00']], [['scanned 3']],
+        [['Digital page 4', '4.00']], [['Digital page 5', '5.00']], [['scanned 6']],
+    ]
+
+def test_backend_resolution_falls_back_to_pytesseract(monkeypatch):
+    monkeypatch.setattr(ocr, 'tesserocr_available', lambda: False)
+    assert ocr.resolve_ocr_backend('tesserocr') == 'pytesseract'
+    assert ocr.resolve_ocr_backend('pytesseract') == 'pytesseract'
+    monkeypatch.setattr(ocr, 'tesserocr_available', lambda: True)
+    assert ocr.resolve_ocr_backend('tesserocr') == 'tesserocr'
+    with pytest.raises(ValueError):
+        ocr.resolve_ocr_backend('cuneiform')
+
+def test_ocr_errors_are_plain_and_checked_before_submitting(tmp_path, monkeypatch):
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(str(tmp_path / 'blank.pdf'))
+
+    def ocr_words(image, lang, backend):
+        raise pytesseract.TesseractNotFoundError()
+    monkeypatch.setattr(ocr, 'ocr_words', ocr_words)
+    with pytest.raises(RuntimeError) as error:
+        ocr.ocr_page(str(tmp_path / 'blank.pdf'), 1)
+    # Crosses the process pool boundary intact
+    assert isinstance(pickle.loads(pickle.dumps(error.value)), RuntimeError)
+
+    def missing():
+        raise pytesseract.TesseractNotFoundError()
+    monkeypatch.setattr(ocr.pytesseract, 'get_tesseract_version', missing)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(RuntimeError):
+            list(ocr_pdf_rows(str(tmp_path / 'blank.pdf'), executor, backend='pytesseract'))
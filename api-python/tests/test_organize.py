@@ -0,0 +1,106 @@
+import io
+import json
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+from PyPDF2 import PdfReader
+from src.pdf.organize_engine import OrganizeError, parse_page_ranges, write_organized_pdf
+from app.main import app
+
+def make_pdf(path, pages, label):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page(width=300, height=400).insert_text((50, 50), f"{label}{i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+@pytest.fixture
+def sources(tmp_path):
+    return {
+        'a.pdf': make_pdf(tmp_path / 'a.pdf', 5, 'A'),
+        'b.pdf': make_pdf(tmp_path / 'b.pdf', 3, 'B'),
+    }
+
+def page_texts(data):
+    reader = PdfReader(io.BytesIO(data))
+    return [page.extract_text().strip() for page in reader.pages]
+
+def organize(sources, page_order):
+    output = io.BytesIO()
+    write_organized_pdf(sources, page_order, output)
+    return output.getvalue()
+
+def test_parse_page_ranges():
+    assert parse_page_ranges('1-3,5', 6) == [1, 2, 3, 5]
+    assert parse_page_ranges('4-', 6) == [4, 5, 6]
+    assert parse_page_ranges('all', 3) == [1, 2, 3]
+    with pytest.raises(OrganizeError):
+        parse_page_ranges('2-9', 6)
+    with pytest.raises(OrganizeError):
+        parse_page_ranges('x', 6)
+
+def test_pages_ranges_and_blanks_in_order(sources):
+    data = organize(sources, [
+        {'fileName': 'b.pdf', 'pageNumber': 2},
+        {'fileName': 'a.pdf', 'pages': '4-5'},
+        {'isBlank': True},
+        {'fileName': 'a.pdf', 'pageNumber': 1},
+    ])
+    assert page_texts(data) == ['B2', 'A4', 'A5', '', 'A1']
+    # The blank page takes the size of the page before it
+    blank = PdfReader(io.BytesIO(data)).pages[3]
+    assert (float(blank.mediabox.width), float(blank.mediabox.height)) == (300, 400)
+
+def test_rotation_applies_to_one_use_of_a_page(sources):
+    data = organize(sources, [
+        {'fileName': 'a.pdf', 'pageNumber': 1, 'rotation': 90},
+        {'fileName': 'a.pdf', 'pageNumber': 1},
+    ])
+    reader = PdfReader(io.BytesIO(data))
+    assert [page.get('/Rotate', 0) for page in reader.pages] == [90, 0]
+
+def test_invalid_operations(sources):
+    with pytest.raises(OrganizeError):
+        organize(sources, [{'fileName': 'a.pdf', 'pageNumber': 6}])
+    with pytest.raises(OrganizeError):
+        organize(sources, [{'fileName': 'missing.pdf', 'pageNumber': 1}])
+    with pytest.raises(OrganizeError):
+        organize(sources, [{'fileName': 'a.pdf', 'pageNumber': 1, 'rotation': 45}])
+    for size in ({'width': 'wide'}, {'height': None}, {'width': -5}):
+        with pytest.raises(OrganizeError):
+            organize(sources, [dict(isBlank=True, **size)])
+
+def test_sources_from_memory(sources):
+    in_memory = {name: memoryview(open(path, 'rb').read()) for name, path in sources.items()}
+    assert page_texts(organize(in_memory, [{'fileName': 'b.pdf', 'pages': '2-'}])) == ['B2', 'B3']
+
+def test_organize_endpoint(sources):
+    files = [('files', (name, open(path, 'rb').read(), 'application/pdf')) for name, path in sources.items()]
+    client = TestClient(app)
+    response = client.post('/api/pdf/organize-pdf', files=files, data={
+        'pageOrder': json.dumps([{'fileName': 'b.pdf', 'pages': 'all'}, {'fileName': 'a.pdf', 'pageNumber': 2}])
+    })
+    assert response.status_code == 200
+    assert page_texts(response.content) == ['B1', 'B2', 'B3', 'A2']
+
+    response = client.post('/api/pdf/organize-pdf', files=files, data={
+        'pageOrder': json.dumps([{'fileName': 'a.pdf', 'pageNumber': 99}])
+    })
+    assert response.status_code == 400
+
+    for page_order in ('not json', json.dumps([{'isBlank': True, 'width': 'wide', 'height': 100}])):
+        response = client.post('/api/pdf/organize-pdf', files=files, data={'pageOrder': page_order})
+        assert response.status_code == 400
+
+def test_organize_endpoint_large_upload(tmp_path):
+    # Enough pages to roll the upload over from memory to Starlette's temp file
+    path = make_pdf(tmp_path / 'big.pdf', 4000, 'P')
+    content = open(path, 'rb').read()
+    assert len(content) > 1024 * 1024
+    client = TestClient(app)
+    response = client.post('/api/pdf/organize-pdf', files=[('files', ('big.pdf', content, 'application/pdf'))], data={
+        'pageOrder': json.dumps([{'fileName': 'big.pdf', 'pages': '3999-'}, {'fileName': 'big.pdf', 'pageNumber': 1}])
+    })
+    assert response.status_code == 200
+    assert page_texts(response.content) == ['P3999', 'P4000', 'P1']
@@ -0,0 +1,36 @@
+import io
+import fitz
+from openpyxl import load_workbook
+from app.converters.pdf_converter import PDFConverter
+
+def grid_page(doc, label, rows=4, columns=3):
+    page = doc.new_page()
+    page.insert_text((72, 60), label)
+    for r in range(rows):
+        for c in range(columns):
+            rect = fitz.Rect(72 + c * 120, 100 + r * 24, 192 + c * 120, 124 + r * 24)
+            page.draw_rect(rect, color=(0, 0, 0), width=0.8)
+            page.insert_text((rect.x0 + 4, rect.y0 + 16), f"{label} r{r}c{c}")
+
+def sheets(content):
+    workbook = load_workbook(io.BytesIO(content))
+    return {ws.title: [[cell.value for cell in row] for row in ws.iter_rows()] for ws in workbook.worksheets}
+
+def test_excel_has_a_sheet_per_table_or_page():
+    doc = fitz.open()
+    grid_page(doc, "A")
+    doc.new_page().insert_text((72, 72), "first line\nsecond line")
+    grid_page(doc, "C")
+    result = sheets(PDFConverter.to_excel(doc.tobytes()))
+
+    assert list(result) == ["Page 1 Table 1", "Page 2", "Page 3 Table 1"]
+    assert result["Page 1 Table 1"][0] == ["A r0c0", "A r0c1", "A r0c2"]
+    assert len(result["Page 1 Table 1"]) == 4
+    # Later pages get their own rows instead of overwriting page 1
+    assert result["Page 2"] == [["first line"], ["second line"]]
+    assert result["Page 3 Table 1"][3] == ["C r3c0", "C r3c1", "C r3c2"]
+
+def test_excel_strips_control_characters():
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "bell\x07 text")
+    assert sheets(PDFConverter.to_excel(doc.tobytes()))["Page 1"] == [["bell text"]]
@@ -58,4 +58,41 @@ def test_convert_pdf_to_excel_function(sample_pdf_path, output_path):
 
 def test_convert_pdf_to_excel_with_invalid_input():
     result = convert_pdf_to_excel('invalid.pdf', 'output.xlsx')
-    assert result is False 
\ No newline at end of file
+    assert result is False
+
+
+def test_read_tables_extracts_page_batches_in_order(tmp_path, monkeypatch):
+    import fitz
+    from src.pdf.convert import to_excel
+    doc = fitz.open()
+    for _ in range(20):
+        doc.new_page()
+    doc.save(str(tmp_path / 'long.pdf'))
+
+    calls = []
+    def read_pdf(path, pages, multiple_tables):
+        calls.append(pages)
+        return [f'table {page}' for page in pages]
+
+    monkeypatch.setattr(to_excel, 'ensure_tabula_jvm', lambda: True)
+    monkeypatch.setattr(to_excel.tabula, 'read_pdf', read_pdf)
+    monkeypatch.setattr(to_excel.get_settings(), 'TABULA_PAGES_PER_BATCH', 8)
+    tables = PDFToExcelConverter()._read_tables(str(tmp_path / 'long.pdf'))
+    assert sorted(calls) == [list(range(1, 9)), list(range(9, 17)), list(range(17, 21))]
+    assert tables == [f'table {page}' for page in range(1, 21)]
+
+def test_failed_jvm_start_is_not_retried(monkeypatch):
+    from core import tabula_jvm
+    calls = []
+    def read_pdf(*args, **kwargs):
+        calls.append(args)
+        raise RuntimeError('java not found')
+
+    monkeypatch.setattr(tabula_jvm, 'jvm_available', lambda: True)
+    monkeypatch.setattr(tabula_jvm, 'in_process_jvm', lambda: False)
+    monkeypatch.setattr(tabula_jvm, '_warmed_up', False)
+    monkeypatch.setattr(tabula_jvm.tabula, 'read_pdf', read_pdf)
+    with pytest.raises(RuntimeError):
+        tabula_jvm.ensure_tabula_jvm()
+    assert tabula_jvm.ensure_tabula_jvm() is False
+    assert len(calls) == 1
@@ -0,0 +1,141 @@
+import io
+import os
+import time
+import zipfile
+import fitz
+import pytest
+from PIL import Image
+from fastapi.testclient import TestClient
+from core.config import get_settings
+from src.pdf import render_engine
+from src.pdf.render_engine import RenderError, RenderOptions, page_batches, render_pages, select_pages
+from app.converters.pdf_converter import PDFConverter
+from app.main import app
+
+def sample_pdf(path, pages=5, width=200, height=300):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((20, 40), f"page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_select_pages(tmp_path):
+    path = sample_pdf(tmp_path / 'a.pdf')
+    assert select_pages(path) == [1, 2, 3, 4, 5]
+    assert select_pages(path, '2-3,5') == [2, 3, 5]
+    with pytest.raises(RenderError):
+        select_pages(path, '4-9')
+    assert page_batches([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+
+@pytest.mark.parametrize("image_format, image_type", [('png', 'PNG'), ('jpeg', 'JPEG'), ('webp', 'WEBP')])
+def test_render_formats_and_dpi(tmp_path, image_format, image_type):
+    path = sample_pdf(tmp_path / 'a.pdf')
+    entries = render_pages(path, [2, 4], RenderOptions(dpi=144, image_format=image_format, quality=70))
+    extension = 'jpg' if image_format == 'jpeg' else image_format
+    assert [name for name, _ in entries] == [f'page_2.{extension}', f'page_4.{extension}']
+    image = Image.open(io.BytesIO(entries[0][1]))
+    assert image.format == image_type
+    assert image.size == (400, 600)
+
+def test_large_pages_render_as_tiles(tmp_path):
+    path = sample_pdf(tmp_path / 'a.pdf', pages=1, width=720, height=360)
+    # 1000 x 500 pixels at 100 DPI, over a 100k pixel budget: 3 x 2 tiles of up to 400 px
+    entries = render_pages(path, [1], RenderOptions(dpi=100, tile_size=400, max_page_pixels=100_000))
+    assert [name for name, _ in entries] == [
+        'page_1_r1_c1.png', 'page_1_r1_c2.png', 'page_1_r1_c3.png',
+        'page_1_r2_c1.png', 'page_1_r2_c2.png', 'page_1_r2_c3.png',
+    ]
+    sizes = [Image.open(io.BytesIO(data)).size for _, data in entries]
+    assert sizes[0] == (400, 400)
+    assert sum(size[0] for size in sizes[:3]) == 1000
+    assert sum(sizes[i][1] for i in (0, 3)) == 500
+
+def test_render_from_bytes(tmp_path):
+    content = open(sample_pdf(tmp_path / 'a.pdf'), 'rb').read()
+    assert select_pages(content, '4-') == [4, 5]
+    entries = render_pages(content, [4, 5], RenderOptions(dpi=72))
+    assert [name for name, _ in entries] == ['page_4.png', 'page_5.png']
+
+def test_idle_document_is_closed(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'RENDER_DOCUMENT_IDLE_SECONDS', 0.2)
+    # Earlier tests may have left a timer scheduled with the default delay
+    monkeypatch.setattr(render_engine, '_idle_timer', None)
+    path = sample_pdf(tmp_path / 'a.pdf')
+    render_pages(path, [1], RenderOptions(dpi=72))
+    document = render_engine._worker_document[1]
+    # Kept for the next batch of the same document...
+    render_pages(path, [2], RenderOptions(dpi=72))
+    assert render_engine._worker_document[1] is document
+    # ...and closed once idle, so the file is not held open for good
+    deadline = time.monotonic() + 5
+    while render_engine._worker_document is not None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert render_engine._worker_document is None
+    assert document.is_closed
+
+def test_invalid_options_rejected():
+    with pytest.raises(RenderError):
+        RenderOptions(image_format='gif').validate()
+    with pytest.raises(RenderError):
+        RenderOptions(dpi=5000).validate()
+
+def test_converter_selects_pages(tmp_path):
+    with open(sample_pdf(tmp_path / 'a.pdf'), 'rb') as pdf_file:
+        archive = zipfile.ZipFile(io.BytesIO(PDFConverter.to_images(pdf_file, '1,3', RenderOptions(image_format='jpeg'))))
+    assert archive.namelist() == ['page_1.jpg', 'page_3.jpg']
+
+def test_endpoint_streams_selected_pages(tmp_path):
+    content = open(sample_pdf(tmp_path / 'a.pdf', pages=9), 'rb').read()
+    client = TestClient(app)
+    response = client.post('/api/pdf/pdf-to-any',
+                           params={'output_type': 'image', 'pages': '2-', 'dpi': 72, 'image_format': 'webp'},
+                           files={'file': ('a.pdf', content, 'application/pdf')})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == [f'page_{n}.webp' for n in range(2, 10)]
+
+    response = client.post('/api/pdf/pdf-to-any', params={'output_type': 'image', 'pages': '12'},
+                           files={'file': ('a.pdf', content, 'application/pdf')})
+    assert response.status_code == 400
+
+def test_endpoint_streams_large_upload(tmp_path):
+    # A multi-megabyte upload rolls over to Starlette's temp file, which the workers read in place
+    path = tmp_path / 'large.pdf'
+    doc = fitz.open(sample_pdf(path, pages=3))
+    doc.embfile_add('padding', os.urandom(2 * 1024 * 1024))
+    content = doc.tobytes()
+    doc.close()
+    client = TestClient(app)
+    response = client.post('/api/pdf/pdf-to-any', params={'output_type': 'image', 'dpi': 72},
+                           files={'file': ('large.pdf', content, 'application/pdf')})
+    assert response.status_code == 200
+    assert zipfile.ZipFile(io.BytesIO(response.content)).namelist() == ['page_1.png', 'page_2.png', 'page_3.png']
+
+    response = client.post('/api/pdf/pdf-to-any', params={'output_type': 'word'},
+                           files={'file': ('large.pdf', content, 'application/pdf')}, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 200
+    assert response.content[:2] == b'PK'
+
+def test_converter_accepts_bytes_and_closes_documents(tmp_path):
+    content = open(sample_pdf(tmp_path / 'a.pdf'), 'rb').read()
+    with PDFConverter.open_document(content) as doc:
+        assert doc.page_count == 5
+    assert doc.is_closed
+    assert PDFConverter.to_word(io.BytesIO(content))[:2] == b'PK'
+
+def test_endpoint_multiple_outputs_share_one_upload(tmp_path):
+    content = open(sample_pdf(tmp_path / 'a.pdf', pages=3), 'rb').read()
+    client = TestClient(app)
+    response = client.post('/api/pdf/pdf-to-any',
+                           params={'output_type': ['word', 'image,excel'], 'pages': '1-2', 'image_format': 'jpeg'},
+                           files={'file': ('a.pdf', content, 'application/pdf')},
+                           headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == ['converted.docx', 'images/page_1.jpg', 'images/page_2.jpg', 'converted.xlsx']
+
+    response = client.post('/api/pdf/pdf-to-any', params={'output_type': ['word', 'gif']},
+                           files={'file': ('a.pdf', content, 'application/pdf')})
+    assert response.status_code == 400
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import pytest
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from tempfile import SpooledTemporaryFile
+from core.uploads import UploadLimitMiddleware, process_path, upload_view, spool_to_path, worker_source
+
+def limited_app():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, default_limit=1024, limits={"/big": 4096})
+
+    @app.post("/small")
+    async def small(file: UploadFile):
+        return {"size": len(await file.read())}
+
+    @app.post("/big/upload")
+    async def big(file: UploadFile):
+        return {"size": len(await file.read())}
+
+    @app.post("/raw")
+    async def raw(request: Request):
+        return {"size": len(await request.body())}
+
+    return app
+
+def test_upload_under_limit_is_accepted():
+    client = TestClient(limited_app())
+    response = client.post('/small', files={'file': ('a.bin', b'x' * 100)})
+    assert response.status_code == 200
+    assert response.json() == {'size': 100}
+
+def test_per_path_limit_overrides_default():
+    client = TestClient(limited_app())
+    assert client.post('/small', files={'file': ('a.bin', b'x' * 2048)}).status_code == 413
+    assert client.post('/big/upload', files={'file': ('a.bin', b'x' * 2048)}).status_code == 200
+
+def test_streamed_body_without_content_length_is_cut_off():
+    client = TestClient(limited_app())
+
+    def body():
+        for _ in range(16):
+            yield b'x' * 512
+
+    # A chunked body has no Content-Length, so the limit is enforced while reading
+    response = client.post('/raw', content=body())
+    assert response.status_code == 413
+
+def make_upload(data: bytes, max_size: int) -> StarletteUploadFile:
+    spool = SpooledTemporaryFile(max_size=max_size)
+    spool.write(data)
+    spool.seek(0)
+    return StarletteUploadFile(spool, filename='upload.bin')
+
+def test_upload_view_in_memory_and_rolled_over():
+    for max_size in (1024 * 1024, 16):
+        upload = make_upload(b'payload' * 10, max_size)
+        with upload_view(upload) as view:
+            assert bytes(view) == b'payload' * 10
+
+def test_upload_view_empty_upload():
+    with upload_view(make_upload(b'', 16)) as view:
+        assert len(view) == 0
+
+def test_spool_to_path(tmp_path):
+    upload = make_upload(b'pdf' * 1000, 16)
+    path = asyncio.run(spool_to_path(upload, str(tmp_path / 'input.pdf')))
+    with open(path, 'rb') as f:
+        assert f.read() == b'pdf' * 1000
+    # The upload can still be read afterwards
+    assert upload.file.read() == b'pdf' * 1000
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='needs /proc')
+def test_worker_source_without_copying_to_disk():
+    small = make_upload(b'pdf' * 10, 1024 * 1024)
+    with upload_view(small) as view:
+        assert worker_source(small, view) == b'pdf' * 10
+    rolled = make_upload(b'pdf' * 1000, 16)
+    with upload_view(rolled) as view:
+        path = worker_source(rolled, view)
+    # Another process opens the anonymous spool by its descriptor
+    assert path == process_path(rolled.file)
+    with open(path, 'rb') as f:
+        assert f.read() == b'pdf' * 1000
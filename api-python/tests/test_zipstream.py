@@ -0,0 +1,32 @@
+import asyncio
+import io
+import zipfile
+from core.zipstream import stream_zip, CHUNK_SIZE
+
+async def collect(entries):
+    async def source():
+        for entry in entries:
+            yield entry
+    return [chunk async for chunk in stream_zip(source())]
+
+def test_stream_zip_produces_valid_archive():
+    entries = [('notes.txt', b'hello ' * 1000), ('page_1.png', b'\x89PNG' + bytes(5000)), ('empty.pdf', b'')]
+    chunks = asyncio.run(collect(entries))
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+    assert archive.testzip() is None
+    assert archive.namelist() == ['notes.txt', 'page_1.png', 'empty.pdf']
+    for name, data in entries:
+        assert archive.read(name) == data
+
+def test_stream_zip_stores_compressed_payloads():
+    chunks = asyncio.run(collect([('page_1.png', bytes(10000)), ('notes.txt', bytes(10000))]))
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+    assert archive.getinfo('page_1.png').compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo('notes.txt').compress_type == zipfile.ZIP_DEFLATED
+
+def test_stream_zip_chunks_are_bounded():
+    data = bytes(range(256)) * (3 * CHUNK_SIZE // 256)
+    chunks = asyncio.run(collect([('large.pdf', data)]))
+    assert len(chunks) > 3
+    assert max(len(chunk) for chunk in chunks) <= CHUNK_SIZE + 1024
+    assert zipfile.ZipFile(io.BytesIO(b''.join(chunks))).read('large.pdf') == data